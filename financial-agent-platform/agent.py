@@ -1,41 +1,150 @@
 import os
+import time
+import asyncio
+import contextvars
+import startup
+import tracing
 from dotenv import load_dotenv
 
 from state import AgentState
-from tools import tools
+with startup.step("import tools"):
+    from tools import tools, warm_up
+    # The module too: its Lazy resources (embeddings, search cache) back the answer cache
+    import tools as tools_module
+    import answer_cache
 
-from langgraph.graph import StateGraph, START, END
-from langgraph.prebuilt import ToolNode, tools_condition
-from langchain_ollama import ChatOllama
-from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+with startup.step("import langgraph"):
+    from langgraph.graph import StateGraph, START, END
+    from langgraph.prebuilt import tools_condition
+    from langchain_core.messages import (AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage,
+                                         message_chunk_to_message)
+    import memory
 load_dotenv()
 
-llm = ChatOllama(
-    model="gpt-oss:20b-cloud",
-    base_url=os.getenv("OLLAMA_BASE_URL"),
-    headers={"Authorization": f"Bearer {os.getenv('OLLAMA_API_KEY')}"},
-)
+# How many tool calls of one LLM turn may run at the same time
+TOOL_CONCURRENCY = int(os.getenv("TOOL_CONCURRENCY", 4))
+
+# "ollama" (default) or "stub": the scripted local model in stub_llm.py, for tests and benchmarks
+LLM_BACKEND = os.getenv("LLM_BACKEND", "ollama")
+
+# Background warm-up of the model, database and LLM client when the REPL starts
+AGENT_WARMUP = os.getenv("AGENT_WARMUP", "1") == "1"
+
+def _build_llm():
+    if LLM_BACKEND == "stub":
+        from stub_llm import StubChatModel
+        return StubChatModel().bind_tools(tools)
+    with startup.step("import langchain_ollama"):
+        from langchain_ollama import ChatOllama
+    llm = ChatOllama(
+        model="gpt-oss:20b-cloud",
+        base_url=os.getenv("OLLAMA_BASE_URL"),
+        headers={"Authorization": f"Bearer {os.getenv('OLLAMA_API_KEY')}"},
+    )
+    return llm.bind_tools(tools)
 
-llm_with_tools = llm.bind_tools(tools)
+# Built on the first reasoner call (or by the warm-up)
+llm_with_tools = startup.Lazy("llm client", _build_llm)
 
-def reasoner(state: AgentState):
+async def reasoner(state: AgentState):
     """
     The Main Node: It looks at the conversation history and decides what to do.
     """
-    # Get the message history
-    instruction = SystemMessage(content="When you use search_10k tool make sure you give a long and detailed query for effective retrieval. only answer after analyzing tool output never answer on your own knowledge")
-    messages = state["messages"]
-    # Ask the LLM
-    response = llm_with_tools.invoke([instruction] + messages)
-    # Return the new message to update the state
-    return {"messages": [response]}
+    with tracing.span("node.reasoner") as node:
+        # Get the message history
+        instruction = SystemMessage(content="When you use search_10k tool make sure you give a long and detailed query for effective retrieval. only answer after analyzing tool output never answer on your own knowledge. To compare several companies, call search_10k_multi once with all their tickers instead of search_10k for each. When the question is about one part of the filing (risk factors, MD&A, market risk, financial statements), pass it as section so only that 10-K Item is searched")
+        # Recent turns verbatim, older tool outputs compacted, under HISTORY_TOKEN_CEILING (see memory.py)
+        with tracing.span("memory.fit_history", messages=len(state["messages"])):
+            messages, stats = memory.fit_history(state["messages"], reserved_tokens=memory.message_tokens(instruction))
+        print(f"   📏 Prompt: ~{stats['tokens']} tokens (full history ~{stats['full_tokens']}, "
+              f"{stats['compacted']} tool outputs compacted, {stats['turns_dropped']} turns dropped, "
+              f"{stats['truncated']} cut, {stats['dropped_outputs']} outputs dropped)")
+        # Ask the LLM, streamed: graph.astream(stream_mode="messages") hands the tokens to the caller as they arrive
+        llm = await llm_with_tools.aget()
+        with tracing.span("llm.stream", prompt_tokens=stats["tokens"]) as call:
+            response, metrics = await stream_response(llm, [instruction] + messages)
+            call.set(ttft_s=round(metrics["ttft_s"], 4), output_tokens=metrics["output_tokens"],
+                     tool_calls=metrics["tool_calls"])
+        metrics["prompt_tokens"] = stats["tokens"]
+        node.set(prompt_tokens=stats["tokens"], output_tokens=metrics["output_tokens"], tool_calls=metrics["tool_calls"])
+    return {"messages": [response], "metrics": [metrics]}
+
+async def stream_response(llm, messages):
+    """
+    Streams one LLM response. Returns the complete AIMessage (tool-call chunks
+    merged into tool_calls) and its timings: time to first token, output
+    tokens/s after the first token, and total latency.
+    """
+    started = time.perf_counter()
+    first_token_at = None
+    response = None
+    chunks = 0
+    async for chunk in llm.astream(messages):
+        # Models without native streaming yield one complete AIMessage instead of chunks
+        if chunk.content or getattr(chunk, "tool_call_chunks", None) or getattr(chunk, "tool_calls", None):
+            chunks += 1
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+        response = chunk if response is None else response + chunk
+    finished = time.perf_counter()
+
+    if response is None:
+        response = AIMessage(content="")
+    usage = getattr(response, "usage_metadata", None) or {}
+    output_tokens = usage.get("output_tokens") or chunks
+    first_token_at = first_token_at or finished
+    generating = finished - first_token_at
+    metrics = {
+        "ttft_s": first_token_at - started,
+        "total_s": finished - started,
+        "output_tokens": output_tokens,
+        "tokens_per_s": (output_tokens - 1) / generating if output_tokens > 1 and generating > 0 else None,
+        "tool_calls": len(getattr(response, "tool_calls", None) or []),
+    }
+    return message_chunk_to_message(response), metrics
+
+def format_metrics(metrics):
+    rate = f"{metrics['tokens_per_s']:.1f} tokens/s" if metrics["tokens_per_s"] else "- tokens/s"
+    calls = f", {metrics['tool_calls']} tool calls" if metrics["tool_calls"] else ""
+    return (f"   ⏱️ TTFT {metrics['ttft_s']:.2f}s, {rate}, {metrics['output_tokens']} tokens "
+            f"in {metrics['total_s']:.2f}s{calls}")
+
+tools_by_name = {t.name: t for t in tools}
+
+async def execute_tools(state: AgentState):
+    """
+    The Tools Node: runs every tool call of the last AI message concurrently
+    (at most TOOL_CONCURRENCY at a time) and returns the results in call order.
+    """
+    tool_calls = state["messages"][-1].tool_calls
+    semaphore = asyncio.Semaphore(TOOL_CONCURRENCY)
+
+    async def run(call):
+        async with semaphore:
+            # The span starts once the call holds a slot, so semaphore waits are not counted
+            with tracing.span(f"tool.{call['name']}", args=call["args"]) as span:
+                selected = tools_by_name.get(call["name"])
+                if selected is None:
+                    output = f"Error: {call['name']} is not a valid tool, try one of {list(tools_by_name)}."
+                else:
+                    try:
+                        output = await selected.ainvoke(call["args"])
+                    except Exception as e:
+                        # Report the failure to the LLM instead of aborting the other calls
+                        output = f"Error: {repr(e)}\n Please fix your mistakes."
+                span.set(output_chars=len(str(output)))
+        return ToolMessage(content=str(output), name=call["name"], tool_call_id=call["id"])
+
+    with tracing.span("node.tools", calls=len(tool_calls)):
+        results = await asyncio.gather(*(run(call) for call in tool_calls))
+    return {"messages": list(results)}
 
 # 5. Build the Graph (The Architecture)
 builder = StateGraph(AgentState)
 
 # Add Nodes
 builder.add_node("reasoner", reasoner)
-builder.add_node("tools", ToolNode(tools)) # Prebuilt node that runs our Python functions
+builder.add_node("tools", execute_tools) # Runs our Python functions, concurrently
 
 # Add Edges (The Logic)
 builder.add_edge(START, "reasoner")
@@ -53,30 +162,118 @@ builder.add_conditional_edges(
 builder.add_edge("tools", "reasoner")
 
 # Compile the Graph
-graph = builder.compile()
+with startup.step("compile graph"):
+    graph = builder.compile()
+
+# --- ANSWER CACHE ---
+# Final answers of earlier turns, reused for rephrasings about the same tickers (see answer_cache.py)
+def _start_answer_cache():
+    cache = answer_cache.AnswerCache()
+    # Dropped together with the cached search results when ingest.py rewrites a ticker's filing
+    tools_module.search_cache.get().subscribe(cache.invalidate_ticker)
+    return cache
+
+answers = startup.Lazy("answer cache", _start_answer_cache)
+
+async def lookup_answer(question):
+    """
+    Checks the answer cache before the graph runs. Returns the CachedAnswer (or
+    None) and the key to pass to remember_answer() after a miss.
+    """
+    tickers = answer_cache.question_tickers(question)
+    if not answer_cache.ANSWER_CACHE or not tickers:
+        return None, None
+    # Years, quarters and numbers must match exactly: the embedding barely sees them
+    qualifiers = answer_cache.question_qualifiers(question)
+    cache = await answers.aget()
+    # Read before the turn runs: a re-ingest during the turn makes remember_answer() drop its answer
+    generation = cache.generation(tickers)
+    with tracing.span("answer_cache.lookup", tickers=list(tickers), qualifiers=list(qualifiers)) as span:
+        # The question vector goes through the search cache's query-vector level, like search_10k's queries
+        search_cache = await tools_module.search_cache.aget()
+        vector = await asyncio.get_running_loop().run_in_executor(
+            tools_module.embed_executor, contextvars.copy_context().run,
+            search_cache.query_vector, question, lambda q: tools_module.embeddings.get().embed_query(q)
+        )
+        hit, similarity = cache.lookup(tickers, vector, qualifiers)
+        span.set(hit=hit is not None, similarity=round(similarity, 4))
+    return hit, (tickers, qualifiers, vector, generation)
+
+def remember_answer(question, key, turn_messages, seconds):
+    """Stores the answer of a turn (the messages after the question) if it is cacheable."""
+    if key is None:
+        return False
+    tickers, qualifiers, vector, generation = key
+    record = answer_cache.turn_record(turn_messages)
+    # The tools must have looked at exactly the tickers the question names
+    if record is None or record[2] != tickers:
+        return False
+    answer, excerpts, _ = record
+    return answers.get().put(tickers, question, vector, answer, excerpts, seconds, qualifiers, generation) is not None
+
+def format_cache_hit(hit):
+    stats = answers.get().stats()
+    return (f"   ⚡ Cached answer to '{hit.question[:80]}' ({len(hit.excerpts)} supporting excerpts, "
+            f"~{hit.seconds:.1f}s saved; hit rate {stats['hit_rate']:.0%}, {stats['saved_s']:.1f}s saved in total)")
 
 # --- RUN IT ---
-if __name__ == "__main__":
+async def main():
     print("--- 🤖 Financial Agent MVP (Type 'quit' to exit) ---")
+    if AGENT_WARMUP:
+        # Loads while the user types; the first question only waits for what is still missing
+        warm_up()
+        llm_with_tools.warm_up()
+    first_answer = True
+    history = []  # The whole conversation; memory.py decides what the LLM sees of it
     
     while True:
-        user_input = input("User: ")
+        # input() blocks, so keep it off the event loop
+        user_input = await asyncio.to_thread(input, "User: ")
         if user_input.lower() in ["quit", "exit"]:
             break
         
-        # FIX: Use HumanMessage object instead of a tuple ("user", input)
-        # This ensures 'last_msg' always has a .type attribute
-        events = graph.stream(
-            {"messages": [HumanMessage(content=user_input)]},
-            stream_mode="values"
-        )
-        
-        for event in events:
-            if "messages" in event:
-                # Get the last message in the list
-                last_msg = event["messages"][-1]
-                
-                # Check if it is actually a Message object (has a 'type')
-                # This protects against any initial state weirdness
-                if hasattr(last_msg, "type") and last_msg.type == "ai":
-                    print(f"Agent: {last_msg.content}")
+        # One trace per question (TRACE_JSONL / TRACE_CHROME, see tracing.py)
+        with tracing.span("turn", question=user_input[:200]):
+            # A rephrasing of an earlier question about the same tickers is answered from the cache
+            hit, cache_key = await lookup_answer(user_input)
+            if hit is not None:
+                print(f"Agent: {hit.answer}")
+                print(format_cache_hit(hit))
+                history = history + [HumanMessage(content=user_input), AIMessage(content=hit.answer)]
+            else:
+                started = time.perf_counter()
+                asked_at = len(history) + 1
+                # "messages" streams the reasoner's tokens, "updates" carries its metrics, "values" the full state
+                events = graph.astream(
+                    {"messages": history + [HumanMessage(content=user_input)]},
+                    stream_mode=["messages", "updates", "values"]
+                )
+            
+                answering = False
+                async for mode, payload in events:
+                    if mode == "messages":
+                        chunk, metadata = payload
+                        # Only answer text is printed; tool-call chunks are shown by the tools themselves
+                        if metadata.get("langgraph_node") == "reasoner" and chunk.content:
+                            if not answering:
+                                print("Agent: ", end="", flush=True)
+                                answering = True
+                            print(chunk.content, end="", flush=True)
+                    elif mode == "updates" and payload.get("reasoner"):
+                        if answering:
+                            print()
+                            answering = False
+                        print(format_metrics(payload["reasoner"]["metrics"][-1]))
+                    elif mode == "values":
+                        history = payload["messages"]
+                remember_answer(user_input, cache_key, history[asked_at:], time.perf_counter() - started)
+        tracing.flush()
+
+        if first_answer:
+            first_answer = False
+            startup.mark("first answer")
+            if startup.PROFILE_STARTUP:
+                startup.report()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,228 @@
+# answer_cache.py
+"""
+Semantic cache of final answers, in front of the agent graph.
+
+Analysts ask the same questions in different words ("What are AAPL's supply
+chain risks?" / "AAPL supplier risk?"). Each one costs a full reasoner ->
+search_10k -> reasoner loop. This cache keeps the final answer of a turn and the
+excerpts it was based on. It is keyed by the tickers named in the question plus
+the question's embedding. A later question about the same tickers whose
+embedding is within ANSWER_CACHE_THRESHOLD cosine similarity gets the stored
+answer right away. The key also holds the years, quarters and other numbers the
+question names (question_qualifiers()): "AAPL revenue in 2022" and "... in
+2023" embed far above the threshold but must not share an answer.
+
+Only answers that depend on the filings alone are stored. The turn must have
+used search_10k / search_10k_multi / lookup_financial_value (never
+get_stock_price: prices move) on exactly the tickers the question names,
+without tool errors. Entries are
+dropped when one of their tickers is re-ingested: SearchCache.subscribe()
+forwards the pgvector NOTIFY / embedded-store watcher signal. A turn that was
+running during the re-ingest is not stored: put() compares the tickers'
+generation (bumped by every invalidation) with the one read when the turn
+started. The cache is an
+LRU of at most ANSWER_CACHE_MAX_ENTRIES answers with a TTL.
+
+stats() reports hits, misses, hit rate and the latency saved (the original turn
+time minus the lookup time, summed over hits).
+"""
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+
+ANSWER_CACHE = os.getenv("ANSWER_CACHE", "1") == "1"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", 0.9))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", 1000))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", 24 * 3600))
+CACHEABLE_TOOLS = {"search_10k", "search_10k_multi", "lookup_financial_value"}
+
+TICKER_RE = re.compile(r"\b[A-Z]{1,5}(?:\.[A-Z])?\b")
+# Capitalized words that are not tickers
+NOT_TICKERS = {"A", "I", "AI", "CEO", "CFO", "COO", "EPS", "SEC", "USA", "US", "IPO", "ESG", "FY", "Q1", "Q2", "Q3",
+               "Q4", "GAAP", "EBIT", "EBITDA", "ROE", "ROI", "R", "D", "M", "WHAT", "HOW", "WHY", "IS", "THE"}
+
+
+# Qualifiers, read in this order; each match is blanked before the next pattern runs
+FORM_RE = re.compile(r"\b(?:10-K|10-Q|8-K)\b", re.IGNORECASE)   # Form names are not numbers of the question
+QUARTER_RE = re.compile(r"\bQ([1-4])\b|\b([1-4])Q\b|\b(first|second|third|fourth)[\s-]+quarter\b", re.IGNORECASE)
+FISCAL_YEAR_RE = re.compile(r"\bFY\s?'?(\d{2}|\d{4})\b", re.IGNORECASE)
+YEAR_RE = re.compile(r"\b(?:19|20)\d{2}\b")
+NUMBER_RE = re.compile(r"\b\d+(?:[.,]\d+)*\b")
+QUARTER_WORDS = {"first": "1", "second": "2", "third": "3", "fourth": "4"}
+
+
+def question_tickers(question):
+    """The tickers named in a question, as a sorted tuple (the cache key)."""
+    # "10-K" would otherwise name the ticker K
+    return tuple(sorted({t for t in TICKER_RE.findall(FORM_RE.sub(" ", question)) if t not in NOT_TICKERS}))
+
+
+def question_qualifiers(question):
+    """
+    The quarters ("Q3"), years ("2023", FY23 included) and other numbers a
+    question names, as a sorted tuple: the rest of the cache key.
+    """
+    text = FORM_RE.sub(" ", question)
+    found = set()
+    for match in QUARTER_RE.finditer(text):
+        number = match.group(1) or match.group(2) or QUARTER_WORDS[match.group(3).lower()]
+        found.add(f"Q{number}")
+    text = QUARTER_RE.sub(" ", text)
+    for match in FISCAL_YEAR_RE.finditer(text):
+        year = match.group(1)
+        found.add(year if len(year) == 4 else f"20{year}")
+    text = FISCAL_YEAR_RE.sub(" ", text)
+    found.update(YEAR_RE.findall(text))
+    text = YEAR_RE.sub(" ", text)
+    found.update(number.replace(",", "") for number in NUMBER_RE.findall(text))
+    return tuple(sorted(found))
+
+
+def turn_record(messages):
+    """
+    (answer, excerpts, tickers) for the messages one turn added (after the
+    question), or None if the turn is not cacheable.
+    """
+    if not messages or getattr(messages[-1], "tool_calls", None) or not messages[-1].content:
+        return None
+    calls = [call for m in messages for call in (getattr(m, "tool_calls", None) or [])]
+    if not calls or any(call["name"] not in CACHEABLE_TOOLS for call in calls):
+        return None
+    results = [m for m in messages if m.type == "tool"]
+    if any(str(m.content).startswith("Error") for m in results):
+        return None
+    excerpts = [{"tool": m.name, "content": str(m.content)} for m in results]
+    # search_10k_multi names its tickers in a list
+    tickers = tuple(sorted({str(ticker).strip().upper() for call in calls
+                            for ticker in call["args"].get("tickers") or [call["args"].get("ticker", "")]}))
+    return str(messages[-1].content), excerpts, tickers
+
+
+class CachedAnswer:
+    __slots__ = ("key", "tickers", "qualifiers", "question", "vector", "answer", "excerpts", "seconds", "created", "hits")
+
+    def __init__(self, key, tickers, qualifiers, question, vector, answer, excerpts, seconds):
+        self.key = key
+        self.tickers = tickers
+        self.qualifiers = qualifiers
+        self.question = question
+        self.vector = vector
+        self.answer = answer
+        self.excerpts = excerpts
+        self.seconds = seconds
+        self.created = time.time()
+        self.hits = 0
+
+
+class AnswerCache:
+    """Thread-safe; shared by every session of the process."""
+
+    def __init__(self, threshold=ANSWER_CACHE_THRESHOLD, max_entries=ANSWER_CACHE_MAX_ENTRIES,
+                 ttl_seconds=ANSWER_CACHE_TTL):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> CachedAnswer, least recently used first
+        self._by_group = {}            # (tickers, qualifiers) -> {key: CachedAnswer}
+        self._next_key = 0
+        self._generations = {}         # ticker -> invalidations so far (None: invalidate-all)
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+        self.evicted = 0
+        self.stale_skipped = 0
+        self.saved_seconds = 0.0
+        self.lookup_seconds = 0.0
+
+    def lookup(self, tickers, vector, qualifiers=()):
+        """
+        Returns (CachedAnswer, similarity) of the closest stored question with the
+        same tickers and qualifiers, or (None, best similarity).
+        """
+        start = time.perf_counter()
+        with self._lock:
+            candidates = [e for e in self._by_group.get((tickers, qualifiers), {}).values()
+                          if time.time() - e.created < self.ttl_seconds]
+            best, similarity = None, 0.0
+            if candidates:
+                query = np.asarray(vector, dtype=np.float32)
+                query /= np.linalg.norm(query) or 1.0
+                scores = np.stack([e.vector for e in candidates]) @ query
+                i = int(np.argmax(scores))
+                best, similarity = candidates[i], float(scores[i])
+            elapsed = time.perf_counter() - start
+            self.lookup_seconds += elapsed
+            if best is None or similarity < self.threshold:
+                self.misses += 1
+                return None, similarity
+            self._entries.move_to_end(best.key)
+            best.hits += 1
+            self.hits += 1
+            self.saved_seconds += max(best.seconds - elapsed, 0.0)
+            return best, similarity
+
+    def generation(self, tickers):
+        """Changes whenever one of the tickers is invalidated: read before a turn, passed to put()."""
+        with self._lock:
+            return self._generation(tickers)
+
+    def _generation(self, tickers):
+        return (self._generations.get(None, 0),) + tuple(self._generations.get(t, 0) for t in tickers)
+
+    def put(self, tickers, question, vector, answer, excerpts, seconds, qualifiers=(), generation=None):
+        """Stores an answer; returns None without storing it if the tickers were invalidated since generation."""
+        vector = np.asarray(vector, dtype=np.float32)
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+        with self._lock:
+            if generation is not None and generation != self._generation(tickers):
+                # The filing changed while the turn ran: the answer may quote the old chunks
+                self.stale_skipped += 1
+                return None
+            key = self._next_key
+            self._next_key += 1
+            entry = CachedAnswer(key, tickers, qualifiers, question, vector, answer, excerpts, seconds)
+            self._entries[key] = entry
+            self._by_group.setdefault((tickers, qualifiers), {})[key] = entry
+            while len(self._entries) > self.max_entries:
+                _, oldest = self._entries.popitem(last=False)
+                self._unindex(oldest)
+                self.evicted += 1
+        return entry
+
+    def _unindex(self, entry):
+        group = self._by_group.get((entry.tickers, entry.qualifiers))
+        if group is not None:
+            group.pop(entry.key, None)
+            if not group:
+                del self._by_group[(entry.tickers, entry.qualifiers)]
+
+    def invalidate_ticker(self, ticker):
+        """Drops every answer that involves ticker (None: all answers). Returns how many."""
+        with self._lock:
+            self._generations[ticker] = self._generations.get(ticker, 0) + 1
+            stale = [e for e in self._entries.values() if ticker is None or ticker in e.tickers]
+            for entry in stale:
+                del self._entries[entry.key]
+                self._unindex(entry)
+            self.invalidated += len(stale)
+            return len(stale)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "saved_s": self.saved_seconds,
+                "mean_lookup_ms": self.lookup_seconds / lookups * 1000 if lookups else 0.0,
+                "invalidated": self.invalidated,
+                "evicted": self.evicted,
+                "stale_skipped": self.stale_skipped,
+                "threshold": self.threshold,
+            }
@@ -0,0 +1,199 @@
+"""
+Semantic answer cache (answer_cache.py): hit rate, false hits and latency saved
+on a skewed stream of rephrased analyst questions.
+
+Questions come from families: one (ticker, topic) pair, asked with several
+phrasings ("What are ZAAB's main supply chain risks?", "ZAAB supply chain
+risks: what does the 10-K say?", ...). Near-miss families ask for one metric
+in one fiscal year ("What was ZAAB's revenue in 2023?" / "ZAAB revenue for
+FY23?"): families that differ only in the year or quarter embed almost alike,
+and answering one with the other's answer is the cache's worst failure.
+Families are drawn with a Zipf distribution (--zipf), like a desk where a few
+names and topics get most of the questions. Every question is a new session on the server (server.py,
+in-process) with the stub model (stub_llm.py) over a synthetic corpus, hash
+embeddings as in run_suite.py.
+
+Reported per --thresholds value:
+  hit rate     answers served from the cache
+  false hits   hits whose cached question belongs to another family (a wrong answer)
+  near misses  the false hits whose family differs only in the period
+  turn p50     for hits and for misses
+  saved        the cache's own estimate: original turn time minus lookup, summed
+
+The hash embedder only sees shared words, so rephrasings with different words
+score lower than with a sentence model: the hit rate here is a lower bound for
+the same threshold.
+
+Usage:
+    python benchmarks/bench_answer_cache.py
+    python benchmarks/bench_answer_cache.py --questions 500 --thresholds 0.8 0.85 0.9 0.95 --zipf 1.2
+    python benchmarks/bench_answer_cache.py --filings 50 --json answer_cache.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+import contextlib
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+TOPICS = ["supply chain risks", "revenue drivers", "gross margin trends", "competitive pressures",
+          "regulatory risks", "capital allocation priorities"]
+PHRASINGS = ["What are {ticker}'s main {topic}?",
+             "what are {ticker}'s main {topic}",
+             "What are the main {topic} for {ticker}?",
+             "Summarize {ticker}'s {topic}.",
+             "{ticker} {topic}: what does the 10-K say?"]
+# Near-miss families: (metric, period) pairs that differ only in the year or quarter
+METRICS = ["revenue", "operating income", "net income"]
+PERIODS = [("2023", "FY23"), ("2022", "FY22"), ("the third quarter of 2023", "Q3 FY23"),
+           ("the fourth quarter of 2023", "Q4 FY23")]
+PERIOD_PHRASINGS = ["What was {ticker}'s {metric} in {period}?",
+                    "what was {ticker}'s {metric} in {period}",
+                    "How much {metric} did {ticker} report for {short}?",
+                    "{ticker} {metric} {short}: what does the 10-K say?"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filings", type=int, default=10, help="Synthetic filings (one ticker each)")
+    parser.add_argument("--questions", type=int, default=200, help="Questions per threshold")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.8, 0.9, 0.95])
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent of the family draw")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--ttft", type=float, default=0.2, help="Stub model time to first token")
+    parser.add_argument("--tokens-per-s", type=float, default=200, help="Stub model output speed")
+    parser.add_argument("--answer-tokens", type=int, default=80)
+    parser.add_argument("--json", help="Write the results to this file")
+    return parser.parse_args()
+
+
+def question_stream(tickers, count, zipf, seed):
+    """
+    ([(family, question)], families): Zipf-ranked (ticker, topic, period)
+    families, a random phrasing each time. Topic families have no period.
+    """
+    rng = np.random.default_rng(seed)
+    families = [(ticker, topic, None) for ticker in tickers for topic in TOPICS]
+    families += [(ticker, metric, period) for ticker in tickers for metric in METRICS for period in PERIODS]
+    rng.shuffle(families)
+    weights = 1.0 / np.arange(1, len(families) + 1) ** zipf
+    draws = rng.choice(len(families), size=count, p=weights / weights.sum())
+    stream = []
+    for i in draws:
+        ticker, topic, period = families[i]
+        if period is None:
+            phrasing = PHRASINGS[rng.integers(len(PHRASINGS))]
+            stream.append((int(i), phrasing.format(ticker=ticker, topic=topic)))
+        else:
+            phrasing = PERIOD_PHRASINGS[rng.integers(len(PERIOD_PHRASINGS))]
+            stream.append((int(i), phrasing.format(ticker=ticker, metric=topic, period=period[0], short=period[1])))
+    return stream, families
+
+
+async def run_threshold(server, stream, families):
+    import httpx
+    family_of = {question: family for family, question in stream}
+    hits, misses, false_hits, near_misses = [], [], 0, 0
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://bench",
+                                 timeout=600) as client:
+        for family, question in stream:
+            session_id = (await client.post("/sessions")).json()["session_id"]
+            start = time.perf_counter()
+            reply = (await client.post(f"/sessions/{session_id}/messages", json={"message": question})).json()
+            elapsed = time.perf_counter() - start
+            if reply.get("cached"):
+                hits.append(elapsed)
+                cached = family_of.get(reply["cached_question"])
+                if cached != family:
+                    false_hits += 1
+                    # Same ticker and metric, another year or quarter
+                    near_misses += cached is not None and families[cached][:2] == families[family][:2]
+            else:
+                misses.append(elapsed)
+            await client.delete(f"/sessions/{session_id}")
+        stats = (await client.get("/health")).json()["answer_cache"]
+
+    ms = lambda values: float(np.percentile(np.array(values) * 1000, 50)) if values else None  # noqa: E731
+    return {
+        "questions": len(stream),
+        "hits": len(hits),
+        "hit_rate": len(hits) / len(stream),
+        "false_hits": false_hits,
+        "false_hit_rate": false_hits / len(hits) if hits else 0.0,
+        "near_miss_false_hits": near_misses,
+        "hit_p50_ms": ms(hits),
+        "miss_p50_ms": ms(misses),
+        "wall_s": sum(hits) + sum(misses),
+        "saved_s": stats["saved_s"],
+        "entries": stats["entries"],
+    }
+
+
+def main():
+    args = parse_args()
+    # Read by agent.py / server.py / stub_llm.py at import
+    os.environ.update(LLM_BACKEND="stub", AGENT_WARMUP="0", CHECKPOINTER="memory", ANSWER_CACHE="1",
+                      STUB_LLM_TTFT=str(args.ttft), STUB_LLM_TOKENS_PER_S=str(args.tokens_per_s),
+                      STUB_LLM_ANSWER_TOKENS=str(args.answer_tokens))
+    sys.path.insert(0, BENCH_DIR)
+    import run_suite  # Sets up the import paths; reused for the scratch corpus and backend
+    import answer_cache
+    import server
+    agent, startup, tools = run_suite.agent, run_suite.startup, run_suite.tools
+
+    workdir = tempfile.mkdtemp(prefix="bench_answer_cache_")
+    md_files = run_suite.synth_corpus.generate(os.path.join(workdir, "corpus"), args.filings)
+    tickers = [os.path.splitext(os.path.basename(p))[0] for p in md_files]
+    embeddings = run_suite.HashEmbeddings()
+    backend = run_suite.open_scratch_backend("embedded", args.filings, os.path.join(workdir, "store"))
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        run_suite.run_ingest(backend, md_files, embeddings, "hnsw")
+    tools.embeddings = startup.Lazy("embedding model", lambda: embeddings)
+    tools.backend = startup.Lazy("vector backend", lambda: backend)
+
+    stream, families = question_stream(tickers, args.questions, args.zipf, args.seed)
+    results = {"filings": args.filings, "questions": args.questions, "zipf": args.zipf,
+               "families": len(set(family for family, _ in stream)),
+               "near_miss_families": len(set(family for family, _ in stream if families[family][2] is not None)),
+               "stub": {"ttft_s": args.ttft, "tokens_per_s": args.tokens_per_s, "answer_tokens": args.answer_tokens},
+               "levels": []}
+
+    async def run_all():
+        async with server.lifespan(server.app):
+            for threshold in args.thresholds:
+                # A fresh cache (and search cache) per threshold, so every run starts cold
+                agent.answers = startup.Lazy("answer cache",
+                                             lambda: answer_cache.AnswerCache(threshold=threshold))
+                tools.search_cache = startup.Lazy("search cache", run_suite.SearchCache)
+                level = await run_threshold(server, stream, families)
+                results["levels"].append({"threshold": threshold, **level})
+
+    try:
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            asyncio.run(run_all())
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"\n{results['questions']} questions from {results['families']} families "
+          f"({results['near_miss_families']} with a period, zipf {args.zipf})")
+    print(f"{'threshold':>9} {'hit rate':>8} {'false hits':>10} {'near misses':>11} {'hit p50':>9} {'miss p50':>9} "
+          f"{'wall':>8} {'saved':>8}")
+    for r in results["levels"]:
+        hit_p50 = f"{r['hit_p50_ms']:7.1f}ms" if r["hit_p50_ms"] is not None else f"{'-':>9}"
+        miss_p50 = f"{r['miss_p50_ms']:7.0f}ms" if r["miss_p50_ms"] is not None else f"{'-':>9}"
+        print(f"{r['threshold']:9.2f} {r['hit_rate']:8.0%} {r['false_hits']:10d} {r['near_miss_false_hits']:11d} "
+              f"{hit_p50} {miss_p50} {r['wall_s']:7.1f}s {r['saved_s']:7.1f}s")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Embedded vector store vs PGVector: ticker-filtered top-k latency and recall.
+
+Builds the same synthetic corpus (clustered unit vectors, so approximate search
+behaves roughly like it does on real embeddings) in:
+  embedded exact   embedded_store.py, brute-force dot products per ticker shard
+  embedded ivf     the same shards with IVF lists, searching --nprobe lists
+  pgvector         langchain_pg_embedding with HNSW + ticker partitions (pgstore.py)
+and runs the search_10k query shape (one ticker, k=15) against each through the
+vector_backends search() call, so Document construction is timed on both sides.
+Recall@k is measured against exact numpy results.
+
+Usage:
+    python benchmarks/bench_embedded.py --tickers 50 --chunks-per-ticker 4000
+    python benchmarks/bench_embedded.py --skip-pg        # no database needed
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pgstore  # noqa: E402
+import embedded_store  # noqa: E402
+import vector_backends  # noqa: E402
+
+BENCH_COLLECTION = "bench_embedded"
+TEXT = "Net revenue increased primarily due to higher services revenue and favorable pricing. " * 11  # ~1000 chars
+
+
+def ticker_corpus(ticker, rows, dim, rng, topics=32):
+    centers = rng.standard_normal((topics, dim), dtype=np.float32)
+    vectors = centers[rng.integers(topics, size=rows)] + 0.6 * rng.standard_normal((rows, dim), dtype=np.float32)
+    vectors = embedded_store.normalize_rows(vectors)
+    chunks = [(f"{ticker}-{i}", f"{i} {TEXT}", {"ticker": ticker, "source": f"mds/{ticker}.md"}) for i in range(rows)]
+    return chunks, vectors
+
+
+def measure(search, queries, truth, k):
+    latencies, recalls = [], []
+    for (vector, ticker), expected in zip(queries, truth):
+        start = time.perf_counter()
+        hits = search(vector, k, ticker)
+        latencies.append(time.perf_counter() - start)
+        recalls.append(len({doc.id for doc, _ in hits} & set(expected)) / k)
+    latencies = np.array(latencies) * 1000
+    return {
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        f"recall@{k}": float(np.mean(recalls)),
+    }
+
+
+def folder_bytes(folder):
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(folder) for f in files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=50)
+    parser.add_argument("--chunks-per-ticker", type=int, default=4000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=15)
+    parser.add_argument("--nprobe", type=int, default=8, help="IVF lists searched by the embedded approximate mode")
+    parser.add_argument("--ef-search", type=int, default=40, help="hnsw.ef_search for pgvector")
+    parser.add_argument("--skip-pg", action="store_true", help="Only benchmark the embedded store")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    corpus = {}
+    for t in range(args.tickers):
+        ticker = f"T{t:03d}"
+        corpus[ticker] = ticker_corpus(ticker, args.chunks_per_ticker, args.dim, rng)
+
+    # Queries near real rows (a question about something the filing covers)
+    query_rng = np.random.default_rng(42)
+    queries = []
+    for _ in range(args.queries):
+        ticker = f"T{query_rng.integers(args.tickers):03d}"
+        row = corpus[ticker][1][query_rng.integers(args.chunks_per_ticker)]
+        queries.append((embedded_store.normalize_rows(row + 0.5 * query_rng.standard_normal(args.dim)), ticker))
+    truth = []
+    for vector, ticker in queries:
+        chunks, vectors = corpus[ticker]
+        truth.append([chunks[i][0] for i in embedded_store.top_k(vectors @ vector, args.k)])
+
+    results = {"tickers": args.tickers, "chunks_per_ticker": args.chunks_per_ticker, "dim": args.dim}
+    root = tempfile.mkdtemp(prefix="bench_embedded_")
+    try:
+        # 1. EMBEDDED
+        backend = vector_backends.EmbeddedBackend(BENCH_COLLECTION, root=root)
+        start = time.perf_counter()
+        for ticker, (chunks, vectors) in corpus.items():
+            filing = {"ticker": ticker, "chunk_ids": [cid for cid, _, _ in chunks]}
+            backend.apply_filing_diff(filing, chunks, vectors, stale_ids=None)
+        results["embedded_load_rows_per_s"] = args.tickers * args.chunks_per_ticker / (time.perf_counter() - start)
+        results["embedded_disk_mb"] = folder_bytes(root) / 1e6
+        backend.warm_up()
+        results["embedded_exact"] = measure(lambda v, k, t: backend.search(v, k, t, nprobe=0), queries, truth, args.k)
+
+        start = time.perf_counter()
+        backend.store.build_indexes()
+        results["embedded_ivf_build_s"] = time.perf_counter() - start
+        backend.warm_up()
+        results["embedded_ivf"] = measure(lambda v, k, t: backend.search(v, k, t, nprobe=args.nprobe),
+                                          queries, truth, args.k)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    # 2. PGVECTOR
+    if not args.skip_pg:
+        conn = pgstore.connect()
+        pgstore.ensure_schema(conn)
+        pgstore.delete_collection(conn, BENCH_COLLECTION)
+        collection_id = pgstore.create_collection(conn, BENCH_COLLECTION)
+        try:
+            start = time.perf_counter()
+            for chunks, vectors in corpus.values():
+                with conn.transaction():
+                    with conn.cursor() as cur:
+                        pgstore.copy_chunks(cur, collection_id, chunks, vectors)
+            results["pgvector_load_rows_per_s"] = args.tickers * args.chunks_per_ticker / (time.perf_counter() - start)
+            conn.execute("ANALYZE langchain_pg_embedding")
+            pgstore.ensure_indexes(conn, collection_id, args.dim, method="hnsw")
+            pgstore.ensure_ticker_partitions(conn, collection_id, args.dim, corpus.keys())
+            search = lambda v, k, t: pgstore.similarity_search(conn, collection_id, v, k=k, ticker=t,  # noqa: E731
+                                                                ef_search=args.ef_search)
+            measure(search, queries[:20], truth[:20], args.k)  # warm-up
+            results["pgvector"] = measure(search, queries, truth, args.k)
+        finally:
+            pgstore.drop_ticker_partitions(conn, collection_id)
+            pgstore.drop_ann_indexes(conn, collection_id)
+            pgstore.delete_collection(conn, BENCH_COLLECTION)
+            conn.close()
+
+    for layout in ("embedded_exact", "embedded_ivf", "pgvector"):
+        if layout in results:
+            r = results[layout]
+            print(f"{layout:<15} p50 {r['p50_ms']:7.3f} ms  p99 {r['p99_ms']:7.3f} ms  recall@{args.k} {r[f'recall@{args.k}']:.3f}")
+    for key in ("embedded_load_rows_per_s", "pgvector_load_rows_per_s"):
+        if key in results:
+            print(f"{key}: {results[key]:,.0f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Query-embedding throughput with and without micro-batching (embedding_service.py).
+
+At each --concurrency level, that many threads (the async tools run the
+embedding on embed_executor threads) embed --requests distinct queries:
+  direct   model.embed_query per call, batch of one each time
+  batched  EmbeddingService.embed_query: concurrent calls share forward passes
+
+Reported per level and mode: queries/s, per-query latency p50 / p99, and for
+the service the batch-size histogram and queue wait.
+
+Usage:
+    python benchmarks/bench_embedding_service.py
+    python benchmarks/bench_embedding_service.py --model all-mpnet-base-v2 --concurrency 1 8 64 --requests 512
+    python benchmarks/bench_embedding_service.py --max-batch 16 --max-wait-ms 2 --json embed_service.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import embedding_service  # noqa: E402
+
+TOPICS = ["supply chain risks", "revenue growth by segment", "gross margin drivers", "foreign currency exposure",
+          "share repurchases and dividends", "cybersecurity incidents", "litigation and regulatory matters",
+          "capital expenditures outlook"]
+TICKERS = ["AAPL", "MSFT", "NVDA", "GOOGL", "AMZN", "META", "KO", "WMT", "JPM", "XOM", "PFE", "CAT"]
+
+
+def queries(n):
+    """Distinct, search_10k-sized queries (no two identical, so nothing is deduplicated)."""
+    return [f"What does the {TICKERS[i % len(TICKERS)]} 10-K say about {TOPICS[i // len(TICKERS) % len(TOPICS)]} "
+            f"in fiscal {2015 + i % 10}, and how did management describe the outlook? (request {i})"
+            for i in range(n)]
+
+
+def run(embed_query, texts, concurrency):
+    def timed(text):
+        start = time.perf_counter()
+        embed_query(text)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = np.array(list(pool.map(timed, texts))) * 1000
+    wall = time.perf_counter() - start
+    return {
+        "queries_per_s": len(texts) / wall,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="Embedding model (tools.py uses all-MiniLM-L6-v2)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--requests", type=int, default=256, help="Queries per level and mode")
+    parser.add_argument("--max-batch", type=int, default=embedding_service.EMBED_MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=embedding_service.EMBED_MAX_WAIT_MS)
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    from langchain_huggingface import HuggingFaceEmbeddings
+    model = HuggingFaceEmbeddings(model_name=args.model)
+    service = embedding_service.EmbeddingService(model, max_batch_size=args.max_batch, max_wait_ms=args.max_wait_ms)
+    texts = queries(args.requests)
+    model.embed_documents(texts[:args.max_batch])  # Warm-up
+
+    results = {"model": args.model, "requests": args.requests, "max_batch": args.max_batch,
+               "max_wait_ms": args.max_wait_ms, "levels": []}
+    for concurrency in args.concurrency:
+        direct = run(model.embed_query, texts, concurrency)
+        service.reset_stats()
+        batched = run(service.embed_query, texts, concurrency)
+        batched["service"] = service.stats()
+        results["levels"].append({"concurrency": concurrency, "direct": direct, "batched": batched,
+                                  "speedup": batched["queries_per_s"] / direct["queries_per_s"]})
+    service.close()
+
+    print(f"\n{'threads':>7} {'direct q/s':>10} {'p99':>8} {'batched q/s':>11} {'p99':>8} {'speedup':>7} "
+          f"{'mean batch':>10} {'wait p50':>8}")
+    for level in results["levels"]:
+        d, b, s = level["direct"], level["batched"], level["batched"]["service"]
+        print(f"{level['concurrency']:7d} {d['queries_per_s']:10.1f} {d['p99_ms']:6.1f}ms {b['queries_per_s']:11.1f} "
+              f"{b['p99_ms']:6.1f}ms {level['speedup']:6.2f}x {s['mean_batch_size']:10.1f} "
+              f"{s['queue_wait_p50_ms']:6.2f}ms")
+        print(f"        batch sizes: {s['batch_sizes']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
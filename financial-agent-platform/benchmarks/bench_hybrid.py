@@ -0,0 +1,160 @@
+"""
+Retrieval quality of vector-only vs hybrid (vector + lexical, RRF) search_10k.
+
+Splits the labeled filings in corpus/retrieval/filings with ingest.py's splitter,
+embeds them with the real model and loads them into one backend. Each query in
+corpus/retrieval/queries.jsonl names a ticker and the text a correct chunk must
+contain; a query counts as a hit@n when any of the top n chunks contains it.
+The queries mix plain-language questions with exact-token ones (amounts, line
+items, product and program names), which is where embeddings alone tend to slip.
+
+Modes:
+  vector   backend.search(), what search_10k did before hybrid retrieval
+  lexical  backend.lexical_search() alone (tsvector / BM25)
+  hybrid   vector_backends.hybrid_search(), the SEARCH_MODE=hybrid default
+
+Usage:
+    python benchmarks/bench_hybrid.py                        # embedded backend, temp dir
+    python benchmarks/bench_hybrid.py --backend pgvector     # scratch Postgres collection
+    python benchmarks/bench_hybrid.py --model all-mpnet-base-v2 --json hybrid.json
+"""
+import os
+import sys
+import glob
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "datamaking"))
+import pgstore  # noqa: E402
+import vector_backends  # noqa: E402
+import ingest  # noqa: E402  (datamaking/ingest.py)
+from langchain_huggingface import HuggingFaceEmbeddings  # noqa: E402
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus", "retrieval")
+BENCH_COLLECTION = "bench_hybrid"
+MODES = ("vector", "lexical", "hybrid")
+HIT_AT = (1, 3, 5)
+
+
+def load_corpus(chunk_size, chunk_overlap):
+    # The fixture filings are short, so smaller chunks than production keep several per section
+    ingest.CHUNK_SIZE, ingest.CHUNK_OVERLAP = chunk_size, chunk_overlap
+    filings = {}
+    for path in sorted(glob.glob(os.path.join(CORPUS_DIR, "filings", "*.md"))):
+        ticker, chunks, _ = ingest.split_file(path)
+        filings[ticker] = chunks
+    with open(os.path.join(CORPUS_DIR, "queries.jsonl"), encoding="utf-8") as f:
+        queries = [json.loads(line) for line in f if line.strip()]
+    return filings, queries
+
+
+def load_backend(backend, filings, embeddings):
+    for ticker, chunks in filings.items():
+        vectors = np.asarray(embeddings.embed_documents([c.page_content for c in chunks]), dtype=np.float32)
+        rows = [(c.id, c.page_content, c.metadata) for c in chunks]
+        if backend.name == "embedded":
+            backend.apply_filing_diff({"ticker": ticker, "chunk_ids": [c.id for c in chunks]}, rows, vectors,
+                                      stale_ids=None)
+        else:
+            with backend.conn.transaction():
+                with backend.conn.cursor() as cur:
+                    pgstore.copy_chunks(cur, backend.collection_id, rows, vectors)
+    if backend.name == "pgvector":
+        backend.conn.execute("ANALYZE langchain_pg_embedding")
+        pgstore.ensure_text_index(backend.conn, backend.collection_id)
+
+
+def measure(search, queries, k):
+    hits = {n: 0 for n in HIT_AT}
+    reciprocal_ranks, latencies, misses = [], [], []
+    for q in queries:
+        start = time.perf_counter()
+        results = search(q)
+        latencies.append(time.perf_counter() - start)
+        rank = next((i for i, (doc, _) in enumerate(results[:k], start=1)
+                     if any(text in doc.page_content for text in q["expected"])), None)
+        for n in HIT_AT:
+            hits[n] += rank is not None and rank <= n
+        reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+        if rank is None:
+            misses.append(f"{q['ticker']}: {q['query']}")
+    latencies = np.array(latencies) * 1000
+    result = {f"hit@{n}": hits[n] / len(queries) for n in HIT_AT}
+    result.update({
+        f"mrr@{k}": float(np.mean(reciprocal_ranks)),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "misses": misses,
+    })
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=vector_backends.BACKENDS, default="embedded")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="Embedding model (tools.py uses all-MiniLM-L6-v2)")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--chunk-overlap", type=int, default=50)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--candidates", type=int, default=vector_backends.HYBRID_CANDIDATES,
+                        help="Results taken from each ranking before fusion")
+    parser.add_argument("--show-misses", action="store_true")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    filings, queries = load_corpus(args.chunk_size, args.chunk_overlap)
+    print(f"📄 {sum(len(c) for c in filings.values())} chunks from {len(filings)} filings, {len(queries)} queries")
+    embeddings = HuggingFaceEmbeddings(model_name=args.model)
+
+    root = tempfile.mkdtemp(prefix="bench_hybrid_")
+    if args.backend == "embedded":
+        backend = vector_backends.EmbeddedBackend(BENCH_COLLECTION, root=root)
+    else:
+        backend = vector_backends.PGVectorBackend(BENCH_COLLECTION)
+        pgstore.ensure_schema(backend.conn)
+        pgstore.delete_collection(backend.conn, BENCH_COLLECTION)
+        backend._collection_id = pgstore.create_collection(backend.conn, BENCH_COLLECTION)
+
+    results = {"backend": args.backend, "model": args.model, "k": args.k, "candidates": args.candidates,
+               "queries": len(queries), "modes": {}}
+    try:
+        load_backend(backend, filings, embeddings)
+        backend.warm_up()
+        vectors = {q["query"]: embeddings.embed_query(q["query"]) for q in queries}
+        searches = {
+            "vector": lambda q: backend.search(vectors[q["query"]], k=args.k, ticker=q["ticker"]),
+            "lexical": lambda q: backend.lexical_search(q["query"], k=args.k, ticker=q["ticker"]),
+            "hybrid": lambda q: vector_backends.hybrid_search(backend, q["query"], vectors[q["query"]], k=args.k,
+                                                              ticker=q["ticker"], candidates=args.candidates),
+        }
+        for mode in MODES:
+            measure(searches[mode], queries[:5], args.k)  # warm-up
+            results["modes"][mode] = measure(searches[mode], queries, args.k)
+    finally:
+        if args.backend == "pgvector":
+            pgstore.drop_text_index(backend.conn, backend.collection_id)
+            pgstore.delete_collection(backend.conn, BENCH_COLLECTION)
+        backend.close()
+        shutil.rmtree(root, ignore_errors=True)
+
+    for mode, r in results["modes"].items():
+        hit_rates = "  ".join(f"hit@{n} {r[f'hit@{n}']:.2f}" for n in HIT_AT)
+        print(f"{mode:<8} {hit_rates}  mrr@{args.k} {r[f'mrr@{args.k}']:.3f}  "
+              f"p50 {r['p50_ms']:6.2f} ms  p99 {r['p99_ms']:6.2f} ms")
+        if args.show_misses:
+            for miss in r["misses"]:
+                print(f"    ✗ {miss}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Regression check + benchmark for the HTML -> Markdown conversion in datamaking/markdown.py.
+
+1. REGRESSION: every corpus/markdown/*.html is converted with the streaming engine
+   and compared against the .md file next to it (--update rewrites them).
+2. BENCHMARK: the legacy and streaming engines each convert the same files in a
+   fresh process, so the reported peak RSS belongs to that engine alone. The
+   corpus is tiny, so synthetic 10 MB and 40 MB filings are benchmarked too: the
+   streaming engine's peak RSS should stay flat as the filing grows.
+
+Usage:
+    python benchmarks/bench_markdown.py                          # corpus + 10 MB and 40 MB filings
+    python benchmarks/bench_markdown.py --synthetic-mb 10 40 100
+    python benchmarks/bench_markdown.py --synthetic-mb           # corpus only
+    python benchmarks/bench_markdown.py --html ../datamaking/html10k
+"""
+import os
+import io
+import sys
+import glob
+import time
+import random
+import argparse
+import tempfile
+import resource
+import multiprocessing
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "datamaking"))
+import markdown  # noqa: E402  (datamaking/markdown.py, not the PyPI package)
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus", "markdown")
+
+
+def convert_streaming(path, out=None):
+    """Returns the Markdown, or writes it to 'out' (the benchmark, so RSS is not the output's)."""
+    buffer = io.StringIO() if out is None else out
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        markdown.stream_html_to_markdown(f, buffer)
+    return buffer.getvalue() if out is None else None
+
+
+def convert_streaming_to_file(path):
+    with open(os.devnull, 'w', encoding='utf-8') as out:
+        convert_streaming(path, out)
+
+
+def convert_legacy(path):
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        return markdown.convert_html_to_markdown_legacy(f.read())
+
+
+ENGINES = {"legacy": convert_legacy, "streaming": convert_streaming_to_file}
+
+
+def run_regression(update=False):
+    html_files = sorted(glob.glob(os.path.join(CORPUS_DIR, "*.html")))
+    failures = 0
+    for path in html_files:
+        expected_path = os.path.splitext(path)[0] + ".md"
+        actual = convert_streaming(path)
+        if update:
+            with open(expected_path, 'w', encoding='utf-8') as f:
+                f.write(actual)
+            print(f"  updated {os.path.basename(expected_path)}")
+            continue
+        with open(expected_path, 'r', encoding='utf-8') as f:
+            expected = f.read()
+        if actual != expected:
+            failures += 1
+            print(f"  ❌ {os.path.basename(path)} differs from {os.path.basename(expected_path)}")
+        else:
+            print(f"  ✅ {os.path.basename(path)}")
+    return failures
+
+
+def write_synthetic_filing(path, target_mb, seed=0):
+    """Writes an iXBRL-flavoured 10-K with repeated TOC links, hidden facts and split $ cells."""
+    rng = random.Random(seed)
+    target = target_mb * 1024 * 1024
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="utf-8"?><html><head><style>p{}</style></head><body>')
+        f.write('<div style="display:none"><ix:header>' + '<ix:hidden>fact</ix:hidden>' * 200 + '</ix:header></div>')
+        section = 0
+        while f.tell() < target:
+            section += 1
+            f.write(f'<div><a href="#toc"><span>Table of Contents</span></a></div>')
+            f.write(f'<div><span style="font-weight:bold">Item {section}. Section {section}</span></div>')
+            for _ in range(20):
+                words = " ".join(rng.choice(["revenue", "risk", "supply", "segment", "net", "income"]) for _ in range(60))
+                f.write(f'<div><font><span>{words}</span></font></div>')
+            f.write('<table><tr><td></td><td></td><td><b>2024</b></td><td></td><td></td><td><b>2023</b></td></tr>')
+            for row in range(30):
+                a, b = rng.randint(100, 99999), rng.randint(100, 99999)
+                f.write(f'<tr><td><span>Line item {row}</span></td><td>$</td><td>{a:,}</td><td></td>'
+                        f'<td>$</td><td>(</td><td>{b:,}</td><td>)</td></tr>')
+            f.write('</table>')
+        f.write('</body></html>')
+
+
+def _engine_worker(engine, paths, queue):
+    start = time.perf_counter()
+    total = 0
+    for path in paths:
+        total += os.path.getsize(path)
+        ENGINES[engine](path)
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is in KB on Linux
+    queue.put((elapsed, total, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+
+def run_benchmark(label, paths):
+    ctx = multiprocessing.get_context("spawn")
+    results = {}
+    for engine in ENGINES:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_engine_worker, args=(engine, paths, queue))
+        proc.start()
+        results[engine] = queue.get()
+        proc.join()
+
+    for engine, (elapsed, total, rss) in results.items():
+        print(f"{label:<16} {engine:<10} {elapsed:>8.2f} {total / elapsed / 1e6:>8.2f} "
+              f"{len(paths) / elapsed:>8.2f} {rss:>12.1f}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--update", action="store_true", help="Rewrite the expected .md files of the regression corpus")
+    parser.add_argument("--html", help="Folder of real .html filings to benchmark")
+    parser.add_argument("--synthetic-mb", type=int, nargs="*", default=[10, 40],
+                        help="Sizes of the synthetic filings to benchmark (none to skip them)")
+    args = parser.parse_args()
+
+    print("🔁 Regression corpus:")
+    failures = run_regression(update=args.update)
+
+    paths = sorted(glob.glob(os.path.join(CORPUS_DIR, "*.html")))
+    if args.html:
+        paths = sorted(glob.glob(os.path.join(args.html, "*.htm*")))
+
+    print(f"\n⏱️ Benchmarking {len(paths)} files + {len(args.synthetic_mb)} synthetic filings...")
+    print(f"\n{'input':<16} {'engine':<10} {'seconds':>8} {'MB/s':>8} {'files/s':>8} {'peak RSS MB':>12}")
+    run_benchmark("html10k" if args.html else "corpus", paths)
+
+    # One filing per run, so each peak RSS belongs to a single filing size
+    with tempfile.TemporaryDirectory() as tmp:
+        for size_mb in args.synthetic_mb:
+            synthetic = os.path.join(tmp, f"SYNTH_{size_mb}MB.html")
+            write_synthetic_filing(synthetic, size_mb)
+            run_benchmark(f"synthetic {size_mb} MB", [synthetic])
+            os.remove(synthetic)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
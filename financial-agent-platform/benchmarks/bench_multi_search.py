@@ -0,0 +1,145 @@
+"""
+Comparison questions with search_10k per company versus one search_10k_multi call.
+
+"Compare supply chain risks across A, B, C and D" runs through the agent graph
+(agent.py) with the scripted stub model (stub_llm.py) over a synthetic corpus
+(synth_corpus.py, hash embeddings as in run_suite.py), three ways:
+  sequential  one search_10k per reasoner call, a company at a time: N + 1 LLM
+              calls, each resending the conversation so far
+  parallel    all N search_10k calls in one reasoner response: 2 LLM calls,
+              N tool outputs of up to CONTEXT_TOKEN_BUDGET each
+  multi       one search_10k_multi call: 2 LLM calls, one grouped output under
+              MULTI_SEARCH_TOKEN_BUDGET
+
+The stub's time to first token grows with the prompt (--prefill-tokens-per-s),
+so resent context costs time as on a real model. Reported per number of
+companies and mode: LLM calls, prompt tokens summed over the LLM calls, and
+wall time per question (p50).
+
+Usage:
+    python benchmarks/bench_multi_search.py
+    python benchmarks/bench_multi_search.py --companies 2 4 8 --questions 10 --prefill-tokens-per-s 1000
+    python benchmarks/bench_multi_search.py --backend pgvector --json multi_search.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+import contextlib
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+MODES = ("sequential", "parallel", "multi")
+TOPIC = "supplier concentration and supply chain risks"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=("embedded", "pgvector"), default="embedded")
+    parser.add_argument("--filings", type=int, default=16, help="Synthetic filings (one ticker each)")
+    parser.add_argument("--companies", type=int, nargs="+", default=[2, 4, 8], help="Tickers per question")
+    parser.add_argument("--questions", type=int, default=5, help="Comparison questions per level and mode")
+    parser.add_argument("--ttft", type=float, default=0.2, help="Stub model time to first token, before prefill")
+    parser.add_argument("--prefill-tokens-per-s", type=float, default=2000, help="Stub model prompt reading speed")
+    parser.add_argument("--tokens-per-s", type=float, default=40, help="Stub model output speed")
+    parser.add_argument("--answer-tokens", type=int, default=150)
+    parser.add_argument("--json", help="Write the results to this file")
+    return parser.parse_args()
+
+
+def script(mode, tickers, answer_tokens):
+    """The stub's responses for one comparison question in the given mode."""
+    if mode == "sequential":
+        steps = [{"tool_calls": [{"name": "search_10k", "args": {"query": f"{ticker} {TOPIC}", "ticker": ticker}}]}
+                 for ticker in tickers]
+    elif mode == "parallel":
+        steps = [{"tool_calls": [{"name": "search_10k", "args": {"query": f"{ticker} {TOPIC}", "ticker": ticker}}
+                                 for ticker in tickers]}]
+    else:
+        steps = [{"tool_calls": [{"name": "search_10k_multi", "args": {"query": TOPIC, "tickers": tickers}}]}]
+    return steps + [{"content": " ".join(["Compared"] * answer_tokens)}]
+
+
+async def run_mode(mode, groups, args):
+    from langchain_core.messages import HumanMessage
+    import run_suite
+    agent, startup, tools = run_suite.agent, run_suite.startup, run_suite.tools
+    # Cold search cache per mode, so no mode reuses another's results
+    tools.search_cache = startup.Lazy("search cache", run_suite.SearchCache)
+    llm_calls, prompt_tokens, walls = [], [], []
+    for tickers in groups:
+        agent.llm_with_tools = startup.Lazy("llm client", lambda: run_suite.StubChatModel(
+            script=script(mode, tickers, args.answer_tokens), ttft=args.ttft, tokens_per_s=args.tokens_per_s,
+            prefill_tokens_per_s=args.prefill_tokens_per_s).bind_tools(agent.tools))
+        question = f"Compare {TOPIC} across {', '.join(tickers)}."
+        start = time.perf_counter()
+        state = await agent.graph.ainvoke({"messages": [HumanMessage(content=question)]})
+        walls.append(time.perf_counter() - start)
+        llm_calls.append(len(state["metrics"]))
+        prompt_tokens.append(sum(m["prompt_tokens"] for m in state["metrics"]))
+    return {
+        "llm_calls": float(np.mean(llm_calls)),
+        "prompt_tokens": float(np.mean(prompt_tokens)),
+        "wall_p50_ms": float(np.percentile(np.array(walls) * 1000, 50)),
+        "wall_mean_ms": float(np.mean(walls) * 1000),
+    }
+
+
+def main():
+    args = parse_args()
+    sys.path.insert(0, BENCH_DIR)
+    import run_suite  # Sets up the import paths and LLM_BACKEND=stub; reused for the scratch corpus and backend
+    tools, startup = run_suite.tools, run_suite.startup
+
+    workdir = tempfile.mkdtemp(prefix="bench_multi_search_")
+    md_files = run_suite.synth_corpus.generate(os.path.join(workdir, "corpus"), args.filings)
+    tickers = [os.path.splitext(os.path.basename(p))[0] for p in md_files]
+    embeddings = run_suite.HashEmbeddings()
+    backend = run_suite.open_scratch_backend(args.backend, args.filings, os.path.join(workdir, "store"))
+    results = {"backend": args.backend, "filings": args.filings, "questions": args.questions,
+               "stub": {"ttft_s": args.ttft, "prefill_tokens_per_s": args.prefill_tokens_per_s,
+                        "tokens_per_s": args.tokens_per_s, "answer_tokens": args.answer_tokens},
+               "levels": []}
+    rng = np.random.default_rng(0)
+
+    async def run_all():
+        for companies in args.companies:
+            groups = [[str(t) for t in rng.choice(tickers, size=min(companies, len(tickers)), replace=False)]
+                      for _ in range(args.questions)]
+            level = {"companies": companies}
+            for mode in MODES:
+                level[mode] = await run_mode(mode, groups, args)
+            results["levels"].append(level)
+        await backend.aclose()
+
+    try:
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            run_suite.run_ingest(backend, md_files, embeddings, "hnsw")
+            tools.embeddings = startup.Lazy("embedding model", lambda: embeddings)
+            tools.backend = startup.Lazy("vector backend", lambda: backend)
+            asyncio.run(run_all())
+    finally:
+        if args.backend == "pgvector":
+            run_suite.drop_scratch_collection(backend)
+            backend.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"\n{'companies':>9} {'mode':>10} {'LLM calls':>9} {'prompt tokens':>13} {'wall p50':>9} {'vs seq':>6}")
+    for level in results["levels"]:
+        for mode in MODES:
+            r = level[mode]
+            speedup = level["sequential"]["wall_mean_ms"] / r["wall_mean_ms"]
+            print(f"{level['companies']:9d} {mode:>10} {r['llm_calls']:9.1f} {r['prompt_tokens']:13.0f} "
+                  f"{r['wall_p50_ms']:7.0f}ms {speedup:5.2f}x")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Ticker-filtered search latency as the corpus grows: global ANN index vs ticker partitions.
+
+Grows a throw-away collection from 50 tickers (the clean50.py deployment) to the
+full S&P 500 and, at each size, runs the same search_10k-style queries
+(one ticker, k=15) twice:
+  global     one HNSW index over the whole collection, ticker applied as a filter
+  partition  the per-ticker partial HNSW index from pgstore.ensure_ticker_partitions()
+
+Ground truth is computed in-process with numpy, so recall@k and the share of
+queries that came back with fewer than k rows are reported for both layouts.
+
+Usage:
+    docker compose up -d db
+    python benchmarks/bench_partitions.py --steps 50,500 --chunks-per-ticker 300
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pgstore  # noqa: E402
+
+BENCH_COLLECTION = "bench_partitions"
+
+
+def ticker_rows(ticker_index, chunks_per_ticker, dim, rng):
+    vectors = rng.standard_normal((chunks_per_ticker, dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    ticker = f"T{ticker_index:03d}"
+    chunks = [(f"part-{ticker}-{i}", f"{ticker} chunk {i}", {"ticker": ticker}) for i in range(chunks_per_ticker)]
+    return ticker, chunks, vectors
+
+
+def exact_top_k(vectors, ids, query, k):
+    distances = 1 - vectors @ (query / np.linalg.norm(query))
+    return [ids[i] for i in np.argsort(distances)[:k]]
+
+
+def measure(conn, collection_id, queries, truth, k, ef_search):
+    latencies, recalls, short = [], [], 0
+    for (query, ticker), expected in zip(queries, truth):
+        start = time.perf_counter()
+        hits = pgstore.similarity_search(conn, collection_id, query, k=k, ticker=ticker, ef_search=ef_search)
+        latencies.append(time.perf_counter() - start)
+        got = [doc.id for doc, _ in hits]
+        short += len(got) < k
+        recalls.append(len(set(got) & set(expected)) / k)
+    latencies = np.array(latencies) * 1000
+    return {
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        f"recall@{k}": float(np.mean(recalls)),
+        "short_results": short / len(queries),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", default="50,500", help="Comma-separated ticker counts to grow through")
+    parser.add_argument("--chunks-per-ticker", type=int, default=300)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=15)
+    parser.add_argument("--ef-search", type=int, default=40, help="pgvector's default")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+    steps = [int(step) for step in args.steps.split(",")]
+
+    conn = pgstore.connect()
+    pgstore.ensure_schema(conn)
+    pgstore.delete_collection(conn, BENCH_COLLECTION)
+    collection_id = pgstore.create_collection(conn, BENCH_COLLECTION)
+    # Without the ticker b-tree the planner cannot side-step the ANN index with an exact scan
+    with conn.transaction():
+        conn.execute(f"DROP INDEX IF EXISTS {pgstore.TICKER_INDEX}")
+
+    rng = np.random.default_rng(0)
+    store = {}  # ticker -> (ids, vectors) for the ground truth
+    results = []
+    try:
+        for n_tickers in steps:
+            # 1. GROW the corpus to n_tickers
+            for t in range(len(store), n_tickers):
+                ticker, chunks, vectors = ticker_rows(t, args.chunks_per_ticker, args.dim, rng)
+                with conn.transaction():
+                    with conn.cursor() as cur:
+                        pgstore.copy_chunks(cur, collection_id, chunks, vectors)
+                store[ticker] = ([cid for cid, _, _ in chunks], vectors)
+            conn.execute("ANALYZE langchain_pg_embedding")
+
+            # Queries always target the first 50 tickers, so only the corpus size changes
+            query_rng = np.random.default_rng(42)
+            queries = [(query_rng.standard_normal(args.dim).astype(np.float32), f"T{query_rng.integers(min(50, n_tickers)):03d}")
+                       for _ in range(args.queries)]
+            truth = [exact_top_k(store[ticker][1], store[ticker][0], query, args.k) for query, ticker in queries]
+            row = {"tickers": n_tickers, "rows": n_tickers * args.chunks_per_ticker}
+
+            # 2. GLOBAL index only
+            pgstore.drop_ticker_partitions(conn, collection_id)
+            pgstore.ensure_indexes(conn, collection_id, args.dim, method="hnsw", refresh=True)
+            with conn.transaction():
+                conn.execute(f"DROP INDEX IF EXISTS {pgstore.TICKER_INDEX}")
+            row["global"] = measure(conn, collection_id, queries, truth, args.k, args.ef_search)
+
+            # 3. TICKER PARTITIONS
+            start = time.perf_counter()
+            pgstore.ensure_ticker_partitions(conn, collection_id, args.dim, store.keys())
+            row["partition_build_s"] = time.perf_counter() - start
+            row["partition"] = measure(conn, collection_id, queries, truth, args.k, args.ef_search)
+            results.append(row)
+
+            for layout in ("global", "partition"):
+                r = row[layout]
+                print(f"{n_tickers:>4} tickers  {layout:<9}  p50 {r['p50_ms']:6.2f} ms  p99 {r['p99_ms']:6.2f} ms  "
+                      f"recall@{args.k} {r[f'recall@{args.k}']:.3f}  short {r['short_results']:.0%}")
+    finally:
+        pgstore.drop_ticker_partitions(conn, collection_id)
+        pgstore.drop_ann_indexes(conn, collection_id)
+        pgstore.delete_collection(conn, BENCH_COLLECTION)
+        conn.close()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
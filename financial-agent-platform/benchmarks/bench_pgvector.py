@@ -0,0 +1,159 @@
+"""
+Load + query benchmark for the PGVector table, run against the docker-compose 'db' service.
+
+Loads synthetic chunks into a throw-away collection twice (row-wise INSERT, like
+PGVector.add_documents, and binary COPY through pgstore.copy_chunks), then times
+ticker-filtered top-15 searches before and after building the ANN + ticker indexes.
+Recall@k of the indexed search is measured against the exact (pre-index) results.
+
+Usage:
+    docker compose up -d db
+    python benchmarks/bench_pgvector.py --rows 200000 --tickers 50 --index hnsw
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pgstore  # noqa: E402
+
+BENCH_COLLECTION = "bench_pgvector"
+FILLER = "Revenue, segment results and risk factors discussed in the annual report. " * 13  # ~1000 chars
+
+
+def synthetic_rows(n, tickers, dim, seed=0, start=0):
+    rng = np.random.default_rng(seed + start)
+    vectors = rng.standard_normal((n, dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    chunks = [
+        (f"bench-{start + i}", f"{i} {FILLER}", {"ticker": tickers[(start + i) % len(tickers)], "source": "bench"})
+        for i in range(n)
+    ]
+    return chunks, vectors
+
+
+def percentile_ms(samples, p):
+    return float(np.percentile(np.array(samples) * 1000, p))
+
+
+def load_rowwise(conn, collection_id, chunks, vectors):
+    start = time.perf_counter()
+    with conn.transaction():
+        with conn.cursor() as cur:
+            cur.executemany(
+                "INSERT INTO langchain_pg_embedding (id, collection_id, embedding, document, cmetadata) "
+                "VALUES (%s, %s, %s, %s, %s) ON CONFLICT (id) DO NOTHING",
+                [(cid, collection_id, v, text, pgstore.Jsonb(md)) for (cid, text, md), v in zip(chunks, vectors)],
+            )
+    return len(chunks) / (time.perf_counter() - start)
+
+
+def load_copy(conn, collection_id, n, tickers, dim, batch=10000):
+    # Generate everything up front so only the database work is timed
+    batches = [synthetic_rows(min(batch, n - offset), tickers, dim, start=offset) for offset in range(0, n, batch)]
+    start = time.perf_counter()
+    for chunks, vectors in batches:
+        with conn.transaction():
+            with conn.cursor() as cur:
+                pgstore.copy_chunks(cur, collection_id, chunks, vectors)
+    return n / (time.perf_counter() - start)
+
+
+def run_queries(conn, collection_id, queries, k, **search_kwargs):
+    latencies, results = [], []
+    for vector, ticker in queries:
+        start = time.perf_counter()
+        hits = pgstore.similarity_search(conn, collection_id, vector, k=k, ticker=ticker, **search_kwargs)
+        latencies.append(time.perf_counter() - start)
+        results.append([doc.id for doc, _ in hits])
+    return latencies, results
+
+
+def recall(exact, approx):
+    scores = [len(set(a) & set(e)) / len(e) for e, a in zip(exact, approx) if e]
+    return float(np.mean(scores)) if scores else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--rowwise-rows", type=int, default=5000, help="Rows for the row-wise INSERT baseline")
+    parser.add_argument("--tickers", type=int, default=50)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=15)
+    parser.add_argument("--index", choices=pgstore.INDEX_METHODS, default="hnsw")
+    parser.add_argument("--hnsw-m", type=int, default=16)
+    parser.add_argument("--hnsw-ef-construction", type=int, default=64)
+    parser.add_argument("--ef-search", type=int, default=100)
+    parser.add_argument("--probes", type=int, default=10)
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--keep", action="store_true", help="Keep the benchmark collection afterwards")
+    args = parser.parse_args()
+
+    tickers = [f"T{i:03d}" for i in range(args.tickers)]
+    conn = pgstore.connect()
+    pgstore.ensure_schema(conn)
+    pgstore.delete_collection(conn, BENCH_COLLECTION)
+    collection_id = pgstore.create_collection(conn, BENCH_COLLECTION)
+    results = {"rows": args.rows, "tickers": args.tickers, "dim": args.dim, "index": args.index}
+
+    try:
+        # 1. LOAD
+        chunks, vectors = synthetic_rows(args.rowwise_rows, tickers, args.dim, seed=1)
+        chunks = [(f"rowwise-{cid}", text, md) for cid, text, md in chunks]
+        results["rowwise_rows_per_s"] = load_rowwise(conn, collection_id, chunks, vectors)
+        with conn.transaction():
+            conn.execute("DELETE FROM langchain_pg_embedding WHERE id LIKE 'rowwise-%'")
+        print(f"Row-wise INSERT: {results['rowwise_rows_per_s']:,.0f} rows/s")
+
+        results["copy_rows_per_s"] = load_copy(conn, collection_id, args.rows, tickers, args.dim)
+        print(f"Binary COPY:     {results['copy_rows_per_s']:,.0f} rows/s")
+        conn.execute("ANALYZE langchain_pg_embedding")
+
+        # 2. QUERIES WITHOUT INDEXES (exact)
+        # The ticker index is shared by all collections; ensure_indexes() below recreates it
+        pgstore.drop_ann_indexes(conn, collection_id)
+        with conn.transaction():
+            conn.execute(f"DROP INDEX IF EXISTS {pgstore.TICKER_INDEX}")
+        rng = np.random.default_rng(42)
+        queries = [(rng.standard_normal(args.dim).astype(np.float32), tickers[rng.integers(len(tickers))])
+                   for _ in range(args.queries)]
+        latencies, exact = run_queries(conn, collection_id, queries, args.k)
+        results["before"] = {"p50_ms": percentile_ms(latencies, 50), "p99_ms": percentile_ms(latencies, 99)}
+        print(f"Before indexing: p50 {results['before']['p50_ms']:.1f} ms, p99 {results['before']['p99_ms']:.1f} ms")
+
+        # 3. BUILD INDEXES
+        start = time.perf_counter()
+        pgstore.ensure_indexes(conn, collection_id, args.dim, method=args.index, m=args.hnsw_m,
+                               ef_construction=args.hnsw_ef_construction)
+        results["index_build_s"] = time.perf_counter() - start
+        print(f"Index build ({args.index}): {results['index_build_s']:.1f}s")
+
+        # 4. QUERIES WITH INDEXES
+        search_kwargs = {"ef_search": args.ef_search} if args.index == "hnsw" else {"probes": args.probes}
+        run_queries(conn, collection_id, queries[:10], args.k, **search_kwargs)  # warm-up
+        latencies, approx = run_queries(conn, collection_id, queries, args.k, **search_kwargs)
+        results["after"] = {
+            "p50_ms": percentile_ms(latencies, 50),
+            "p99_ms": percentile_ms(latencies, 99),
+            f"recall@{args.k}": recall(exact, approx),
+        }
+        print(f"After indexing:  p50 {results['after']['p50_ms']:.1f} ms, p99 {results['after']['p99_ms']:.1f} ms, "
+              f"recall@{args.k} {results['after'][f'recall@{args.k}']:.3f}")
+    finally:
+        if not args.keep:
+            pgstore.delete_collection(conn, BENCH_COLLECTION)
+            pgstore.drop_ann_indexes(conn, collection_id)
+        conn.close()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Quantized vector storage: index size, latency and recall@k against float32.
+
+The same synthetic corpus as bench_embedded.py (clustered unit vectors, 768
+dimensions like all-mpnet-base-v2 in sec_filings_mpnet) is searched with the
+search_10k query shape (one ticker, k=15):
+  float32   today's search: every vector in full precision (pgstore.similarity_search)
+  half      float16 copy for the first pass, k * oversample rescored in float32
+  int8      per-dimension scalar quantization (embedded store only; pgvector has no int8 type)
+  binary    one sign bit per dimension, Hamming distance for the first pass
+
+Index size is what the first pass scans: for pgvector the ANN index plus the
+ticker partitions (pg_relation_size), for the embedded store the codes held in
+RAM (the float32 vectors are the memory-mapped .f32 files). Recall@k is measured
+against exact float32 results. halfvec and binary_quantize need pgvector 0.7+;
+on older servers those rows are reported as unsupported.
+
+Usage:
+    python benchmarks/bench_quantization.py --skip-pg
+    python benchmarks/bench_quantization.py --tickers 20 --chunks-per-ticker 4000 --oversample 1 2 4 8
+    python benchmarks/bench_quantization.py --quantizations none half binary --json quantization.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+import pgstore  # noqa: E402
+import embedded_store  # noqa: E402
+import vector_backends  # noqa: E402
+from bench_embedded import ticker_corpus, measure  # noqa: E402
+
+BENCH_COLLECTION = "bench_quantization"
+
+
+def embedded_levels(corpus, queries, truth, args):
+    root = tempfile.mkdtemp(prefix="bench_quantization_")
+    levels = []
+    try:
+        backend = vector_backends.EmbeddedBackend(BENCH_COLLECTION, root=root)
+        for ticker, (chunks, vectors) in corpus.items():
+            filing = {"ticker": ticker, "chunk_ids": [cid for cid, _, _ in chunks]}
+            backend.apply_filing_diff(filing, chunks, vectors, stale_ids=None)
+        store = backend.store
+        for quantization in args.quantizations:
+            start = time.perf_counter()
+            store.build_quantized(quantization)
+            build_s = time.perf_counter() - start
+            backend.warm_up()
+            shards = [store.shard(ticker) for ticker in store.tickers()]
+            if quantization == "none":
+                size = sum(shard.vectors.nbytes for shard in shards)
+            else:
+                size = sum(shard.quantized.nbytes for shard in shards)
+            for oversample in ([0] if quantization == "none" else args.oversample):
+                search = lambda v, k, t: store.similarity_search_with_score_by_vector(  # noqa: E731
+                    v, k=k, filter={"ticker": t}, oversample=oversample)
+                measure(search, queries[:20], truth[:20], args.k)  # warm-up
+                levels.append({"quantization": quantization, "oversample": oversample, "index_mb": size / 1e6,
+                               "build_s": build_s, **measure(search, queries, truth, args.k)})
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    return levels
+
+
+def pg_index_bytes(conn, collection_id):
+    names = [pgstore.ann_index_name(collection_id, "hnsw")]
+    names += list(pgstore.list_ticker_partitions(conn, collection_id).values())
+    return sum(conn.execute("SELECT coalesce(pg_relation_size(to_regclass(%s)), 0)", (name,)).fetchone()[0]
+               for name in names)
+
+
+def pg_levels(corpus, queries, truth, args):
+    import psycopg
+    conn = pgstore.connect()
+    pgstore.ensure_schema(conn)
+    version = conn.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'").fetchone()[0]
+    pgstore.delete_collection(conn, BENCH_COLLECTION)
+    collection_id = pgstore.create_collection(conn, BENCH_COLLECTION)
+    levels = []
+    try:
+        for chunks, vectors in corpus.values():
+            with conn.transaction():
+                with conn.cursor() as cur:
+                    pgstore.copy_chunks(cur, collection_id, chunks, vectors)
+        conn.execute("ANALYZE langchain_pg_embedding")
+        for quantization in args.quantizations:
+            if quantization not in pgstore.QUANTIZATIONS:
+                continue
+            start = time.perf_counter()
+            try:
+                pgstore.ensure_indexes(conn, collection_id, args.dim, method="hnsw", quantization=quantization)
+                pgstore.ensure_ticker_partitions(conn, collection_id, args.dim, corpus.keys(),
+                                                 quantization=quantization)
+            except psycopg.Error as e:
+                levels.append({"quantization": quantization, "unsupported": f"pgvector {version}: {e}".strip()})
+                continue
+            build_s = time.perf_counter() - start
+            size = pg_index_bytes(conn, collection_id)
+            for oversample in ([0] if quantization == "none" else args.oversample):
+                search = lambda v, k, t: pgstore.similarity_search(  # noqa: E731
+                    conn, collection_id, v, k=k, ticker=t, ef_search=args.ef_search, quantization=quantization,
+                    oversample=oversample)
+                measure(search, queries[:20], truth[:20], args.k)  # warm-up
+                levels.append({"quantization": quantization, "oversample": oversample, "index_mb": size / 1e6,
+                               "build_s": build_s, **measure(search, queries, truth, args.k)})
+    finally:
+        pgstore.drop_ticker_partitions(conn, collection_id)
+        pgstore.drop_ann_indexes(conn, collection_id)
+        pgstore.delete_collection(conn, BENCH_COLLECTION)
+        conn.close()
+    return levels
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=10)
+    parser.add_argument("--chunks-per-ticker", type=int, default=4000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=15)
+    parser.add_argument("--quantizations", nargs="+", choices=embedded_store.QUANTIZATIONS,
+                        default=list(embedded_store.QUANTIZATIONS))
+    parser.add_argument("--oversample", type=int, nargs="+", default=[1, 2, 4, 8],
+                        help="Candidates per result rescored in float32")
+    parser.add_argument("--ef-search", type=int, default=40, help="hnsw.ef_search for pgvector (raised to cover the candidates)")
+    parser.add_argument("--skip-pg", action="store_true", help="Only benchmark the embedded store")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    corpus = {}
+    for t in range(args.tickers):
+        ticker = f"T{t:03d}"
+        corpus[ticker] = ticker_corpus(ticker, args.chunks_per_ticker, args.dim, rng)
+
+    # Queries near real rows (a question about something the filing covers)
+    query_rng = np.random.default_rng(42)
+    queries = []
+    for _ in range(args.queries):
+        ticker = f"T{query_rng.integers(args.tickers):03d}"
+        row = corpus[ticker][1][query_rng.integers(args.chunks_per_ticker)]
+        queries.append((embedded_store.normalize_rows(row + 0.5 * query_rng.standard_normal(args.dim)), ticker))
+    truth = []
+    for vector, ticker in queries:
+        chunks, vectors = corpus[ticker]
+        truth.append([chunks[i][0] for i in embedded_store.top_k(vectors @ vector, args.k)])
+
+    results = {"tickers": args.tickers, "chunks_per_ticker": args.chunks_per_ticker, "dim": args.dim, "k": args.k,
+               "embedded": embedded_levels(corpus, queries, truth, args)}
+    if not args.skip_pg:
+        results["pgvector"] = pg_levels(corpus, queries, truth, args)
+
+    for backend in ("embedded", "pgvector"):
+        if backend not in results:
+            continue
+        print(f"\n{backend}: {'quantization':>12} {'oversample':>10} {'index MB':>9} {'p50':>9} {'p99':>9} "
+              f"{'recall@' + str(args.k):>9}")
+        baseline = next((r for r in results[backend] if r["quantization"] == "none"), None)
+        for r in results[backend]:
+            if "unsupported" in r:
+                print(f"{'':10}{r['quantization']:>12}  unsupported ({r['unsupported'].splitlines()[0]})")
+                continue
+            ratio = f" ({r['index_mb'] / baseline['index_mb']:.0%})" if baseline else ""
+            print(f"{'':10}{r['quantization']:>12} {r['oversample']:10d} {r['index_mb']:9.1f} {r['p50_ms']:7.3f}ms "
+                  f"{r['p99_ms']:7.3f}ms {r[f'recall@{args.k}']:9.3f}{ratio}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Two-stage retrieval (reranker.py): prompt size, answer coverage and latency of
+search_10k's excerpts with and without the cross-encoder stage.
+
+Loads the labeled filings of corpus/retrieval the way bench_hybrid.py does and
+runs every query of queries.jsonl through the hybrid first pass, then:
+  top-k     the first TOP_K chunks, what search_10k sent before reranking
+  reranked  RERANK_CANDIDATES chunks scored by the cross-encoder in one batch,
+            cut adaptively (RERANK_MIN_SCORE / RERANK_CUMULATIVE / RERANK_MIN_K)
+Both are formatted by context_builder.build_context(), exactly as search_10k
+hands them to the LLM.
+
+Reported per mode: mean chunks and excerpt tokens per search (the prompt growth
+per tool call), coverage (share of queries whose excerpts still contain the
+expected text), and latency: first pass, and the rerank stage cold and with
+its (query, chunk) score cache warm.
+
+Usage:
+    python benchmarks/bench_rerank.py
+    python benchmarks/bench_rerank.py --rerank-model cross-encoder/ms-marco-MiniLM-L-12-v2 --candidates 60
+    python benchmarks/bench_rerank.py --min-score 0.1 --cumulative 0.8 --json rerank.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+import bench_hybrid  # noqa: E402  (sets up the import paths)
+import vector_backends  # noqa: E402
+import reranker  # noqa: E402
+from context_builder import build_context  # noqa: E402
+
+BENCH_COLLECTION = "bench_rerank"
+TOP_K = 15
+
+
+def percentiles(seconds):
+    ms = np.array(seconds) * 1000
+    return {"p50_ms": float(np.percentile(ms, 50)), "p99_ms": float(np.percentile(ms, 99))}
+
+
+def summarize(selections, queries):
+    tokens = [build_context(docs)[1]["tokens"] for docs in selections]
+    covered = [any(text in doc.page_content for doc in docs for text in q["expected"])
+               for docs, q in zip(selections, queries)]
+    return {
+        "mean_chunks": float(np.mean([len(docs) for docs in selections])),
+        "mean_tokens": float(np.mean(tokens)),
+        "coverage": float(np.mean(covered)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=vector_backends.BACKENDS, default="embedded")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="Embedding model (tools.py uses all-MiniLM-L6-v2)")
+    parser.add_argument("--rerank-model", default=reranker.RERANK_MODEL)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--chunk-overlap", type=int, default=50)
+    parser.add_argument("--candidates", type=int, default=reranker.RERANK_CANDIDATES, help="First-pass chunks reranked")
+    parser.add_argument("--min-k", type=int, default=reranker.RERANK_MIN_K)
+    parser.add_argument("--min-score", type=float, default=reranker.RERANK_MIN_SCORE)
+    parser.add_argument("--cumulative", type=float, default=reranker.RERANK_CUMULATIVE)
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    filings, queries = bench_hybrid.load_corpus(args.chunk_size, args.chunk_overlap)
+    print(f"📄 {sum(len(c) for c in filings.values())} chunks from {len(filings)} filings, {len(queries)} queries")
+    embeddings = bench_hybrid.HuggingFaceEmbeddings(model_name=args.model)
+    model = reranker.load_reranker(args.rerank_model)
+    cutoff = dict(min_k=args.min_k, max_k=TOP_K, min_score=args.min_score, cumulative=args.cumulative)
+
+    root = tempfile.mkdtemp(prefix="bench_rerank_")
+    if args.backend == "embedded":
+        backend = vector_backends.EmbeddedBackend(BENCH_COLLECTION, root=root)
+    else:
+        backend = vector_backends.PGVectorBackend(BENCH_COLLECTION)
+        bench_hybrid.pgstore.ensure_schema(backend.conn)
+        bench_hybrid.pgstore.delete_collection(backend.conn, BENCH_COLLECTION)
+        backend._collection_id = bench_hybrid.pgstore.create_collection(backend.conn, BENCH_COLLECTION)
+
+    results = {"backend": args.backend, "model": args.model, "rerank_model": args.rerank_model,
+               "candidates": args.candidates, "cutoff": cutoff, "queries": len(queries)}
+    try:
+        bench_hybrid.load_backend(backend, filings, embeddings)
+        backend.warm_up()
+        vectors = {q["query"]: embeddings.embed_query(q["query"]) for q in queries}
+
+        first_pass, candidates = [], []
+        for q in queries:
+            start = time.perf_counter()
+            hits = vector_backends.hybrid_search(backend, q["query"], vectors[q["query"]], k=args.candidates,
+                                                 ticker=q["ticker"])
+            first_pass.append(time.perf_counter() - start)
+            candidates.append([doc for doc, _ in hits])
+        model.rerank(queries[0]["query"], candidates[0], **cutoff)  # warm-up (first forward pass)
+        model.scores.clear()
+
+        timings = {"cold": [], "cached": []}
+        for phase in ("cold", "cached"):
+            reranked = []
+            for q, docs in zip(queries, candidates):
+                start = time.perf_counter()
+                reranked.append(model.rerank(q["query"], docs, **cutoff))
+                timings[phase].append(time.perf_counter() - start)
+
+        results["top_k"] = summarize([docs[:TOP_K] for docs in candidates], queries)
+        results["reranked"] = summarize(reranked, queries)
+        results["latency"] = {"first_pass": percentiles(first_pass), "rerank_cold": percentiles(timings["cold"]),
+                              "rerank_cached": percentiles(timings["cached"])}
+        results["prompt_tokens_saved"] = 1 - results["reranked"]["mean_tokens"] / results["top_k"]["mean_tokens"]
+    finally:
+        if args.backend == "pgvector":
+            bench_hybrid.pgstore.drop_text_index(backend.conn, backend.collection_id)
+            bench_hybrid.pgstore.delete_collection(backend.conn, BENCH_COLLECTION)
+        backend.close()
+        shutil.rmtree(root, ignore_errors=True)
+
+    print(f"\n{'mode':<9} {'chunks':>6} {'tokens':>7} {'coverage':>8}")
+    for mode in ("top_k", "reranked"):
+        r = results[mode]
+        print(f"{mode:<9} {r['mean_chunks']:6.1f} {r['mean_tokens']:7.0f} {r['coverage']:8.0%}")
+    print(f"excerpt tokens per search: {results['prompt_tokens_saved']:.0%} fewer")
+    for stage, r in results["latency"].items():
+        print(f"{stage:<14} p50 {r['p50_ms']:7.2f} ms  p99 {r['p99_ms']:7.2f} ms")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
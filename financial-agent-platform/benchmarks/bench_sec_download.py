@@ -0,0 +1,97 @@
+"""
+Tickers/minute of the 10-K downloader (datamaking/sec10k500.py) against the
+local fake EDGAR in sec_stub.py, which adds latency, random 503s and enforces
+the 10 requests/second limit with 429s.
+
+Runs, each into a fresh folder unless noted:
+  serial      one worker, the old one-ticker-at-a-time shape
+  concurrent  --workers threads sharing the token bucket
+  crash       concurrent, stopped after 60% of the tickers ...
+  resume      ... then the full list again in the same folder: only the rest is fetched
+  recheck     refresh window 0 with a few new 10-Ks: unchanged filings are not downloaded
+
+The stub reports the busiest one-second window it saw, which must stay within
+the rate limit (+1 for the bucket's single-token burst).
+
+Usage:
+    python benchmarks/bench_sec_download.py --tickers 60
+    python benchmarks/bench_sec_download.py --tickers 200 --latency 0.5 --skip-serial --json sec.json
+"""
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "datamaking"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sec10k500  # noqa: E402
+from sec_stub import StubSec  # noqa: E402
+
+
+def run(stub, tickers, folder, workers, rate, **kwargs):
+    stub.stats.update(max_per_second=0)
+    client = sec10k500.SecClient(rate=rate, www_url=stub.url, data_url=stub.url)
+    summary = sec10k500.download_latest_10k(tickers=tickers, workers=workers, target_folder=folder, client=client,
+                                            **kwargs)
+    summary["tickers_per_minute"] = summary["tickers"] / summary["seconds"] * 60 if summary["seconds"] else None
+    summary["max_requests_per_second"] = stub.stats["max_per_second"]
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=60)
+    parser.add_argument("--workers", type=int, default=sec10k500.DOWNLOAD_WORKERS)
+    parser.add_argument("--rate", type=float, default=sec10k500.SEC_RATE_LIMIT)
+    parser.add_argument("--latency", type=float, default=0.3, help="Seconds the stub waits before each response")
+    parser.add_argument("--error-rate", type=float, default=0.02, help="Share of requests answered with 503")
+    parser.add_argument("--doc-bytes", type=int, default=1_000_000)
+    parser.add_argument("--skip-serial", action="store_true")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    # Quick retries, so injected errors do not dominate a short benchmark
+    sec10k500.BACKOFF_BASE = 0.2
+    stub = StubSec(args.tickers, doc_bytes=args.doc_bytes, latency=args.latency, error_rate=args.error_rate,
+                   rate_limit=int(args.rate)).start()
+    tickers = list(stub.tickers)
+    results = {"tickers": args.tickers, "workers": args.workers, "rate": args.rate, "latency_s": args.latency,
+               "runs": {}}
+    folders = []
+
+    def folder():
+        folders.append(tempfile.mkdtemp(prefix="bench_sec_"))
+        return folders[-1]
+
+    try:
+        if not args.skip_serial:
+            results["runs"]["serial"] = run(stub, tickers, folder(), 1, args.rate)
+        results["runs"]["concurrent"] = run(stub, tickers, folder(), args.workers, args.rate)
+
+        shared = folder()
+        results["runs"]["crash"] = run(stub, tickers[:int(len(tickers) * 0.6)], shared, args.workers, args.rate)
+        results["runs"]["resume"] = run(stub, tickers, shared, args.workers, args.rate)
+        for ticker in tickers[:5]:
+            stub.bump(ticker)
+        results["runs"]["recheck"] = run(stub, tickers, shared, args.workers, args.rate, refresh_after_hours=0)
+    finally:
+        stub.stop()
+        for path in folders:
+            shutil.rmtree(path, ignore_errors=True)
+
+    print()
+    for name, r in results["runs"].items():
+        rate = f"{r['tickers_per_minute']:7.0f} tickers/min" if r["tickers_per_minute"] else "      - tickers/min"
+        print(f"{name:<11} {r['tickers']:4d} tickers {rate}  {r['requests']:4d} requests  {r['retries']:3d} retries  "
+              f"{r['throttled']:3d} throttled  peak {r['max_requests_per_second']:2d} req/s  {r['statuses']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Section-filtered search (search_10k's section argument): precision and latency
+of searching one 10-K Item instead of the whole filing.
+
+Precision: the labeled filings of corpus/retrieval (as in bench_hybrid.py),
+split and Item-tagged by ingest.split_file(). Each query's section is the Item
+of the chunk that holds its expected text. Every query runs through the hybrid
+search of search_10k twice, over the whole filing and over that Item, and
+reports hit@n (expected text in the top n) and section precision@k (share of
+the top k chunks from the right Item).
+
+Latency: a synthetic corpus (synth_corpus.py, hash embeddings as in
+run_suite.py) large enough for the scan to matter, with one question per Item.
+Reported per backend and Item: vector search p50 / p99 over the whole filing
+(ANN index / shard scan) and over the Item's rows ((ticker, item) index /
+per-shard row lists), plus the rows the section holds and the section
+precision of the unfiltered search.
+
+Usage:
+    python benchmarks/bench_sections.py --skip-pg
+    python benchmarks/bench_sections.py --filings 20 --filing-kb 400 --queries 50
+    python benchmarks/bench_sections.py --model all-mpnet-base-v2 --json sections.json
+"""
+import os
+import sys
+import time
+import json
+import shutil
+import argparse
+import tempfile
+import contextlib
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+import bench_hybrid  # noqa: E402  (sets up the import paths)
+import run_suite  # noqa: E402
+import vector_backends  # noqa: E402
+
+BENCH_COLLECTION = "bench_sections"
+HIT_AT = (1, 3, 5)
+# One question per Item of the synthetic filings
+SECTION_QUERIES = {
+    "1": "reportable segments and number of employees",
+    "1A": "suppliers disruption could delay shipments and increase costs",
+    "7": "revenue and gross margin compared to the prior fiscal year",
+    "7A": "hypothetical change in foreign currency exchange rates and interest rates",
+    "8": "consolidated statement of operations net income diluted earnings per share",
+}
+
+
+def section_precision(hits, item):
+    return sum(doc.metadata.get("item") == item for doc, _ in hits) / len(hits) if hits else 0.0
+
+
+def timed(search, runs):
+    seconds = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        hits = search()
+        seconds.append(time.perf_counter() - start)
+    return hits, run_suite.percentiles(seconds)
+
+
+def precision_levels(args):
+    filings, queries = bench_hybrid.load_corpus(args.chunk_size, args.chunk_overlap)
+    # A query's section: the Item of the first chunk holding its expected text
+    for q in queries:
+        q["item"] = next((c.metadata.get("item") for c in filings[q["ticker"]]
+                          if any(text in c.page_content for text in q["expected"])), None)
+    queries = [q for q in queries if q["item"]]
+    print(f"📄 {sum(len(c) for c in filings.values())} chunks from {len(filings)} filings, "
+          f"{len(queries)} queries with a section")
+    embeddings = bench_hybrid.HuggingFaceEmbeddings(model_name=args.model)
+
+    root = tempfile.mkdtemp(prefix="bench_sections_")
+    backend = vector_backends.EmbeddedBackend(BENCH_COLLECTION, root=root)
+    results = {}
+    try:
+        bench_hybrid.load_backend(backend, filings, embeddings)
+        backend.warm_up()
+        vectors = {q["query"]: embeddings.embed_query(q["query"]) for q in queries}
+        for mode in ("filing", "section"):
+            hit_counts, precisions, seconds = {n: 0 for n in HIT_AT}, [], []
+            for q in queries:
+                start = time.perf_counter()
+                hits = vector_backends.hybrid_search(backend, q["query"], vectors[q["query"]], k=args.k,
+                                                     ticker=q["ticker"], item=q["item"] if mode == "section" else None)
+                seconds.append(time.perf_counter() - start)
+                docs = [doc for doc, _ in hits]
+                rank = next((i for i, doc in enumerate(docs) if any(t in doc.page_content for t in q["expected"])), None)
+                for n in HIT_AT:
+                    hit_counts[n] += rank is not None and rank < n
+                precisions.append(section_precision(hits, q["item"]))
+            results[mode] = {**{f"hit@{n}": hit_counts[n] / len(queries) for n in HIT_AT},
+                             f"section_precision@{args.k}": float(np.mean(precisions)),
+                             **run_suite.percentiles(seconds)}
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    return results
+
+
+def latency_levels(name, md_files, tickers, args):
+    embeddings = run_suite.HashEmbeddings()
+    root = tempfile.mkdtemp(prefix="bench_sections_")
+    backend = run_suite.open_scratch_backend(name, f"sections_{args.filings}", root)
+    levels = []
+    try:
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            run_suite.run_ingest(backend, md_files, embeddings, "hnsw")
+        backend.warm_up()
+        rng = np.random.default_rng(0)
+        for item, question in SECTION_QUERIES.items():
+            vector = embeddings.embed_query(question)
+            level = {"item": item, "rows": [], "precision": []}
+            timings = {"filing": [], "section": []}
+            for ticker in rng.choice(tickers, size=args.queries):
+                for mode in ("filing", "section"):
+                    hits, stats = timed(lambda: backend.search(vector, k=args.k, ticker=str(ticker),
+                                                               item=item if mode == "section" else None), 3)
+                    timings[mode].append(stats["p50_ms"])
+                    if mode == "filing":
+                        level["precision"].append(section_precision(hits, item))
+                    else:
+                        level["rows"].append(len(hits))
+            for mode, ms in timings.items():
+                level[mode] = {"p50_ms": float(np.percentile(ms, 50)), "p99_ms": float(np.percentile(ms, 99))}
+            level["filing_precision"] = float(np.mean(level.pop("precision")))
+            level["section_hits"] = float(np.mean(level.pop("rows")))
+            levels.append(level)
+    finally:
+        if name == "pgvector":
+            run_suite.drop_scratch_collection(backend)
+            backend.close()
+        shutil.rmtree(root, ignore_errors=True)
+    return levels
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="Embedding model for the precision part")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--chunk-overlap", type=int, default=50)
+    parser.add_argument("--k", type=int, default=15)
+    parser.add_argument("--filings", type=int, default=20, help="Synthetic filings for the latency part")
+    parser.add_argument("--filing-kb", type=int, default=200, help="Synthetic filing size (mostly Item 1A)")
+    parser.add_argument("--queries", type=int, default=30, help="Tickers searched per Item")
+    parser.add_argument("--skip-pg", action="store_true", help="Only measure the embedded store's latency")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    results = {"k": args.k, "model": args.model, "precision": precision_levels(args)}
+
+    workdir = tempfile.mkdtemp(prefix="bench_sections_corpus_")
+    try:
+        md_files = run_suite.synth_corpus.generate(workdir, args.filings, filing_kb=args.filing_kb)
+        tickers = [os.path.splitext(os.path.basename(p))[0] for p in md_files]
+        results["latency"] = {"filings": args.filings, "filing_kb": args.filing_kb}
+        for name in ("embedded",) + (() if args.skip_pg else ("pgvector",)):
+            results["latency"][name] = latency_levels(name, md_files, tickers, args)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"\nprecision ({args.model}, hybrid search, k={args.k})")
+    for mode, r in results["precision"].items():
+        hit_rates = "  ".join(f"hit@{n} {r[f'hit@{n}']:.2f}" for n in HIT_AT)
+        print(f"  {mode:<8} {hit_rates}  section precision {r[f'section_precision@{args.k}']:.2f}  "
+              f"p50 {r['p50_ms']:6.2f} ms")
+    for name in ("embedded", "pgvector"):
+        if name not in results["latency"]:
+            continue
+        print(f"\n{name}: {'item':>4} {'filing p50':>10} {'p99':>9} {'section p50':>11} {'p99':>9} "
+              f"{'speedup':>7} {'hits':>5} {'filing precision':>16}")
+        for r in results["latency"][name]:
+            speedup = r["filing"]["p50_ms"] / r["section"]["p50_ms"] if r["section"]["p50_ms"] else float("inf")
+            print(f"{'':10}{r['item']:>4} {r['filing']['p50_ms']:8.3f}ms {r['filing']['p99_ms']:7.3f}ms "
+                  f"{r['section']['p50_ms']:9.3f}ms {r['section']['p99_ms']:7.3f}ms {speedup:6.1f}x "
+                  f"{r['section_hits']:5.1f} {r['filing_precision']:16.2f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
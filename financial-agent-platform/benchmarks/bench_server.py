@@ -0,0 +1,185 @@
+"""
+Load test for server.py: sessions/s and turn latency as concurrency grows.
+
+Starts the server in-process (uvicorn on a local port) with the stub model
+(stub_llm.py) over a small synthetic corpus (synth_corpus.py, hash embeddings
+as in run_suite.py), so the numbers cover HTTP, admission, the checkpointer,
+search_10k and the graph, not a model server.
+
+At each --concurrency level, that many clients each open sessions and run
+--turns streamed turns per session (a search_10k question, then a price
+question, then follow-ups) until --sessions sessions are done. A 429 is counted
+and retried after a short pause. Reported per level: sessions/s, turns/s, time
+to first token and full turn p50 / p99, and the number of 429s.
+
+Usage:
+    python benchmarks/bench_server.py
+    python benchmarks/bench_server.py --backend pgvector --checkpointer postgres --concurrency 1 8 32 64
+    python benchmarks/bench_server.py --max-active 4 --max-queued 4 --concurrency 32 --json server.json
+"""
+import os
+import sys
+import json
+import time
+import socket
+import shutil
+import asyncio
+import argparse
+import tempfile
+import threading
+import contextlib
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=("embedded", "pgvector"), default="embedded")
+    parser.add_argument("--checkpointer", choices=("memory", "postgres"), default="memory")
+    parser.add_argument("--filings", type=int, default=20, help="Synthetic filings to search")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64], help="Concurrent clients")
+    parser.add_argument("--sessions", type=int, default=64, help="Sessions per concurrency level")
+    parser.add_argument("--turns", type=int, default=3, help="Turns per session")
+    parser.add_argument("--max-active", type=int, default=16, help="SERVER_MAX_ACTIVE_TURNS")
+    parser.add_argument("--max-queued", type=int, default=32, help="SERVER_MAX_QUEUED_TURNS")
+    parser.add_argument("--ttft", type=float, default=0.2, help="Stub model time to first token")
+    parser.add_argument("--tokens-per-s", type=float, default=200, help="Stub model output speed")
+    parser.add_argument("--answer-tokens", type=int, default=80)
+    parser.add_argument("--json", help="Write the results to this file")
+    return parser.parse_args()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def run_session(client, tickers, turns, record):
+    import httpx
+    session_id = (await client.post("/sessions")).json()["session_id"]
+    ticker = tickers[hash(session_id) % len(tickers)]
+    questions = [f"What are {ticker}'s main supply chain risks?", f"What is the current price of {ticker}?"]
+    questions += [f"How did {ticker}'s gross margin change?"] * max(turns - 2, 0)
+    for question in questions[:turns]:
+        while True:
+            start = time.perf_counter()
+            first_token = None
+            async with client.stream("POST", f"/sessions/{session_id}/messages",
+                                     json={"message": question, "stream": True}) as response:
+                if response.status_code == 429:
+                    record["rejected"] += 1
+                    await response.aread()
+                    await asyncio.sleep(0.2)
+                    continue
+                if response.status_code != 200:
+                    raise httpx.HTTPStatusError(f"HTTP {response.status_code}", request=response.request,
+                                                response=response)
+                async for line in response.aiter_lines():
+                    event = json.loads(line)
+                    if event["type"] == "token" and first_token is None:
+                        first_token = time.perf_counter()
+                    elif event["type"] == "error":
+                        record["errors"] += 1
+            done = time.perf_counter()
+            record["ttft"].append((first_token or done) - start)
+            record["turn"].append(done - start)
+            break
+
+
+async def run_level(base_url, tickers, concurrency, sessions, turns):
+    import httpx
+    record = {"ttft": [], "turn": [], "rejected": 0, "errors": 0}
+    remaining = iter(range(sessions))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=600, limits=limits) as client:
+        async def worker():
+            for _ in remaining:
+                await run_session(client, tickers, turns, record)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - start
+        health = (await client.get("/health")).json()
+
+    ms = lambda values, q: float(np.percentile(np.array(values) * 1000, q))  # noqa: E731
+    return {
+        "concurrency": concurrency,
+        "sessions": sessions,
+        "turns": len(record["turn"]),
+        "wall_s": wall,
+        "sessions_per_s": sessions / wall,
+        "turns_per_s": len(record["turn"]) / wall,
+        "ttft_p50_ms": ms(record["ttft"], 50),
+        "ttft_p99_ms": ms(record["ttft"], 99),
+        "turn_p50_ms": ms(record["turn"], 50),
+        "turn_p99_ms": ms(record["turn"], 99),
+        "rejected_429": record["rejected"],
+        "errors": record["errors"],
+        "admission": health["admission"],
+    }
+
+
+def main():
+    args = parse_args()
+    # Read by agent.py / server.py / stub_llm.py at import
+    os.environ.update(LLM_BACKEND="stub", AGENT_WARMUP="0", CHECKPOINTER=args.checkpointer,
+                      SERVER_MAX_ACTIVE_TURNS=str(args.max_active), SERVER_MAX_QUEUED_TURNS=str(args.max_queued),
+                      STUB_LLM_TTFT=str(args.ttft), STUB_LLM_TOKENS_PER_S=str(args.tokens_per_s),
+                      STUB_LLM_ANSWER_TOKENS=str(args.answer_tokens))
+    sys.path.insert(0, BENCH_DIR)
+    import run_suite  # Sets up the import paths; reused for the scratch corpus and backend
+    import uvicorn
+    import server
+
+    workdir = tempfile.mkdtemp(prefix="bench_server_")
+    md_files = run_suite.synth_corpus.generate(os.path.join(workdir, "corpus"), args.filings)
+    tickers = [os.path.splitext(os.path.basename(p))[0] for p in md_files]
+    embeddings = run_suite.HashEmbeddings()
+    backend = run_suite.open_scratch_backend(args.backend, args.filings, os.path.join(workdir, "store"))
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        run_suite.run_ingest(backend, md_files, embeddings, "hnsw")
+    run_suite.tools.embeddings = run_suite.startup.Lazy("embedding model", lambda: embeddings)
+    run_suite.tools.backend = run_suite.startup.Lazy("vector backend", lambda: backend)
+
+    port = free_port()
+    uv = uvicorn.Server(uvicorn.Config(server.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=uv.run, name="server", daemon=True)
+    results = {"backend": args.backend, "checkpointer": args.checkpointer, "filings": args.filings,
+               "turns_per_session": args.turns, "max_active": args.max_active, "max_queued": args.max_queued,
+               "stub": {"ttft_s": args.ttft, "tokens_per_s": args.tokens_per_s, "answer_tokens": args.answer_tokens},
+               "levels": []}
+    try:
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            thread.start()
+            while not uv.started:
+                time.sleep(0.05)
+            asyncio.run(run_level(f"http://127.0.0.1:{port}", tickers, 1, 1, 1))  # warm-up
+            for concurrency in args.concurrency:
+                results["levels"].append(asyncio.run(run_level(f"http://127.0.0.1:{port}", tickers, concurrency,
+                                                               max(args.sessions, concurrency), args.turns)))
+    finally:
+        uv.should_exit = True
+        thread.join(timeout=30)
+        if args.backend == "pgvector":
+            run_suite.drop_scratch_collection(backend)
+            backend.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"\n{'clients':>7} {'sessions/s':>10} {'turns/s':>8} {'TTFT p50':>9} {'p99':>8} "
+          f"{'turn p50':>9} {'p99':>8} {'429s':>5}")
+    for r in results["levels"]:
+        print(f"{r['concurrency']:7d} {r['sessions_per_s']:10.2f} {r['turns_per_s']:8.2f} "
+              f"{r['ttft_p50_ms']:7.0f}ms {r['ttft_p99_ms']:6.0f}ms {r['turn_p50_ms']:7.0f}ms "
+              f"{r['turn_p99_ms']:6.0f}ms {r['rejected_429']:5d}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Cold start to first answer for agent.py, in a fresh interpreter per run.
+
+Modes:
+  lazy    nothing is built until the question needs it (AGENT_WARMUP=0)
+  warmup  background warm-up starts right after import, like the REPL does
+  eager   everything is built before the question is asked, like the old
+          import-time initialization
+
+--think-time simulates the user typing between start-up and the question, which
+is the time the background warm-up gets to hide. Each run also records the
+startup profile (startup.steps()) of the child process.
+
+Usage:
+    python benchmarks/bench_startup.py --runs 3
+    python benchmarks/bench_startup.py --question "What are NVDA's supply chain risks?" --think-time 3
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ("lazy", "warmup", "eager")
+
+
+def child(mode, question, think_time, spawned_at):
+    sys.path.insert(0, ROOT)
+    os.environ["AGENT_WARMUP"] = "0"
+    import asyncio
+    import startup
+    import agent
+    from langchain_core.messages import HumanMessage
+    imported_at = time.time()
+
+    if mode == "warmup":
+        agent.warm_up()
+        agent.llm_with_tools.warm_up()
+    elif mode == "eager":
+        for thread in agent.warm_up():
+            thread.join()
+        agent.llm_with_tools.get()
+
+    time.sleep(think_time)
+    asked_at = time.time()
+    result = asyncio.run(agent.graph.ainvoke({"messages": [HumanMessage(content=question)]}))
+    answered_at = time.time()
+    startup.mark("first answer")
+
+    print(json.dumps({
+        "import_s": imported_at - spawned_at,
+        "answer_wait_s": answered_at - asked_at,
+        "first_answer_s": answered_at - spawned_at,
+        "tool_calls": sum(len(getattr(m, "tool_calls", []) or []) for m in result["messages"]),
+        "steps": startup.steps(),
+    }))
+
+
+def run_once(mode, question, think_time):
+    spawned_at = time.time()
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", mode, "--question", question,
+         "--think-time", str(think_time), "--spawned-at", repr(spawned_at)],
+        capture_output=True, text=True, cwd=ROOT,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"{mode} run failed:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--question", default="What is the current price of AAPL?")
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--think-time", type=float, default=0.0, help="Seconds between start-up and the question")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--spawned-at", type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.question, args.think_time, args.spawned_at)
+        return
+
+    results = {"question": args.question, "think_time_s": args.think_time, "modes": {}}
+    for mode in args.modes.split(","):
+        runs = [run_once(mode, args.question, args.think_time) for _ in range(args.runs)]
+        summary = {key: statistics.median(run[key] for run in runs)
+                   for key in ("import_s", "answer_wait_s", "first_answer_s")}
+        summary["runs"] = runs
+        results["modes"][mode] = summary
+        print(f"{mode:<7} import {summary['import_s']:6.2f}s  wait after question {summary['answer_wait_s']:6.2f}s  "
+              f"cold start to first answer {summary['first_answer_s']:6.2f}s")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
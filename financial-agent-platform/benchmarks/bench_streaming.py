@@ -0,0 +1,84 @@
+"""
+What streaming changes for the user: time from the question to the first answer
+token vs. to the complete answer (all a non-streaming REPL can show).
+
+Runs agent.graph with the scripted stub model (LLM_BACKEND=stub, stub_llm.py),
+whose time to first token and tokens/s are set with --ttft / --tokens-per-s, on
+a price question (tool round trip, no database needed) and records the
+reasoner metrics the graph returns for every call.
+
+Usage:
+    python benchmarks/bench_streaming.py
+    python benchmarks/bench_streaming.py --ttft 0.8 --tokens-per-s 25 --answer-tokens 400 --json streaming.json
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def ask(graph, question):
+    from langchain_core.messages import HumanMessage
+    start = time.perf_counter()
+    first_answer_token = None
+    metrics = []
+    async for mode, payload in graph.astream({"messages": [HumanMessage(content=question)]},
+                                             stream_mode=["messages", "updates"]):
+        if mode == "messages":
+            chunk, metadata = payload
+            if first_answer_token is None and metadata.get("langgraph_node") == "reasoner" and chunk.content:
+                first_answer_token = time.perf_counter()
+        elif payload.get("reasoner"):
+            metrics.extend(payload["reasoner"]["metrics"])
+    done = time.perf_counter()
+    return {
+        "first_answer_token_s": (first_answer_token or done) - start,
+        "complete_answer_s": done - start,
+        "reasoner_calls": metrics,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--question", default="What is the current price of AAPL and MSFT?")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--ttft", type=float, default=0.5)
+    parser.add_argument("--tokens-per-s", type=float, default=30)
+    parser.add_argument("--answer-tokens", type=int, default=300)
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    # Read by agent.py / stub_llm.py at import
+    os.environ.update(LLM_BACKEND="stub", AGENT_WARMUP="0", STUB_LLM_TTFT=str(args.ttft),
+                      STUB_LLM_TOKENS_PER_S=str(args.tokens_per_s), STUB_LLM_ANSWER_TOKENS=str(args.answer_tokens))
+    sys.path.insert(0, ROOT)
+    import agent
+
+    runs = [asyncio.run(ask(agent.graph, args.question)) for _ in range(args.runs)]
+    first = statistics.median(r["first_answer_token_s"] for r in runs)
+    complete = statistics.median(r["complete_answer_s"] for r in runs)
+    calls = [call for r in runs for call in r["reasoner_calls"]]
+    results = {
+        "question": args.question,
+        "first_answer_token_s": first,
+        "complete_answer_s": complete,
+        "ttft_s": statistics.median(c["ttft_s"] for c in calls),
+        "tokens_per_s": statistics.median(c["tokens_per_s"] for c in calls if c["tokens_per_s"]),
+        "runs": runs,
+    }
+    print(f"\nfirst answer token after {first:.2f}s, complete answer after {complete:.2f}s "
+          f"({complete - first:.2f}s no longer spent staring at an empty prompt)")
+    print(f"per reasoner call: TTFT {results['ttft_s']:.2f}s, {results['tokens_per_s']:.1f} tokens/s")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Exact numeric lookups from the table store (table_store.py) vs the filing size.
+
+Extracts the tables of corpus/retrieval/filings into a scratch SQLite file,
+plus --synthetic-tickers copies under made-up tickers so the store holds as many
+facts as a real 10-K corpus. Then runs the labeled LOOKUPS below through
+table_store.lookup() (what the lookup_financial_value tool calls) and reports
+whether the top fact has the expected value, and the latency.
+
+Usage:
+    python benchmarks/bench_tables.py
+    python benchmarks/bench_tables.py --synthetic-tickers 500 --json tables.json
+"""
+import os
+import sys
+import glob
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import table_store  # noqa: E402
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus", "retrieval", "filings")
+
+# (ticker, metric, year, expected value of the best fact)
+LOOKUPS = [
+    ("ACMX", "net sales", 2024, 4812.6),
+    ("ACMX", "eps", 2023, 4.91),
+    ("ACMX", "Aftermarket Services", 2024, 1121.3),
+    ("ACMX", "interest expense", 2024, -61.9),
+    ("NVLT", "revenue", 2023, 1676.3),
+    ("NVLT", "research and development", 2024, 498.2),
+    ("NVLT", "Automotive Lidar", 2023, 385.3),
+    ("GRNM", "fuel", 2024, 1262),
+    ("GRNM", "net earnings", 2023, 401),
+    ("GRNM", "operating profit", 2024, 681),
+    ("HLXB", "net income", 2023, -94.8),
+    ("HLXB", "collaboration revenue", 2024, 46.5),
+    ("HLXB", "diluted earnings per share", 2024, 0.21),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic-tickers", type=int, default=200, help="Extra copies of the corpus under new tickers")
+    parser.add_argument("--repeat", type=int, default=50, help="Times each lookup is timed")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix="bench_tables_")
+    try:
+        conn = table_store.connect(os.path.join(folder, "tables.db"))
+        files = sorted(glob.glob(os.path.join(CORPUS_DIR, "*.md")))
+        start = time.perf_counter()
+        table_store.extract_files(conn, files)
+        for i in range(args.synthetic_tickers):
+            for path in files:
+                with open(path, encoding="utf-8") as f:
+                    text = f.read()
+                table_store.write_filing(conn, f"S{i:04d}{os.path.basename(path)[:2]}", table_store.extract_facts(text),
+                                         table_store.content_hash(text))
+        extract_s = time.perf_counter() - start
+        facts = conn.execute("SELECT count(*) FROM facts").fetchone()[0]
+
+        correct, latencies = 0, []
+        for ticker, metric, year, expected in LOOKUPS:
+            found = table_store.lookup(conn, ticker, metric, year=year)
+            ok = bool(found) and abs(found[0]["value"] - expected) < 1e-6
+            correct += ok
+            if not ok:
+                print(f"   ✗ {ticker} {metric} {year}: {found[0]['value'] if found else None} != {expected}")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                table_store.lookup(conn, ticker, metric, year=year)
+                latencies.append(time.perf_counter() - start)
+        conn.close()
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+    latencies = np.array(latencies) * 1000
+    results = {
+        "facts": facts,
+        "extract_s": extract_s,
+        "lookups": len(LOOKUPS),
+        "exact": correct / len(LOOKUPS),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+    }
+    print(f"{facts:,} facts extracted in {extract_s:.2f}s")
+    print(f"exact answers {correct}/{len(LOOKUPS)}  p50 {results['p50_ms']:.3f} ms  p99 {results['p99_ms']:.3f} ms")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
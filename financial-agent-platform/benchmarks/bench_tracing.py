@@ -0,0 +1,99 @@
+"""
+Cost of the tracing instrumentation (tracing.py), disabled and enabled.
+
+  span        nanoseconds per span() enter/exit: disabled (no exporter), then
+              exporting to JSONL and to a Chrome trace
+  graph turn  agent.graph on a price question with the stub model (no model
+              server or database): turn p50 with tracing off vs. both exporters on
+
+Usage:
+    python benchmarks/bench_tracing.py
+    python benchmarks/bench_tracing.py --spans 500000 --turns 50 --json tracing.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def span_cost(tracing, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        with tracing.span("bench", i=1) as s:
+            s.set(rows=1)
+    return (time.perf_counter() - start) / n * 1e9
+
+
+async def turn_latencies(graph, question, turns):
+    from langchain_core.messages import HumanMessage
+    import tracing
+    latencies = []
+    for _ in range(turns):
+        start = time.perf_counter()
+        with tracing.span("turn"):
+            async for _ in graph.astream({"messages": [HumanMessage(content=question)]}):
+                pass
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--spans", type=int, default=200_000)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--question", default="What is the current price of AAPL and MSFT?")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    # Read at import: tracing off, stub model with negligible generation time
+    for name in ("TRACE_JSONL", "TRACE_CHROME"):
+        os.environ.pop(name, None)
+    os.environ.update(LLM_BACKEND="stub", AGENT_WARMUP="0", STUB_LLM_TTFT="0.001", STUB_LLM_TOKENS_PER_S="100000",
+                      STUB_LLM_ANSWER_TOKENS="50")
+    sys.path.insert(0, ROOT)
+    import tracing
+    import contextlib
+    import agent
+
+    folder = tempfile.mkdtemp(prefix="bench_tracing_")
+    jsonl, chrome = os.path.join(folder, "trace.jsonl"), os.path.join(folder, "trace.json")
+    results = {"spans": args.spans, "turns": args.turns, "span_ns": {}, "turn_p50_ms": {}}
+    try:
+        tracing.configure()
+        results["span_ns"]["disabled"] = span_cost(tracing, args.spans)
+        tracing.configure(jsonl=jsonl)
+        results["span_ns"]["jsonl"] = span_cost(tracing, args.spans // 10)
+        tracing.configure(chrome=chrome)
+        results["span_ns"]["chrome"] = span_cost(tracing, args.spans // 10)
+
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            for label, exporters in (("warm-up", {}), ("off", {}), ("on", {"jsonl": jsonl, "chrome": chrome})):
+                tracing.configure(**exporters)
+                latencies = asyncio.run(turn_latencies(agent.graph, args.question, args.turns))
+                if label != "warm-up":
+                    results["turn_p50_ms"][label] = statistics.median(latencies) * 1000
+        tracing.flush()
+        results["trace_bytes"] = {"jsonl": os.path.getsize(jsonl), "chrome": os.path.getsize(chrome)}
+    finally:
+        tracing.configure()
+        shutil.rmtree(folder, ignore_errors=True)
+
+    for exporter, ns in results["span_ns"].items():
+        print(f"span  {exporter:<8} {ns:9.0f} ns")
+    off, on = results["turn_p50_ms"]["off"], results["turn_p50_ms"]["on"]
+    print(f"turn  off {off:.2f} ms, on {on:.2f} ms ({(on - off) / off:+.1%})")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+"""
+End-to-end benchmark suite: ingestion, search_10k and the agent graph on a
+synthetic corpus, with machine-readable results for regression checks.
+
+For each corpus size (benchmarks/synth_corpus.py, 50 / 500 / 5000 filings):
+  ingest   datamaking/ingest.py's split -> embed -> upload pipeline into a scratch
+           collection: chunks/s, plus the index build on its own
+  search   tools.search_10k (the async path the agent uses) on distinct queries
+           (cold: embedding + retrieval) and the same queries again (warm: search
+           cache): p50 / p99
+  graph    agent.graph driven by the scripted stub model (stub_llm.py): every turn
+           is one reasoner call with a search_10k and a get_stock_price call, the
+           tools node, then a reasoner call with the answer. Per-node latency
+           comes from the graph's debug stream, plus end-to-end turn p50 / p99.
+
+Embeddings default to "hash", a deterministic feature-hashing embedder with no
+model download, so runs measure the pipeline rather than the model and are
+comparable across machines; pass --embeddings all-MiniLM-L6-v2 for the real one.
+
+With --baseline, every latency (lower is better) and throughput (higher is
+better) metric is compared to an earlier results file, and the exit status is 1
+if any got worse by more than --tolerance.
+
+Usage:
+    python benchmarks/run_suite.py --sizes 50
+    python benchmarks/run_suite.py --backend pgvector --sizes 50 500 5000 --out results.json
+    python benchmarks/run_suite.py --sizes 50 500 --baseline results.json --tolerance 0.2
+"""
+import os
+import sys
+import json
+import time
+import zlib
+import shutil
+import asyncio
+import argparse
+import tempfile
+import platform
+import subprocess
+import contextlib
+from datetime import datetime, timezone
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "datamaking"))
+sys.path.insert(0, BENCH_DIR)
+
+# Read by agent.py at import: no Ollama, no background warm-up
+os.environ.update(LLM_BACKEND="stub", AGENT_WARMUP="0")
+# No cross-encoder download for the suite; bench_rerank.py measures the rerank stage
+os.environ.setdefault("RERANK", "0")
+
+import synth_corpus  # noqa: E402
+import startup  # noqa: E402
+import pgstore  # noqa: E402
+import vector_backends  # noqa: E402
+import ingest  # noqa: E402  (datamaking/ingest.py)
+import tools  # noqa: E402
+import agent  # noqa: E402
+from search_cache import SearchCache  # noqa: E402
+from stub_llm import StubChatModel  # noqa: E402
+from langchain_core.embeddings import Embeddings  # noqa: E402
+from langchain_core.messages import HumanMessage  # noqa: E402
+
+COLLECTION_PREFIX = "bench_suite"
+HASH_DIM = 384  # Same width as all-MiniLM-L6-v2
+QUERY_TOPICS = [
+    "{segment} revenue growth and the drivers of the change",
+    "supplier concentration and supply chain risks",
+    "gross margin compared to the prior fiscal year",
+    "foreign currency and interest rate sensitivity",
+    "cybersecurity incidents and data protection risks",
+    "cash provided by operating activities and capital expenditures",
+]
+
+
+class HashEmbeddings(Embeddings):
+    """Feature-hashed word unigrams and bigrams, L2-normalized. Deterministic and model-free."""
+
+    def __init__(self, dim=HASH_DIM):
+        self.dim = dim
+
+    def _embed(self, text):
+        words = text.lower().split()
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in words + [a + " " + b for a, b in zip(words, words[1:])]:
+            h = zlib.crc32(feature.encode("utf-8"))
+            vector[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+def load_embeddings(name):
+    if name == "hash":
+        return HashEmbeddings()
+    from langchain_huggingface import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name=name)
+
+
+def percentiles(seconds):
+    ms = np.array(seconds) * 1000
+    return {"p50_ms": float(np.percentile(ms, 50)), "p99_ms": float(np.percentile(ms, 99))}
+
+
+def open_scratch_backend(name, size, root):
+    collection = f"{COLLECTION_PREFIX}_{size}"
+    if name == "embedded":
+        return vector_backends.EmbeddedBackend(collection, root=root)
+    backend = vector_backends.PGVectorBackend(collection)
+    pgstore.ensure_schema(backend.conn)
+    pgstore.ensure_manifest(backend.conn)
+    drop_scratch_collection(backend)
+    backend._collection_id = pgstore.create_collection(backend.conn, collection)
+    return backend
+
+
+def drop_scratch_collection(backend):
+    try:
+        collection_id = pgstore.get_collection_id(backend.conn, backend.collection_name)
+    except ValueError:
+        collection_id = None
+    if collection_id is not None:
+        pgstore.drop_ann_indexes(backend.conn, collection_id)
+        pgstore.drop_ticker_partitions(backend.conn, collection_id)
+        pgstore.drop_text_index(backend.conn, collection_id)
+    pgstore.delete_collection(backend.conn, backend.collection_name)
+    # The manifest is keyed by collection name, not by the foreign key
+    with backend.conn.transaction():
+        backend.conn.execute("DELETE FROM filing_manifest WHERE collection = %s", (backend.collection_name,))
+
+
+def run_ingest(backend, md_files, embeddings, index):
+    jobs, _ = ingest.plan_ingestion(md_files, backend.load_manifest())
+    backend.prepare_bulk_load(index)
+    start = time.perf_counter()
+    stats = ingest.run_pipeline(jobs, embeddings, backend)
+    wall = time.perf_counter() - start
+    start = time.perf_counter()
+    backend.build_indexes(index)
+    index_s = time.perf_counter() - start
+    chunks = stats["upload"].chunks
+    return {
+        "chunks": chunks,
+        "wall_s": wall,
+        "chunks_per_s": chunks / wall if wall else None,
+        "index_build_s": index_s,
+        "stage_busy_s": {name: stage.busy for name, stage in stats.items()},
+    }
+
+
+def search_queries(tickers, count):
+    queries = []
+    for i in range(count):
+        # Filing n of the synthetic corpus is in industry n % len(INDUSTRIES)
+        n = i % len(tickers)
+        industry, segments = synth_corpus.INDUSTRIES[n % len(synth_corpus.INDUSTRIES)]
+        ticker = tickers[n]
+        topic = QUERY_TOPICS[i // len(tickers) % len(QUERY_TOPICS)]
+        queries.append((topic.format(segment=segments[i % len(segments)]) + f" ({industry})", ticker))
+    return list(dict.fromkeys(queries))
+
+
+async def run_search(queries):
+    async def timed(query, ticker):
+        start = time.perf_counter()
+        await tools.search_10k.ainvoke({"query": query, "ticker": ticker})
+        return time.perf_counter() - start
+
+    results = {}
+    for phase in ("cold", "warm"):
+        results[phase] = percentiles([await timed(q, t) for q, t in queries])
+    results["queries"] = len(queries)
+    return results
+
+
+def turn_script(tickers, answer_tokens):
+    """Two stub responses per turn: the tool calls, then the answer."""
+    script = []
+    for ticker in tickers:
+        script.append({"tool_calls": [
+            {"name": "search_10k", "args": {"query": f"{ticker} supplier concentration and supply chain risks",
+                                            "ticker": ticker}},
+            {"name": "get_stock_price", "args": {"ticker": ticker}},
+        ]})
+        words = [f"{ticker}'s filing lists supplier concentration among its main risks."]
+        words += ["Detail"] * max(answer_tokens - len(words[0].split()), 0)
+        script.append({"content": " ".join(words)})
+    return script
+
+
+async def run_graph(tickers, args):
+    script = turn_script(tickers, args.answer_tokens)
+    agent.llm_with_tools = startup.Lazy("llm client", lambda: StubChatModel(
+        script=script, ttft=args.ttft, tokens_per_s=args.tokens_per_s).bind_tools(agent.tools))
+    nodes, turns = {}, []
+    for ticker in tickers:
+        started, start = {}, time.perf_counter()
+        question = f"What are {ticker}'s main supply chain risks, and what does the stock trade at?"
+        async for event in agent.graph.astream({"messages": [HumanMessage(content=question)]}, stream_mode="debug"):
+            name = event["payload"].get("name")
+            at = datetime.fromisoformat(event["timestamp"])
+            if event["type"] == "task":
+                started[event["payload"]["id"]] = at
+            elif event["type"] == "task_result" and event["payload"]["id"] in started:
+                nodes.setdefault(name, []).append((at - started.pop(event["payload"]["id"])).total_seconds())
+        turns.append(time.perf_counter() - start)
+    results = {"turns": len(turns), "turn": percentiles(turns)}
+    results["nodes"] = {name: percentiles(durations) for name, durations in nodes.items()}
+    return results
+
+
+async def measure_size(args, size, embeddings, workdir):
+    corpus_dir = os.path.join(workdir, f"corpus_{size}")
+    start = time.perf_counter()
+    md_files = synth_corpus.generate(corpus_dir, size, args.filing_kb, args.seed)
+    generate_s = time.perf_counter() - start
+    tickers = [os.path.splitext(os.path.basename(p))[0] for p in md_files]
+
+    backend = open_scratch_backend(args.backend, size, os.path.join(workdir, f"store_{size}"))
+    results = {"filings": size, "corpus_mb": sum(os.path.getsize(p) for p in md_files) / 1e6,
+               "generate_s": generate_s}
+    try:
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            results["ingest"] = run_ingest(backend, md_files, embeddings, args.index)
+            backend.warm_up()
+
+            # search_10k and the graph read the scratch collection through the tools module
+            tools.embeddings = startup.Lazy("embedding model", lambda: embeddings)
+            tools.backend = startup.Lazy("vector backend", lambda: backend)
+            tools.search_cache = startup.Lazy("search cache", SearchCache)
+            results["search"] = await run_search(search_queries(tickers, args.queries))
+
+            tools.search_cache = startup.Lazy("search cache", SearchCache)
+            results["graph"] = await run_graph(tickers[:args.turns], args)
+    finally:
+        await backend.aclose()
+        if args.backend == "pgvector":
+            drop_scratch_collection(backend)
+            backend.close()
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(results, prefix=""):
+    """{"sizes.50.search.cold.p50_ms": 1.2, ...} for every number in the results."""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def direction(metric):
+    """+1 if higher is better, -1 if lower is better, 0 if the metric is not a performance number."""
+    if metric.endswith("_per_s"):
+        return 1
+    if metric.endswith(("_ms", "_s")) and ".stage_busy_s." not in metric and not metric.endswith("generate_s"):
+        return -1
+    return 0
+
+
+def compare(results, baseline, tolerance):
+    """Returns [(metric, baseline value, new value, relative change)] for every regression."""
+    old, new = flatten(baseline.get("sizes", {}), "sizes."), flatten(results["sizes"], "sizes.")
+    regressions = []
+    for metric, value in new.items():
+        sign = direction(metric)
+        if not sign or not old.get(metric):
+            continue
+        change = (value - old[metric]) / old[metric]
+        if change * sign < -tolerance:
+            regressions.append((metric, old[metric], value, change))
+    return regressions
+
+
+def print_summary(results):
+    for size, r in results["sizes"].items():
+        ingest_r, search_r, graph_r = r["ingest"], r["search"], r["graph"]
+        print(f"\n📦 {size} filings ({r['corpus_mb']:.1f} MB, {ingest_r['chunks']} chunks)")
+        print(f"   ingest  {ingest_r['chunks_per_s']:8.1f} chunks/s  ({ingest_r['wall_s']:.1f}s, "
+              f"index build {ingest_r['index_build_s']:.1f}s)")
+        for phase in ("cold", "warm"):
+            print(f"   search  {phase}  p50 {search_r[phase]['p50_ms']:7.2f} ms  p99 {search_r[phase]['p99_ms']:7.2f} ms")
+        for name, node in graph_r["nodes"].items():
+            print(f"   node    {name:<9} p50 {node['p50_ms']:7.1f} ms  p99 {node['p99_ms']:7.1f} ms")
+        print(f"   turn    p50 {graph_r['turn']['p50_ms']:7.1f} ms  p99 {graph_r['turn']['p99_ms']:7.1f} ms "
+              f"({graph_r['turns']} turns)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=vector_backends.BACKENDS, default="embedded")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(synth_corpus.SIZES), help="Corpus sizes in filings")
+    parser.add_argument("--filing-kb", type=int, default=24, help="Approximate size of each synthetic filing")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--embeddings", default="hash", help="'hash' or a HuggingFace model name")
+    parser.add_argument("--index", choices=["hnsw", "ivfflat", "none"], default="hnsw")
+    parser.add_argument("--queries", type=int, default=100, help="Distinct search_10k queries per size")
+    parser.add_argument("--turns", type=int, default=20, help="Agent turns per size")
+    parser.add_argument("--ttft", type=float, default=0.05, help="Stub model time to first token")
+    parser.add_argument("--tokens-per-s", type=float, default=500, help="Stub model output speed")
+    parser.add_argument("--answer-tokens", type=int, default=60)
+    parser.add_argument("--out", default=os.path.join(BENCH_DIR, "results", "suite.json"))
+    parser.add_argument("--baseline", help="Earlier results file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative slowdown before failing")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated corpus and embedded store")
+    args = parser.parse_args()
+
+    embeddings = load_embeddings(args.embeddings)
+    workdir = tempfile.mkdtemp(prefix="bench_suite_")
+    results = {
+        "meta": {
+            "git_commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "backend": args.backend,
+            "embeddings": args.embeddings,
+            "search_mode": tools.SEARCH_MODE,
+            "args": {k: v for k, v in vars(args).items() if k not in ("out", "baseline", "keep")},
+        },
+        "sizes": {},
+    }
+    try:
+        for size in args.sizes:
+            print(f"⏱️ {size} filings...", flush=True)
+            results["sizes"][str(size)] = asyncio.run(measure_size(args, size, embeddings, workdir))
+    finally:
+        if args.keep:
+            print(f"📁 Corpus and store kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_summary(results)
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n💾 Results written to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        print(f"\n🔍 Compared to {args.baseline} ({baseline.get('meta', {}).get('git_commit')}), "
+              f"tolerance {args.tolerance:.0%}: {len(regressions)} regressions")
+        for metric, old, new, change in regressions:
+            print(f"   ❌ {metric}: {old:.3f} -> {new:.3f} ({change:+.1%})")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
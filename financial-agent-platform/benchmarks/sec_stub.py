@@ -0,0 +1,181 @@
+"""
+Local stand-in for the EDGAR endpoints used by datamaking/sec10k500.py.
+
+Serves, for `tickers` made-up companies (T0000, T0001, ...):
+  /files/company_tickers.json                     ticker -> CIK list
+  /submissions/CIK##########.json                 recent filings, newest 10-K first
+  /Archives/edgar/data/<cik>/<accession>/<doc>    the 10-K, doc_bytes of HTML, streamed
+
+and misbehaves on purpose: per-request latency, a share of 503s, and 429 +
+Retry-After whenever more than rate_limit requests arrive within one second
+(like the SEC's fair-access limit). It records the request rate it saw, so a
+benchmark can check the downloader never exceeded it.
+
+Every tenth company has no 10-K. bump(ticker) files a new 10-K for a company.
+
+Usage:
+    python benchmarks/sec_stub.py --port 8765 --tickers 500
+    SEC_WWW_URL=http://127.0.0.1:8765 SEC_DATA_URL=http://127.0.0.1:8765 python datamaking/sec10k500.py --skip-csv
+"""
+import json
+import time
+import random
+import argparse
+import threading
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+CIK_BASE = 100000
+BLOCK = 64 * 1024
+
+
+class StubSec:
+    def __init__(self, tickers=500, doc_bytes=2_000_000, latency=0.05, error_rate=0.02, rate_limit=10,
+                 host="127.0.0.1", port=0, seed=0):
+        self.tickers = [f"T{i:04d}" for i in range(tickers)]
+        self.doc_bytes = doc_bytes
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.random = random.Random(seed)
+        self.generation = {}  # ticker -> number of 10-Ks filed since start (changes the accession)
+        self.lock = threading.Lock()
+        self.recent = deque()  # Arrival times within the last second
+        self.stats = {"requests": 0, "throttled": 0, "errors": 0, "documents": 0, "max_per_second": 0}
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def bump(self, ticker):
+        with self.lock:
+            self.generation[ticker] = self.generation.get(ticker, 0) + 1
+
+    def cik(self, ticker):
+        return CIK_BASE + self.tickers.index(ticker)
+
+    def accession(self, ticker):
+        return f"0000{self.cik(ticker)}-24-{self.generation.get(ticker, 0):06d}"
+
+    def _admit(self):
+        """Returns the response status decided before routing: 429, 503 or None."""
+        now = time.monotonic()
+        with self.lock:
+            self.stats["requests"] += 1
+            self.recent.append(now)
+            while self.recent and self.recent[0] <= now - 1.0:
+                self.recent.popleft()
+            self.stats["max_per_second"] = max(self.stats["max_per_second"], len(self.recent))
+            if self.rate_limit and len(self.recent) > self.rate_limit:
+                self.stats["throttled"] += 1
+                return 429
+            if self.random.random() < self.error_rate:
+                self.stats["errors"] += 1
+                return 503
+        return None
+
+    def _submissions(self, ticker):
+        forms = ["8-K", "10-Q"] + ([] if self.tickers.index(ticker) % 10 == 9 else ["10-K"]) + ["10-Q"]
+        return {
+            "cik": str(self.cik(ticker)),
+            "filings": {"recent": {
+                "form": forms,
+                "accessionNumber": [self.accession(ticker) if form == "10-K" else f"0000{self.cik(ticker)}-24-9{i:05d}"
+                                    for i, form in enumerate(forms)],
+                "primaryDocument": [f"{ticker.lower()}-{form.lower()}.htm" for form in forms],
+                "filingDate": ["2024-11-01"] * len(forms),
+            }},
+        }
+
+    def _document(self, ticker):
+        header = f"<html><body><h1>{ticker} Form 10-K {self.accession(ticker)}</h1>\n".encode()
+        line = b"<p>Net revenue increased primarily due to higher services revenue and favorable pricing.</p>\n"
+        repeats = max(0, (self.doc_bytes - len(header)) // len(line))
+        return header, line, repeats
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def send_json(self, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                time.sleep(stub.latency)
+                status = stub._admit()
+                if status:
+                    self.send_response(status)
+                    if status == 429:
+                        self.send_header("Retry-After", "1")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                parts = self.path.strip("/").split("/")
+                if self.path == "/files/company_tickers.json":
+                    return self.send_json({str(i): {"cik_str": stub.cik(t), "ticker": t, "title": f"{t} Corp"}
+                                           for i, t in enumerate(stub.tickers)})
+                if parts[0] == "submissions" and len(parts) == 2:
+                    index = int(parts[1][3:13]) - CIK_BASE
+                    if 0 <= index < len(stub.tickers):
+                        return self.send_json(stub._submissions(stub.tickers[index]))
+                if parts[:3] == ["Archives", "edgar", "data"] and len(parts) == 6:
+                    index = int(parts[3]) - CIK_BASE
+                    if 0 <= index < len(stub.tickers):
+                        header, line, repeats = stub._document(stub.tickers[index])
+                        self.send_response(200)
+                        self.send_header("Content-Type", "text/html")
+                        self.send_header("Content-Length", str(len(header) + len(line) * repeats))
+                        self.end_headers()
+                        self.wfile.write(header)
+                        per_block = max(1, BLOCK // len(line))
+                        for start in range(0, repeats, per_block):
+                            self.wfile.write(line * min(per_block, repeats - start))
+                        with stub.lock:
+                            stub.stats["documents"] += 1
+                        return
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a fake EDGAR for sec10k500.py.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--doc-bytes", type=int, default=2_000_000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--rate-limit", type=int, default=10)
+    args = parser.parse_args()
+    stub = StubSec(args.tickers, args.doc_bytes, args.latency, args.error_rate, args.rate_limit, port=args.port)
+    print(f"Serving fake EDGAR on {stub.url} ({args.tickers} tickers). Ctrl+C to stop.")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()
@@ -0,0 +1,155 @@
+"""
+Deterministic synthetic 10-K corpus for benchmarks/run_suite.py.
+
+Writes one Markdown filing per made-up company (ZAAA.md, ZAAB.md, ...), shaped
+like the output of datamaking/markdown.py: a Table of Contents header, Items 1,
+1A, 7, 7A and 8 as '##' headers, prose with figures, and segment / income
+statement tables. The same --seed always gives byte-identical files, so runs
+on different versions index exactly the same text.
+
+Usage:
+    python benchmarks/synth_corpus.py --filings 500 --out /tmp/synth_mds
+    python benchmarks/synth_corpus.py --filings 5000 --filing-kb 40 --out /tmp/synth_mds
+"""
+import os
+import string
+import random
+import argparse
+
+SIZES = (50, 500, 5000)  # The suite's standard corpus sizes
+
+INDUSTRIES = [
+    ("semiconductors", ["Data Center", "Automotive", "Gaming", "Embedded"]),
+    ("consumer electronics", ["Devices", "Services", "Wearables", "Accessories"]),
+    ("grocery retail", ["Grocery", "Pharmacy", "Fuel", "Online"]),
+    ("biotechnology", ["Product Sales", "Collaboration", "Royalties"]),
+    ("industrial machinery", ["Fluid Controls", "Motion", "Aftermarket"]),
+    ("software", ["Cloud", "Licenses", "Support", "Consulting"]),
+    ("banking", ["Consumer Banking", "Commercial Banking", "Wealth Management"]),
+    ("energy", ["Upstream", "Midstream", "Refining", "Renewables"]),
+]
+RISKS = [
+    "We depend on a limited number of suppliers for key {input}, and any disruption at these suppliers could delay shipments and increase our costs.",
+    "A significant portion of our revenue comes from a small number of customers; the loss of any of them would harm our {segment} results.",
+    "Our operations outside the United States expose us to foreign currency fluctuations, tariffs and export controls affecting {input}.",
+    "Cybersecurity incidents affecting our systems or those of our vendors could disrupt operations and expose customer data.",
+    "Competition in {industry} is intense, and pricing pressure from larger competitors could reduce our margins.",
+    "Changes in interest rates and credit conditions could reduce customer demand and increase our borrowing costs.",
+    "We are subject to environmental, health and safety regulations, and compliance costs or remediation liabilities could exceed our accruals.",
+    "Our {segment} business depends on continued adoption of new products; slower adoption would reduce our growth.",
+    "Natural disasters, pandemics or geopolitical conflict could interrupt our manufacturing sites and supply chain for {input}.",
+    "We may not realize the expected benefits of acquisitions, and integration could divert management attention.",
+    "Labor shortages and wage inflation could increase operating costs and constrain our capacity in {segment}.",
+    "Changes in tax laws, including the global minimum tax, could increase our effective tax rate.",
+    "Litigation and regulatory investigations could result in significant fines, damages or changes to our business practices.",
+    "Our indebtedness could limit our flexibility, and a downgrade of our credit rating would raise our financing costs.",
+]
+INPUTS = ["components", "raw materials", "wafers", "rare earth magnets", "packaging", "active ingredients", "energy", "logistics capacity"]
+MDA = [
+    "{segment} revenue was ${value:,.1f} million in fiscal {year}, {direction} {change:.1f}% from fiscal {prior}, driven by {driver}.",
+    "Gross margin was {margin:.1f}% in fiscal {year} compared to {prior_margin:.1f}% in fiscal {prior}, reflecting {driver}.",
+    "Operating expenses increased {change:.1f}% to ${value:,.1f} million as we invested in {segment} capacity and research and development.",
+    "Cash provided by operating activities was ${value:,.1f} million, and capital expenditures were ${capex:,.1f} million.",
+]
+DRIVERS = ["higher volume and favorable pricing", "unfavorable product mix", "lower input costs", "new product launches",
+           "weaker end-market demand", "foreign exchange headwinds", "the acquisition completed during the year"]
+
+
+def ticker_name(i):
+    letters = string.ascii_uppercase
+    return "Z" + letters[i // 676 % 26] + letters[i // 26 % 26] + letters[i % 26]
+
+
+def table(header, rows):
+    lines = ["| " + " | ".join(header) + " |", "|" + " --- |" * len(header)]
+    lines += ["| " + " | ".join(row) + " |" for row in rows]
+    return "\n".join(lines)
+
+
+def filing(i, filing_kb, seed):
+    rng = random.Random(seed * 1_000_003 + i)
+    ticker = ticker_name(i)
+    industry, segments = INDUSTRIES[i % len(INDUSTRIES)]
+    company = f"{ticker.title()} {industry.split()[0].title()} Holdings, Inc."
+    year = 2024
+    prior = year - 1
+    revenue = {s: rng.uniform(200, 20000) for s in segments}
+    prior_revenue = {s: v / rng.uniform(0.85, 1.25) for s, v in revenue.items()}
+    total, prior_total = sum(revenue.values()), sum(prior_revenue.values())
+    margin, prior_margin = rng.uniform(20, 65), rng.uniform(20, 65)
+    fill = lambda template: template.format(  # noqa: E731
+        input=rng.choice(INPUTS), segment=rng.choice(segments), industry=industry, year=year, prior=prior,
+        value=rng.uniform(50, 5000), change=rng.uniform(0.5, 30), direction=rng.choice(["up", "down"]),
+        driver=rng.choice(DRIVERS), margin=margin, prior_margin=prior_margin, capex=rng.uniform(10, 900))
+
+    parts = [
+        "# Table of Contents",
+        "## Item 1. Business",
+        f"{company} operates in the {industry} industry through {len(segments)} reportable segments: "
+        f"{', '.join(segments)}. The Company had approximately {rng.randint(500, 90000):,} employees at the end of fiscal {year}.",
+        "## Item 1A. Risk Factors",
+    ]
+    risks_at = len(parts)
+    parts += [
+        "## Item 7. Management's Discussion and Analysis",
+        f"Total revenue was ${total:,.1f} million in fiscal {year} compared to ${prior_total:,.1f} million in fiscal {prior}.",
+        table(["Segment", f"Fiscal {year}", f"Fiscal {prior}"],
+              [[s, f"${revenue[s]:,.1f}", f"${prior_revenue[s]:,.1f}"] for s in segments]
+              + [["Total revenue", f"${total:,.1f}", f"${prior_total:,.1f}"]]),
+    ]
+    parts += [fill(rng.choice(MDA)) for _ in range(4)]
+    parts += [
+        "## Item 7A. Quantitative and Qualitative Disclosures About Market Risk",
+        f"A hypothetical 10% change in foreign currency exchange rates would change operating income by approximately "
+        f"${rng.uniform(5, 400):,.1f} million. A 100 basis point change in interest rates would change annual interest "
+        f"expense by ${rng.uniform(1, 80):,.1f} million.",
+        "## Item 8. Financial Statements",
+        "(in millions, except per share amounts)",
+        table(["Consolidated Statement of Operations", f"Fiscal {year}", f"Fiscal {prior}"], [
+            ["Total revenue", f"{total:,.1f}", f"{prior_total:,.1f}"],
+            ["Cost of revenue", f"{total * (1 - margin / 100):,.1f}", f"{prior_total * (1 - prior_margin / 100):,.1f}"],
+            ["Operating income", f"{total * rng.uniform(0.05, 0.3):,.1f}", f"{prior_total * rng.uniform(0.05, 0.3):,.1f}"],
+            ["Net income", f"{total * rng.uniform(0.02, 0.2):,.1f}", f"({prior_total * rng.uniform(0.0, 0.05):,.1f} )"],
+            ["Diluted earnings per share", f"{rng.uniform(0.1, 15):.2f}", f"{rng.uniform(0.1, 15):.2f}"],
+        ]),
+    ]
+
+    # Risk factors fill the filing up to its target size, like the long Item 1A of real 10-Ks
+    size = sum(len(p) + 2 for p in parts)
+    risks = []
+    while size < filing_kb * 1024:
+        risk = fill(rng.choice(RISKS))
+        risks.append(risk)
+        size += len(risk) + 2
+    parts[risks_at:risks_at] = risks
+    return ticker, "\n\n".join(parts) + "\n"
+
+
+def generate(folder, filings, filing_kb=24, seed=0):
+    """Writes the corpus into folder (existing identical files are kept). Returns the file paths."""
+    os.makedirs(folder, exist_ok=True)
+    paths = []
+    for i in range(filings):
+        ticker, text = filing(i, filing_kb, seed)
+        path = os.path.join(folder, f"{ticker}.md")
+        if not (os.path.exists(path) and os.path.getsize(path) == len(text.encode("utf-8"))):
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filings", type=int, default=SIZES[0], help=f"Number of filings (suite sizes: {SIZES})")
+    parser.add_argument("--filing-kb", type=int, default=24, help="Approximate size of each filing")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", required=True, help="Folder for the .md files")
+    args = parser.parse_args()
+    paths = generate(args.out, args.filings, args.filing_kb, args.seed)
+    total = sum(os.path.getsize(p) for p in paths)
+    print(f"Wrote {len(paths)} filings ({total / 1e6:.1f} MB) to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+# context_builder.py
+"""
+Turns the chunks retrieved by search_10k into the excerpt text the LLM reads.
+
+The retrieved chunks overlap (CHUNK_OVERLAP characters are repeated between
+neighbours), repeat boilerplate, and come as 15 separate excerpts. Because the
+tool output stays in the conversation, every wasted token is paid again on every
+later reasoner turn. build_context():
+
+1. drops near-duplicates (chunks mostly contained in a better-ranked one)
+2. stitches chunks of the same filing section whose end and start overlap
+3. groups what is left by section, labelled once from the MarkdownHeaderTextSplitter
+   metadata ("Item 7. Management's Discussion... > Liquidity and Capital Resources")
+4. keeps sections and blocks in retrieval order, and stops at the token budget
+   (the last block that does not fit is cut at a line or sentence end)
+
+It returns the text and a stats dict, including the tokens saved against
+pasting every chunk verbatim.
+"""
+import os
+import re
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 2500))
+CHARS_PER_TOKEN = 4            # Token estimate for English filing text; no tokenizer needed
+NEAR_DUPLICATE = 0.9           # Shared share of the smaller chunk's word shingles
+SHINGLE_WORDS = 3
+MIN_OVERLAP_CHARS = 20         # Shortest end/start overlap that counts as adjacency
+MAX_OVERLAP_CHARS = 400        # How far back from a chunk's end to look for its neighbour
+MIN_TRUNCATED_TOKENS = 60      # Smaller leftovers of the budget are not worth a cut excerpt
+LABEL_PART_CHARS = 60
+HEADER_KEYS = ("Header 1", "Header 2", "Header 3")
+GENERIC_HEADERS = {"table of contents"}  # Emitted by datamaking/markdown.py ahead of every filing
+
+_WORD_RE = re.compile(r"\w+")
+_CUT_RE = re.compile(r"(?<=[.!?|])\s|\n")
+
+
+def count_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def section_label(metadata):
+    parts = []
+    for key in HEADER_KEYS:
+        header = (metadata.get(key) or "").strip()
+        if not header or header.lower() in GENERIC_HEADERS:
+            continue
+        if len(header) > LABEL_PART_CHARS:
+            header = header[:LABEL_PART_CHARS - 1].rstrip() + "…"
+        parts.append(header)
+    return " > ".join(parts)
+
+
+def shingles(text):
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_WORDS:
+        return {tuple(words)}
+    return {tuple(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def overlap_length(a, b):
+    """Length of the longest end of a that b starts with (0 if shorter than MIN_OVERLAP_CHARS)."""
+    anchor = b[:MIN_OVERLAP_CHARS]
+    if len(anchor) < MIN_OVERLAP_CHARS:
+        return 0
+    start = a.find(anchor, max(0, len(a) - MAX_OVERLAP_CHARS))
+    while start != -1:
+        if b.startswith(a[start:]):
+            return len(a) - start
+        start = a.find(anchor, start + 1)
+    return 0
+
+
+def truncate(text, max_tokens):
+    """Cuts text to max_tokens at the last line or sentence end that fits."""
+    limit = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    cuts = [m.start() for m in _CUT_RE.finditer(text, 0, limit)]
+    end = cuts[-1] if cuts and cuts[-1] > limit // 2 else limit
+    return text[:end].rstrip() + " …"
+
+
+class _Block:
+    """One or more stitched chunks of the same filing section."""
+
+    def __init__(self, rank, doc):
+        self.rank = rank
+        self.text = doc.page_content.strip()
+        self.source = (doc.metadata.get("ticker"), doc.metadata.get("source"))
+        self.label = section_label(doc.metadata)
+        self.shingles = shingles(self.text)
+
+
+def _drop_near_duplicates(blocks, stats):
+    kept = []
+    for block in blocks:
+        duplicate = any(
+            len(block.shingles & other.shingles) >= NEAR_DUPLICATE * min(len(block.shingles), len(other.shingles))
+            for other in kept
+        )
+        if duplicate:
+            stats["duplicates_dropped"] += 1
+        else:
+            kept.append(block)
+    return kept
+
+
+def _stitch_overlaps(blocks, stats):
+    merged = True
+    while merged:
+        merged = False
+        for first in blocks:
+            for second in blocks:
+                if first is second or first.source != second.source or first.label != second.label:
+                    continue
+                n = overlap_length(first.text, second.text)
+                if n:
+                    first.text += second.text[n:]
+                    first.rank = min(first.rank, second.rank)
+                    blocks.remove(second)
+                    stats["chunks_merged"] += 1
+                    merged = True
+                    break
+            if merged:
+                break
+    return sorted(blocks, key=lambda block: block.rank)
+
+
+def build_context(docs, token_budget=None):
+    """
+    Returns (text, stats) for the retrieved docs, best first. stats has the
+    token counts before/after, chunk counts, and what was merged, dropped or cut.
+    """
+    token_budget = CONTEXT_TOKEN_BUDGET if token_budget is None else token_budget
+    stats = {
+        "chunks_in": len(docs),
+        "raw_tokens": sum(count_tokens(f"---\nExcerpt:\n{doc.page_content}\n") for doc in docs),
+        "duplicates_dropped": 0,
+        "chunks_merged": 0,
+        "blocks_truncated": 0,
+        "blocks_over_budget": 0,
+    }
+
+    blocks = _drop_near_duplicates([_Block(rank, doc) for rank, doc in enumerate(docs)], stats)
+    blocks = _stitch_overlaps(blocks, stats)
+
+    # Sections in order of their best block, each labelled once
+    sections = {}
+    for block in blocks:
+        sections.setdefault(block.label, []).append(block)
+
+    parts = []
+    used = 0
+    for label, section in sections.items():
+        heading = f"--- [{label}] ---" if label else "---"
+        started = False
+        for block in section:
+            prefix = "[…]\n" if started else heading + "\n"
+            available = token_budget - used - count_tokens(prefix)
+            text = block.text
+            if count_tokens(text) > available:
+                if available < MIN_TRUNCATED_TOKENS:
+                    stats["blocks_over_budget"] += 1
+                    continue
+                text = truncate(text, available)
+                stats["blocks_truncated"] += 1
+            parts.append(prefix + text)
+            started = True
+            used += count_tokens(prefix + text) + 1
+
+    text = "\n".join(parts)
+    stats["blocks_out"] = len(parts)
+    stats["tokens"] = count_tokens(text)
+    stats["tokens_saved"] = stats["raw_tokens"] - stats["tokens"]
+    return text, stats
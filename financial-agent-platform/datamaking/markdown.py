@@ -1,85 +1,528 @@
 import os
 import glob
 import re
+import json
+import time
+import hashlib
+import argparse
 import warnings
 import shutil
-from bs4 import BeautifulSoup, XMLParsedAsHTMLWarning
-from markdownify import markdownify as md
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from html import escape
+from lxml import etree
+from bs4 import BeautifulSoup, Tag, XMLParsedAsHTMLWarning
+from markdownify import MarkdownConverter, markdownify as md
 
 warnings.filterwarnings("ignore", category=XMLParsedAsHTMLWarning)
 
-def repair_table_structure(md_text):
+# Precompiled once; these run on every line of every filing.
+SEPARATOR_RE = re.compile(r'^\s*\|[\s\-\|:]+\|\s*$')
+
+
+def repair_table_lines(lines):
     """
-    Master function to fix broken Markdown tables.
+    Streaming version of the table repair: consumes and yields lines one at a time,
+    looking at most one line ahead.
     1. SWAP: Moves the separator line (|---|) to be BELOW the header row.
     2. RESIZE: Fixes the separator line to match the column count of the header.
     """
-    lines = md_text.split('\n')
-    fixed_lines = []
-    i = 0
-    
-    while i < len(lines):
-        line = lines[i]
-        
+    lines = iter(lines)
+    prev_row = None  # Last line we emitted (the header when a separator is in the middle)
+    line = next(lines, None)
+
+    while line is not None:
+        next_line = next(lines, None)
+
         # DETECT SEPARATOR LINE (e.g., |---|---|)
-        if re.match(r'^\s*\|[\s\-\|:]+\|\s*$', line) and '-' in line:
-            
+        if '-' in line and SEPARATOR_RE.match(line):
+
             # CHECK: Is this separator at the TOP of the table? (i.e., before the text?)
-            # Look at the NEXT line
-            if i + 1 < len(lines) and '|' in lines[i+1] and not re.match(r'^\s*\|[\s\-\|:]+\|\s*$', lines[i+1]):
-                
+            if next_line is not None and '|' in next_line and not SEPARATOR_RE.match(next_line):
+
                 # FOUND IT! The separator is first, text is second.
-                # SWAP THEM: Put Text (Header) first, Separator second.
-                header_row = lines[i+1]
-                separator_row = line
-                
-                # NOW RESIZE THE SEPARATOR to match the header's column count
-                # Count pipes in header row and subtract 1 to get column count
-                col_count = header_row.count('|') - 1
+                # SWAP THEM: Put Text (Header) first, Separator second,
+                # resized to the header's column count
+                col_count = next_line.count('|') - 1
                 if col_count > 0:
                     new_separator = '|' + '|'.join([' --- '] * col_count) + '|'
                 else:
-                    new_separator = separator_row # Fallback
+                    new_separator = line # Fallback
+
+                yield next_line
+                yield new_separator
+                prev_row = new_separator
 
-                # Append in correct order
-                fixed_lines.append(header_row)
-                fixed_lines.append(new_separator)
-                
                 # Skip the next line since we just used it
-                i += 2
+                line = next(lines, None)
                 continue
-            
+
             # CHECK: Is this separator in the MIDDLE (normal), but wrong width?
-            else:
-                # Just resize it based on the PREVIOUS line (the header)
-                # Look back at the last added line
-                if fixed_lines and '|' in fixed_lines[-1]:
-                    prev_row = fixed_lines[-1]
-                    col_count = prev_row.count('|') - 1
-                    if col_count > 0:
-                        new_separator = '|' + '|'.join([' --- '] * col_count) + '|'
-                        fixed_lines.append(new_separator)
-                    else:
-                        fixed_lines.append(line)
+            # Just resize it based on the PREVIOUS line (the header)
+            if prev_row is not None and '|' in prev_row and prev_row.count('|') - 1 > 0:
+                line = '|' + '|'.join([' --- '] * (prev_row.count('|') - 1)) + '|'
+
+        # Normal text line (or resized separator), just emit it
+        yield line
+        prev_row = line
+        line = next_line
+
+
+def repair_table_structure(md_text):
+    """
+    Master function to fix broken Markdown tables on a whole document.
+    See repair_table_lines() for the rules.
+    """
+    return '\n'.join(repair_table_lines(md_text.split('\n')))
+
+
+# --- STREAMING CONVERSION ENGINE ---
+# The legacy engine (convert_html_to_markdown_legacy) keeps several full copies of
+# the document alive at once: str(soup), the markdownify output and one copy per
+# re.sub pass. The streaming engine below never holds the whole document either as
+# text or as a tree: lxml parses the file incrementally, every finished top-level
+# block is serialized and removed from the tree, and blocks are converted section
+# by section and pushed through a generator pipeline straight into the output
+# file. The parser itself is replaced every RESTART_CHARS (see iter_blocks()).
+# Peak memory follows the biggest section (or block), not the filing.
+
+DECOMPOSE_TAGS = {'ix:header', 'script', 'style', 'head', 'meta', 'noscript', 'link', 'img'}
+UNWRAP_TAGS = {'ix:nonnumeric', 'ix:continuation', 'span', 'div', 'font', 'b', 'i', 'u', 'center'}
+HIDDEN_STYLE_RE = re.compile(r"display:\s*none", re.I)
+
+# Top-level elements that end a section. A section is flushed at the first of these
+# once it holds at least SECTION_BYTES characters of text.
+BLOCK_TAGS = {'p', 'table', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'ul', 'ol', 'pre', 'blockquote'}
+SECTION_BYTES = 256 * 1024  # measured in text characters
+READ_CHARS = 1 << 20        # characters fed to the parser at a time
+RESTART_CHARS = 4 << 20     # characters a single libxml2 parser is fed at most (roughly)
+# Block start tags, and what hides them: comments, scripts and styles
+RESTART_TOKEN_RE = re.compile(
+    r'(<!--)|(-->)|<(/?)(script|style)\b|<(?:p|table|div|h[1-6]|ul|ol|pre|blockquote)[\s/>]', re.I
+)
+
+MARKDOWN_OPTIONS = dict(heading_style="ATX", strip=['a'], newline_style="BACKSLASH")
+
+# Line-local versions of the legacy regexes. The legacy patterns used \s, which also
+# matches newlines, so the squeezer glued consecutive table rows into a single line.
+# Restricting them to [ \t] keeps one table row per line.
+FINANCIAL_GLUE = [
+    (re.compile(r'\|[ \t]*\$[ \t]*\|[ \t]*'), '| $'),
+    (re.compile(r'\|[ \t]*%[ \t]*\|'), '% |'),
+    (re.compile(r'\|[ \t]*\([ \t]*\|[ \t]*'), '| ('),
+    (re.compile(r'\|[ \t]*\)[ \t]*\|'), ') |'),
+]
+SQUEEZE_RE = re.compile(r'\|([ \t]*\|)+')
+EMPTY_ROW_RE = re.compile(r'^[ \t]*\|[ \t|]*$')
+
+
+def is_removed(tag):
+    """Works on BeautifulSoup tags and lxml elements alike."""
+    name = tag.name if isinstance(tag, Tag) else tag.tag
+    return name in DECOMPOSE_TAGS or bool(HIDDEN_STYLE_RE.search(tag.get('style') or ''))
+
+
+def clean_tree(node):
+    """
+    Does all tag cleanup below 'node' in ONE recursive walk instead of one find_all
+    per tag name. Children are cleaned before they are unwrapped, so every unwrap
+    only touches a small parent.
+    """
+    for child in list(node.children):
+        if not isinstance(child, Tag):
+            continue
+        if is_removed(child):
+            child.decompose()
+            continue
+        clean_tree(child)
+        if child.name in UNWRAP_TAGS:
+            child.unwrap()
+
+
+def visible_length(element):
+    """Text characters of an lxml element, without removed subtrees or comments (like get_text() after cleaning)."""
+    length = len(element.text or '') if isinstance(element.tag, str) else 0
+    for child in element:
+        if isinstance(child.tag, str) and not is_removed(child):
+            length += visible_length(child)
+        length += len(child.tail or '')
+    return length
+
+
+def find_restart_point(data, state):
+    """
+    Returns (position of the last block start tag in 'data' that is outside comments,
+    scripts and styles, or None; lexical state at the end of 'data'). 'state' is the
+    state at the start of 'data': None, '--' (in a comment), 'script' / 'style' or
+    '<' (in an unfinished tag).
+    """
+    point = None
+    start = 0
+    if state == '<':
+        start = data.find('>') + 1
+        if not start:
+            return None, state
+        state = None
+    for match in RESTART_TOKEN_RE.finditer(data, start):
+        comment_start, comment_end, closing, raw_tag = match.groups()
+        if state == '--':
+            if comment_end:
+                state = None
+        elif state is not None:
+            if closing and raw_tag.lower() == state:
+                state = None
+        elif comment_start:
+            state = '--'
+        elif raw_tag:
+            if not closing:
+                state = raw_tag.lower()
+        elif not comment_end and data.rfind('<', 0, match.start()) <= data.rfind('>', 0, match.start()):
+            # (not inside the attributes of another tag)
+            point = match.start()
+    if state is None and data.rfind('<') > data.rfind('>'):
+        state = '<'
+    return point, state
+
+
+def iter_blocks(html_file):
+    """
+    Parses the document incrementally and yields its top-level blocks in document
+    order as (tag name or None for text, HTML, text length). Wrapper tags (div,
+    span, ...) under <body> are flattened as soon as they open, and every block
+    is removed from the tree once it is yielded, so the tree only ever holds the
+    blocks still being parsed.
+    """
+    spine = []          # <body> and the open wrappers being flattened, outermost first
+    open_elements = []  # Everything the parser has opened and not closed yet
+    flattened = set()   # Closed wrappers whose content was already yielded
+
+    def drain(parent, until=None):
+        # The finished content of 'parent' before 'until' (all of it if None), dropped once yielded
+        if parent.text:
+            yield None, escape(parent.text, quote=False), len(parent.text)
+            parent.text = None
+        for child in list(parent):
+            if child is until:
+                break
+            if child in flattened:
+                flattened.discard(child)
+            elif not isinstance(child.tag, str):
+                # Comments count towards the section size, as they did in the BeautifulSoup walk
+                yield None, '', len(child.text or '')
+            elif not is_removed(child):
+                yield child.tag, etree.tostring(child, method='html', encoding='unicode', with_tail=False), \
+                    visible_length(child)
+            if child.tail:
+                yield None, escape(child.tail, quote=False), len(child.tail)
+            parent.remove(child)
+
+    def events():
+        # libxml2's push parser keeps all the input it was fed, so every RESTART_CHARS
+        # the rest of the document goes to a fresh parser. It takes over at a block
+        # start tag while nothing but <body> and flattened wrappers is open, and
+        # reopens those wrappers first, so it builds the same tree.
+        parser = etree.HTMLPullParser(events=("start", "end"))
+        fed, state, pending = 0, None, ''
+        while True:
+            data = html_file.read(READ_CHARS)
+            pending += data
+            # Cut right before a '<' or right after a '>', so the read never splits a
+            # tag, '<!--' or '-->' in two (or keep the last '--' back if there is neither)
+            split = len(pending)
+            if data:
+                window = max(0, split - 64)
+                tag_start, tag_end = pending.rfind('<', window), pending.rfind('>', window)
+                if tag_start < 0 and tag_end < 0:
+                    split = max(0, split - 2)
                 else:
-                    fixed_lines.append(line)
-                i += 1
+                    split = max(tag_start, tag_end + 1)
+            chunk, pending = pending[:split], pending[split:]
+            point, state = find_restart_point(chunk, state)
+            if point is not None and fed + point >= RESTART_CHARS:
+                parser.feed(chunk[:point])
+                yield from parser.read_events()
+                if spine and open_elements[1:] == spine:
+                    wrappers = ''.join(f'<{element.tag}>' for element in spine[1:])
+                    parser.close()
+                    yield from parser.read_events()
+                    parser = etree.HTMLPullParser(events=("start", "end"))
+                    parser.feed('<html><body>' + wrappers)
+                    fed = 0
+                chunk = chunk[point:]
+            if chunk:
+                parser.feed(chunk)
+                fed += len(chunk)
+                yield from parser.read_events()
+            if not data:
+                break
+        try:
+            parser.close()
+        except etree.XMLSyntaxError:
+            return  # Not a single element: an empty document
+        yield from parser.read_events()
+
+    for event, element in events():
+        if event == 'start':
+            open_elements.append(element)
+            if element.tag == 'body':
+                spine.append(element)
+            elif spine and element.getparent() is spine[-1]:
+                # Everything before this element in the open wrapper is finished
+                yield from drain(spine[-1], until=element)
+                if element.tag in UNWRAP_TAGS and not is_removed(element):
+                    spine.append(element)
+            continue
+        open_elements.pop()
+        if spine and element is spine[-1]:
+            yield from drain(element)
+            spine.pop()
+            if spine:
+                flattened.add(element)
+        elif element.tag == 'head':
+            element.clear()
+
+
+def convert_section(converter, parts):
+    # Explicit <body>, so the parser never wraps leading text in an implied <p>
+    soup = BeautifulSoup('<html><body>' + ''.join(parts) + '</body></html>', 'lxml')
+    clean_tree(soup.body)
+    # The document root, like the legacy engine: markdownify trims the ends of a whole document
+    return converter.convert_soup(soup)
+
+
+def iter_sections(blocks):
+    """
+    Yields the Markdown of the document one section at a time. Each section is
+    parsed into its own small tree, which is dropped right after conversion.
+    """
+    converter = MarkdownConverter(**MARKDOWN_OPTIONS)
+    section, size = [], 0
+
+    for name, html, length in blocks:
+        section.append(html)
+        size += length
+
+        if size >= SECTION_BYTES and name in BLOCK_TAGS:
+            yield convert_section(converter, section)
+            section, size = [], 0
+
+    if section:
+        yield convert_section(converter, section)
+
+
+def iter_section_lines(sections):
+    """Flattens sections into lines, with a blank line between sections."""
+    first = True
+    for section in sections:
+        if not first:
+            yield ''
+        first = False
+        yield from section.split('\n')
+
+
+def dedupe_toc(lines):
+    """Keeps the FIRST 'Table of Contents' as a heading and deletes every repeat."""
+    seen = False
+    for line in lines:
+        if "Table of Contents" in line:
+            if not seen:
+                line = line.replace("Table of Contents", "# Table of Contents", 1)
+                head, sep, tail = line.partition("# Table of Contents")
+                line = head + sep + tail.replace("Table of Contents", "")
+                seen = True
+            else:
+                line = line.replace("Table of Contents", "")
+        yield line
+
+
+def clean_table_lines(lines):
+    """Financial glue, table squeezer and empty-row removal, one line at a time."""
+    for line in lines:
+        if '|' in line:
+            for pattern, replacement in FINANCIAL_GLUE:
+                line = pattern.sub(replacement, line)
+            line = SQUEEZE_RE.sub('|', line)
+            if EMPTY_ROW_RE.match(line):
+                continue
+        yield line
 
+
+def collapse_blank_lines(lines):
+    """Never emits more than one empty line in a row."""
+    previous_blank = False
+    for line in lines:
+        if line == '':
+            if previous_blank:
+                continue
+            previous_blank = True
         else:
-            # Normal text line, just add it
-            fixed_lines.append(line)
-            i += 1
-            
-    return '\n'.join(fixed_lines)
+            previous_blank = False
+        yield line
+
+
+def stream_html_to_markdown(html_file, out):
+    """
+    Converts one 10-K read from the file object 'html_file' into cleaned Markdown,
+    writing it to the file object 'out' section by section.
+    """
+    # 1. INCREMENTAL PARSE -> SECTIONS (cleaned and converted one at a time)
+    # The <?xml ?> declaration becomes a processing instruction outside <body> and is skipped
+    # 2. POST-PROCESSING PIPELINE
+    lines = iter_section_lines(iter_sections(iter_blocks(html_file)))
+    lines = dedupe_toc(lines)
+    lines = clean_table_lines(lines)
+    lines = collapse_blank_lines(lines)
+    lines = repair_table_lines(lines)
+
+    first = True
+    for line in lines:
+        if not first:
+            out.write('\n')
+        out.write(line)
+        first = False
+
+
+# Bump this whenever the conversion output changes so cached hashes are invalidated.
+# 3: incremental parse; text split only by dropped comments is no longer double-spaced
+CONVERTER_VERSION = 3
+HASH_MANIFEST = ".html_hashes.json"
+
+
+def convert_html_to_markdown_legacy(raw_content):
+    """
+    The original whole-document conversion, kept as the baseline for
+    benchmarks/bench_markdown.py. New code should use stream_html_to_markdown().
+    """
+    # 1. PRE-CLEANING
+    raw_content = re.sub(r'<\?xml.*?\?>', '', raw_content, flags=re.DOTALL)
+
+    # 2. PARSE
+    soup = BeautifulSoup(raw_content, 'lxml')
+
+    # 3. AGGRESSIVE CLEANING
+    for tag in soup.find_all(['ix:header', 'script', 'style', 'head', 'meta', 'noscript', 'link']):
+        tag.decompose()
+
+    for tag in soup.find_all(attrs={"style": re.compile(r"display:\s*none", re.I)}):
+        tag.decompose()
+
+    # Remove images
+    for img in soup.find_all('img'):
+        img.decompose()
+
+    # Unwrap data
+    unwrap_tags = ['ix:nonnumeric', 'ix:continuation', 'span', 'div', 'font', 'b', 'i', 'u', 'center']
+    for tag_name in unwrap_tags:
+        for tag in soup.find_all(tag_name):
+            tag.unwrap()
+
+    # 4. MARKDOWN CONVERSION
+    clean_html = str(soup)
+    markdown_text = md(
+        clean_html,
+        heading_style="ATX",
+        strip=['a'],
+        newline_style="BACKSLASH"
+    )
+
+    # 5. POST-PROCESSING (REGEX CLEANUP)
+
+    # A. Remove Repetitive "Table of Contents"
+    # Replace the FIRST one with a placeholder
+    markdown_text = markdown_text.replace("Table of Contents", "@@@MAIN_TOC@@@", 1)
+    # Delete ALL others
+    markdown_text = markdown_text.replace("Table of Contents", "")
+    # Restore the first one
+    markdown_text = markdown_text.replace("@@@MAIN_TOC@@@", "# Table of Contents")
+
+    # B. Financial Glue
+    markdown_text = re.sub(r'\|\s*\$\s*\|\s*', '| $', markdown_text)
+    markdown_text = re.sub(r'\|\s*%\s*\|', '% |', markdown_text)
+    markdown_text = re.sub(r'\|\s*\(\s*\|\s*', '| (', markdown_text)
+    markdown_text = re.sub(r'\|\s*\)\s*\|', ') |', markdown_text)
+
+    # C. Table Squeezer (The "20 columns to 5" fixer)
+    markdown_text = re.sub(r'\|(\s*\|)+', '|', markdown_text)
+
+    # D. Remove Empty Rows
+    markdown_text = re.sub(r'^\s*\|[\s\|]*\|\s*$', '', markdown_text, flags=re.MULTILINE)
 
-def clean_and_convert():
+    # E. Whitespace Cleanup
+    markdown_text = re.sub(r'\n{3,}', '\n\n', markdown_text)
+
+    # 6. REPAIR STRUCTURE (SWAP & RESIZE)
+    # This aligns the headers and moves the separator line to the correct spot
+    return repair_table_structure(markdown_text)
+
+
+def file_sha256(path):
+    """Hashes a file in 1 MB blocks so large filings are never read into memory twice."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_hash_manifest(output_dir):
+    path = os.path.join(output_dir, HASH_MANIFEST)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    # Hashes written by an older converter are useless: the output would differ.
+    if manifest.get("version") != CONVERTER_VERSION:
+        return {}
+    return manifest.get("files", {})
+
+
+def save_hash_manifest(output_dir, files):
+    path = os.path.join(output_dir, HASH_MANIFEST)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"version": CONVERTER_VERSION, "files": files}, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def convert_file(file_path, output_dir):
+    """
+    Converts one HTML filing and writes '<TICKER>.md' into output_dir.
+    Runs inside worker processes, so it never raises: failures are returned instead
+    and one broken filing cannot take down the rest of the batch.
+    Returns (ticker, ok, input_bytes, error).
+    """
+    ticker = os.path.basename(os.path.splitext(file_path)[0])
+    md_filename = os.path.join(output_dir, f"{ticker}.md")
+    try:
+        input_bytes = os.path.getsize(file_path)
+        # Write to a temp file so a failure never leaves a half-written .md behind
+        tmp_filename = md_filename + ".tmp"
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as src, \
+                open(tmp_filename, 'w', encoding='utf-8') as f:
+            stream_html_to_markdown(src, f)
+        os.replace(tmp_filename, md_filename)
+        return ticker, True, input_bytes, None
+    except Exception as e:
+        return ticker, False, 0, str(e)
+
+
+def clean_and_convert(workers=None, force=False, cleanup=False):
+    """
+    Converts every HTML filing to Markdown.
+
+    Args:
+        workers: Number of worker processes. 1 runs serially in this process;
+            None uses every CPU core.
+        force: Reconvert files even if their HTML hash has not changed.
+        cleanup: Delete the 'html10k' folder afterwards (only if every file succeeded).
+    """
     # --- CONFIGURATION ---
     # Search in 'html10k' folder OR current folder
     search_patterns = [os.path.join("html10k", "*.html"), "*.html"]
     html_files = []
     for pattern in search_patterns:
         html_files.extend(glob.glob(pattern))
-    html_files = list(set(html_files))
+    html_files = sorted(set(html_files))
 
     output_dir = "mds"
     if not os.path.exists("mds"):
@@ -89,84 +532,78 @@ def clean_and_convert():
         print("No HTML files found.")
         return
 
-    print(f"Found {len(html_files)} HTML files. Starting conversion...")
+    workers = workers or os.cpu_count() or 1
+    print(f"Found {len(html_files)} HTML files.")
 
+    # Skip files whose source HTML is unchanged since the last successful run
+    known_hashes = {} if force else load_hash_manifest(output_dir)
+    current_hashes = {}
+    to_convert = []
     for file_path in html_files:
         ticker = os.path.basename(os.path.splitext(file_path)[0])
+        current_hashes[ticker] = file_sha256(file_path)
         md_filename = os.path.join(output_dir, f"{ticker}.md")
-        print(f"Processing {ticker}...", end=" ")
-        
-        try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                raw_content = f.read()
-
-            # 1. PRE-CLEANING
-            raw_content = re.sub(r'<\?xml.*?\?>', '', raw_content, flags=re.DOTALL)
-
-            # 2. PARSE
-            soup = BeautifulSoup(raw_content, 'lxml')
-
-            # 3. AGGRESSIVE CLEANING
-            for tag in soup.find_all(['ix:header', 'script', 'style', 'head', 'meta', 'noscript', 'link']):
-                tag.decompose()
-            
-            for tag in soup.find_all(attrs={"style": re.compile(r"display:\s*none", re.I)}):
-                tag.decompose()
-            
-            # Remove images
-            for img in soup.find_all('img'):
-                img.decompose()
-
-            # Unwrap data
-            unwrap_tags = ['ix:nonnumeric', 'ix:continuation', 'span', 'div', 'font', 'b', 'i', 'u', 'center']
-            for tag_name in unwrap_tags:
-                for tag in soup.find_all(tag_name):
-                    tag.unwrap()
-
-            # 4. MARKDOWN CONVERSION
-            clean_html = str(soup)
-            markdown_text = md(
-                clean_html, 
-                heading_style="ATX", 
-                strip=['a'], 
-                newline_style="BACKSLASH"
-            )
-
-            # 5. POST-PROCESSING (REGEX CLEANUP)
-
-            # A. Remove Repetitive "Table of Contents"
-            # Replace the FIRST one with a placeholder
-            markdown_text = markdown_text.replace("Table of Contents", "@@@MAIN_TOC@@@", 1)
-            # Delete ALL others
-            markdown_text = markdown_text.replace("Table of Contents", "")
-            # Restore the first one
-            markdown_text = markdown_text.replace("@@@MAIN_TOC@@@", "# Table of Contents")
-
-            # B. Financial Glue
-            markdown_text = re.sub(r'\|\s*\$\s*\|\s*', '| $', markdown_text)
-            markdown_text = re.sub(r'\|\s*%\s*\|', '% |', markdown_text)
-            markdown_text = re.sub(r'\|\s*\(\s*\|\s*', '| (', markdown_text)
-            markdown_text = re.sub(r'\|\s*\)\s*\|', ') |', markdown_text)
-
-            # C. Table Squeezer (The "20 columns to 5" fixer)
-            markdown_text = re.sub(r'\|(\s*\|)+', '|', markdown_text)
-
-            # D. Remove Empty Rows
-            markdown_text = re.sub(r'^\s*\|[\s\|]*\|\s*$', '', markdown_text, flags=re.MULTILINE)
-
-            # E. Whitespace Cleanup
-            markdown_text = re.sub(r'\n{3,}', '\n\n', markdown_text)
-
-            # 6. REPAIR STRUCTURE (SWAP & RESIZE)
-            # This aligns the headers and moves the separator line to the correct spot
-            markdown_text = repair_table_structure(markdown_text)
-
-            with open(md_filename, 'w', encoding='utf-8') as f:
-                f.write(markdown_text)
-            
-            print(f"-> Saved clean Markdown to {md_filename}")
-        except Exception as e:
-            print(f"-> Failed: {e}")
-    shutil.rmtree("html10k")
+        if known_hashes.get(ticker) == current_hashes[ticker] and os.path.exists(md_filename):
+            continue
+        to_convert.append(file_path)
+
+    skipped = len(html_files) - len(to_convert)
+    if skipped:
+        print(f"Skipping {skipped} unchanged files.")
+    if not to_convert:
+        print("Nothing to convert.")
+        return
+    print(f"Starting conversion of {len(to_convert)} files with {workers} worker(s)...")
+
+    start = time.perf_counter()
+    total_bytes = 0
+    failures = []
+
+    def record(result):
+        nonlocal total_bytes
+        ticker, ok, input_bytes, error = result
+        if ok:
+            total_bytes += input_bytes
+            known_hashes[ticker] = current_hashes[ticker]
+            print(f"Processing {ticker}... -> Saved clean Markdown to {os.path.join(output_dir, ticker + '.md')}")
+        else:
+            known_hashes.pop(ticker, None)
+            failures.append(ticker)
+            print(f"Processing {ticker}... -> Failed: {error}")
+
+    if workers == 1:
+        for file_path in to_convert:
+            record(convert_file(file_path, output_dir))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(convert_file, path, output_dir): path for path in to_convert}
+            for future in as_completed(futures):
+                try:
+                    record(future.result())
+                except Exception as e:
+                    # A worker died outright (e.g. OOM-killed); isolate it like any other failure
+                    ticker = os.path.basename(os.path.splitext(futures[future])[0])
+                    record((ticker, False, 0, repr(e)))
+
+    save_hash_manifest(output_dir, known_hashes)
+
+    # --- THROUGHPUT REPORT ---
+    elapsed = time.perf_counter() - start
+    converted = len(to_convert) - len(failures)
+    if elapsed > 0:
+        print(f"\nConverted {converted} files ({len(failures)} failed) in {elapsed:.1f}s: "
+              f"{converted / elapsed:.2f} files/s, {total_bytes / elapsed / 1e6:.2f} MB/s")
+
+    if cleanup:
+        if failures:
+            print("Keeping 'html10k' because some files failed.")
+        elif os.path.exists("html10k"):
+            shutil.rmtree("html10k")
+
 if __name__ == "__main__":
-    clean_and_convert()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Convert 10-K HTML filings to clean Markdown.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (1 = serial, default = all cores)")
+    parser.add_argument("--force", action="store_true", help="Reconvert even if the HTML is unchanged")
+    parser.add_argument("--cleanup", action="store_true", help="Delete 'html10k' after a fully successful run")
+    args = parser.parse_args()
+    clean_and_convert(workers=args.workers, force=args.force, cleanup=args.cleanup)
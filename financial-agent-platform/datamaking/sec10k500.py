@@ -1,15 +1,19 @@
 import pandas as pd
-from sec_edgar_downloader import Downloader
 import os
-import shutil
-import glob
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
 import requests
 from io import StringIO
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 
 def download_sp500_csv():
     url = 'https://en.wikipedia.org/wiki/List_of_S%26P_500_companies'
-    
+
     # Define a User-Agent header to mimic a browser
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
@@ -22,93 +26,306 @@ def download_sp500_csv():
 
         # Use StringIO to make the HTML string look like a file object for pandas
         tables = pd.read_html(StringIO(response.text))
-        
+
         # The first table is usually the S&P 500 list
         sp500_table = tables[0]
-        
+
         print("First 5 rows fetched:")
         print(sp500_table.head())
-        
+
         csv_filename = 'sp500_companies.csv'
         sp500_table.to_csv(csv_filename, index=False)
         print(f"\nSuccessfully saved to '{csv_filename}'")
-        
+
     except Exception as e:
         print(f"Error: {e}")
 
-def download_latest_10k():
-    # --- CONFIGURATION ---
-    # SEC requires a User-Agent formatted as "Name email@domain.com"
-    # Please replace these with your actual details to avoid being blocked.
-    USER_NAME = "YourName"
-    USER_EMAIL = "your.email@example.com" 
-    
-    CSV_FILE = 'sp500_companies.csv'
-    DOWNLOAD_FOLDER = "sec-edgar-filings" # Temp folder created by the library
-    TARGET_FOLDER = "html10k"
-    # ---------------------
-    if not os.path.exists(TARGET_FOLDER):
-        os.makedirs(TARGET_FOLDER)
-        print(f"Created directory: {TARGET_FOLDER}")
-    # Initialize the downloader
-    dl = Downloader(USER_NAME, USER_EMAIL)
+# --- CONFIGURATION ---
+# SEC requires a User-Agent formatted as "Name email@domain.com"
+# Please replace these with your actual details to avoid being blocked.
+USER_NAME = "YourName"
+USER_EMAIL = "your.email@example.com"
+SEC_USER_AGENT = os.getenv("SEC_USER_AGENT", f"{USER_NAME} {USER_EMAIL}")
 
-    # Read the tickers from your CSV
+# EDGAR endpoints (overridable, so benchmarks/sec_stub.py can stand in for the SEC)
+SEC_WWW_URL = os.getenv("SEC_WWW_URL", "https://www.sec.gov")
+SEC_DATA_URL = os.getenv("SEC_DATA_URL", "https://data.sec.gov")
+
+CSV_FILE = 'sp500_companies.csv'
+TARGET_FOLDER = "html10k"
+STATE_FILE = ".download_state.json"  # Per-ticker progress, kept in TARGET_FOLDER
+
+# Scheduling
+SEC_RATE_LIMIT = float(os.getenv("SEC_RATE_LIMIT", 10))  # SEC fair-access ceiling: 10 requests/second
+RATE_HEADROOM = 0.85    # Share of the ceiling actually used; network jitter bunches requests up
+DOWNLOAD_WORKERS = 8
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 1.0      # Seconds before the first retry, doubled per attempt (plus jitter)
+BACKOFF_MAX = 60.0
+REFRESH_AFTER_HOURS = 24  # Tickers checked more recently than this are skipped without a request
+STREAM_BLOCK = 1 << 20
+RETRY_STATUS = {429, 500, 502, 503, 504}
+DONE_STATUSES = {"downloaded", "unchanged", "no_10k"}
+# ---------------------
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: acquire() blocks until a request may be sent.
+    The default capacity of 1 spaces requests evenly (no bursts), so across all
+    workers a one-second window never holds more than rate + 1 requests.
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class RetryableError(Exception):
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class SecClient:
+    """Rate-limited, retrying EDGAR client shared by all download workers (one HTTP session per thread)."""
+
+    def __init__(self, rate=SEC_RATE_LIMIT, user_agent=SEC_USER_AGENT, www_url=SEC_WWW_URL, data_url=SEC_DATA_URL):
+        self.bucket = TokenBucket(rate * RATE_HEADROOM)
+        self.user_agent = user_agent
+        self.www_url = www_url.rstrip("/")
+        self.data_url = data_url.rstrip("/")
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "retries": 0, "throttled": 0, "bytes": 0}
+
+    def count(self, key, n=1):
+        with self.lock:
+            self.stats[key] += n
+
+    def session(self):
+        if not hasattr(self.local, "session"):
+            self.local.session = requests.Session()
+            self.local.session.headers.update({"User-Agent": self.user_agent, "Accept-Encoding": "gzip, deflate"})
+        return self.local.session
+
+    def get(self, url, stream=False):
+        self.bucket.acquire()
+        self.count("requests")
+        response = self.session().get(url, stream=stream, timeout=30)
+        if response.status_code in RETRY_STATUS:
+            if response.status_code == 429:
+                self.count("throttled")
+            retry_after = response.headers.get("Retry-After")
+            response.close()
+            raise RetryableError(f"HTTP {response.status_code} for {url}", retry_after)
+        response.raise_for_status()
+        return response
+
+    def retrying(self, action):
+        """Runs action(), retrying throttling, server errors and dropped connections with backoff."""
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                return action()
+            except (RetryableError, requests.ConnectionError, requests.Timeout,
+                    requests.exceptions.ChunkedEncodingError) as e:
+                if attempt == MAX_ATTEMPTS:
+                    raise
+                retry_after = getattr(e, "retry_after", None)
+                if retry_after and retry_after.isdigit():
+                    delay = float(retry_after)
+                else:
+                    delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempt - 1))
+                self.count("retries")
+                time.sleep(delay * random.uniform(1.0, 1.5))
+
+    def json(self, url):
+        return self.retrying(lambda: self.get(url).json())
+
+    def download(self, url, path):
+        """
+        Streams url to path (through path + '.part', so a crash never leaves a
+        truncated filing behind). Returns (sha256, bytes).
+        """
+        def attempt():
+            digest = hashlib.sha256()
+            size = 0
+            with self.get(url, stream=True) as response, open(path + ".part", "wb") as f:
+                for block in response.iter_content(STREAM_BLOCK):
+                    f.write(block)
+                    digest.update(block)
+                    size += len(block)
+            os.replace(path + ".part", path)
+            return digest.hexdigest(), size
+
+        sha, size = self.retrying(attempt)
+        self.count("bytes", size)
+        return sha, size
+
+    def ticker_ciks(self):
+        """{'BRK-B': 1067983, ...} from EDGAR's ticker list."""
+        companies = self.json(f"{self.www_url}/files/company_tickers.json")
+        return {entry["ticker"].upper(): int(entry["cik_str"]) for entry in companies.values()}
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(STREAM_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_state(target_folder):
     try:
-        df = pd.read_csv(CSV_FILE)
-        tickers = df['Symbol'].tolist()
-    except FileNotFoundError:
-        print(f"Error: Could not find {CSV_FILE}. Please run the previous script first.")
-        return
+        with open(os.path.join(target_folder, STATE_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
 
-    print(f"Found {len(tickers)} companies. Starting download...")
 
-    for ticker in tickers:
-        # SEC tickers often use hyphen instead of dot (e.g., BRK.B -> BRK-B)
-        formatted_ticker = ticker.replace('.', '-')
-        
-        print(f"\nProcessing: {ticker}...")
-        
+def save_state(target_folder, state):
+    path = os.path.join(target_folder, STATE_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def download_ticker(client, ticker, cik, target_folder, previous):
+    """
+    Fetches the latest 10-K of one company into '<TICKER>.html'. Returns its new state entry.
+    The filing is only downloaded when its accession number changed or the local
+    copy no longer matches the recorded checksum.
+    """
+    submissions = client.json(f"{client.data_url}/submissions/CIK{cik:010d}.json")
+    recent = submissions["filings"]["recent"]
+    # Newest first; the primary document is the 10-K itself (exhibits are separate files)
+    latest = next(
+        (
+            (accession, document, filed)
+            for form, accession, document, filed in zip(
+                recent["form"], recent["accessionNumber"], recent["primaryDocument"], recent["filingDate"]
+            )
+            if form == "10-K"
+        ),
+        None,
+    )
+    entry = {"cik": cik, "checked_at": time.time()}
+    if latest is None:
+        return dict(entry, status="no_10k")
+    accession, document, filed = latest
+    entry.update(accession=accession, filing_date=filed)
+
+    path = os.path.join(target_folder, f"{ticker}.html")
+    if previous.get("accession") == accession and previous.get("sha256") and os.path.exists(path) \
+            and file_sha256(path) == previous["sha256"]:
+        return dict(entry, status="unchanged", sha256=previous["sha256"], bytes=previous.get("bytes"))
+
+    url = f"{client.www_url}/Archives/edgar/data/{cik}/{accession.replace('-', '')}/{document}"
+    sha, size = client.download(url, path)
+    status = "unchanged" if sha == previous.get("sha256") else "downloaded"
+    return dict(entry, status=status, sha256=sha, bytes=size)
+
+
+def download_latest_10k(tickers=None, workers=DOWNLOAD_WORKERS, rate=SEC_RATE_LIMIT, target_folder=TARGET_FOLDER,
+                        refresh_after_hours=REFRESH_AFTER_HOURS, force=False, client=None):
+    """
+    Downloads the latest 10-K of every ticker (default: the CSV from download_sp500_csv)
+    with `workers` threads sharing one token bucket of `rate` requests/second.
+
+    Progress is saved to TARGET_FOLDER/.download_state.json after every ticker, so an
+    interrupted run resumes where it stopped: tickers finished within
+    refresh_after_hours are skipped without any request, and unchanged filings
+    (same accession, same checksum) are never downloaded twice.
+    Returns a summary dict.
+    """
+    if not os.path.exists(target_folder):
+        os.makedirs(target_folder)
+        print(f"Created directory: {target_folder}")
+
+    # Read the tickers from your CSV
+    if tickers is None:
         try:
-            # Download the latest 10-K (limit=1)
-            # download_details=True ensures we get the readable HTML file
-            count = dl.get("10-K", formatted_ticker, limit=1, download_details=True)
-            
-            if count == 0:
-                print(f"No 10-K found for {ticker}")
-                continue
-
-            # The library saves to: sec-edgar-filings/TICKER/10-K/ACCESSION_NUMBER/primary-document.html
-            # We need to find that HTML file and move it.
-            
-            # Construct the path pattern to find the .htm files
-            # Note: We look for the folder matching the formatted ticker
-            search_path = os.path.join(DOWNLOAD_FOLDER, formatted_ticker, "10-K", "*", "*.htm*")
-            files = glob.glob(search_path)
-            
-            if files:
-                # Heuristic: The main 10-K is usually the largest HTML file in the folder
-                # (Exhibits are usually smaller)
-                main_file = max(files, key=os.path.getsize)
-                
-                # Define the new filename (e.g., AAPL.html)
-                new_filename = f"{ticker}.html"
-                
-                destination_path = os.path.join(TARGET_FOLDER, new_filename) 
-                # Move and rename
-                shutil.move(main_file, destination_path)
-                print(f"-> Saved as {new_filename}")
-                
-            else:
-                print(f"-> Downloaded, but could not locate HTML file for {ticker}")
-
-        except Exception as e:
-            print(f"-> Failed: {e}")
-
-    # Optional: Cleanup the 'sec-edgar-filings' temp folder after finishing
-    shutil.rmtree(DOWNLOAD_FOLDER) 
-    print("\nCleanup complete.")
+            df = pd.read_csv(CSV_FILE)
+            tickers = df['Symbol'].tolist()
+        except FileNotFoundError:
+            print(f"Error: Could not find {CSV_FILE}. Please run the previous script first.")
+            return None
+
+    client = client or SecClient(rate=rate)
+    state = load_state(target_folder)
+    fresh_after = time.time() - refresh_after_hours * 3600
+    pending = [
+        ticker for ticker in tickers
+        if force or state.get(ticker, {}).get("status") not in DONE_STATUSES
+        or state[ticker].get("checked_at", 0) < fresh_after
+    ]
+    print(f"Found {len(tickers)} companies, {len(tickers) - len(pending)} already up to date. "
+          f"Downloading {len(pending)} with {workers} workers at {rate:g} requests/s...")
+    if not pending:
+        return {"tickers": 0, "seconds": 0.0, "statuses": {}, **client.stats}
+
+    start = time.perf_counter()
+    ciks = client.ticker_ciks()
+    state_lock = threading.Lock()
+    statuses = {}
+
+    def work(ticker):
+        # SEC tickers often use hyphen instead of dot (e.g., BRK.B -> BRK-B)
+        cik = ciks.get(ticker.replace('.', '-').upper())
+        if cik is None:
+            return {"status": "unknown_ticker", "checked_at": time.time()}
+        return download_ticker(client, ticker, cik, target_folder, state.get(ticker, {}))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(work, ticker): ticker for ticker in pending}
+        for done, future in enumerate(as_completed(futures), start=1):
+            ticker = futures[future]
+            try:
+                entry = future.result()
+            except Exception as e:
+                entry = {"status": "failed", "error": str(e), "checked_at": time.time(),
+                         "failures": state.get(ticker, {}).get("failures", 0) + 1}
+            with state_lock:
+                # Keep what a failed attempt does not know (last good accession and checksum)
+                state[ticker] = {**state.get(ticker, {}), **entry} if entry["status"] == "failed" else entry
+                save_state(target_folder, state)
+            statuses[entry["status"]] = statuses.get(entry["status"], 0) + 1
+            detail = entry.get("error") or entry.get("accession") or ""
+            print(f"[{done}/{len(pending)}] {ticker}: {entry['status']} {detail}")
+
+    seconds = time.perf_counter() - start
+    print(f"\nDone in {seconds:.1f}s ({len(pending) / seconds * 60:.0f} tickers/minute): "
+          + ", ".join(f"{count} {status}" for status, count in sorted(statuses.items())))
+    print(f"{client.stats['requests']} requests, {client.stats['retries']} retries "
+          f"({client.stats['throttled']} throttled), {client.stats['bytes'] / 1e6:.1f} MB")
+    return {"tickers": len(pending), "seconds": seconds, "statuses": statuses, **client.stats}
 
 if __name__ == "__main__":
-    download_sp500_csv()
-    download_latest_10k()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Download the latest 10-K of every S&P 500 company from EDGAR.")
+    parser.add_argument("--workers", type=int, default=DOWNLOAD_WORKERS, help="Concurrent downloads")
+    parser.add_argument("--rate", type=float, default=SEC_RATE_LIMIT, help="Requests per second across all workers")
+    parser.add_argument("--refresh-after", type=float, default=REFRESH_AFTER_HOURS,
+                        help="Hours before a finished ticker is checked again")
+    parser.add_argument("--force", action="store_true", help="Check every ticker again, ignoring the state file")
+    parser.add_argument("--skip-csv", action="store_true", help=f"Reuse the existing {CSV_FILE}")
+    args = parser.parse_args()
+    if not args.skip_csv:
+        download_sp500_csv()
+    download_latest_10k(workers=args.workers, rate=args.rate, refresh_after_hours=args.refresh_after, force=args.force)
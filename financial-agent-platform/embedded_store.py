@@ -0,0 +1,658 @@
+# embedded_store.py
+"""
+In-process vector store: a collection lives in memory-mapped files on local
+disk, sharded per ticker, and is searched with numpy inside the agent process.
+There is no network round trip and no SQL plan; for the 50-ticker deployment the
+whole corpus fits in RAM.
+
+On-disk layout (one folder per collection):
+    manifest.json                  dimension, index settings and, per ticker, the
+                                   shard version plus its filing manifest row
+    shards/<TICKER>-<v>.f32        (rows, dim) float32 unit vectors, memory-mapped
+    shards/<TICKER>-<v>.jsonl      one {"id", "text", "metadata"} per row
+    shards/<TICKER>-<v>.ivf.npz    optional IVF lists: centroids, row order, offsets
+    shards/<TICKER>-<v>.bm25.npz   BM25 inverted index of the texts (lexical.py)
+    shards/<TICKER>-<v>.quant.npz  optional compact copy of the vectors (half, int8 or binary)
+
+Shards are never modified in place. A write produces version v+1 of the
+ticker's files and then atomically replaces manifest.json, which is the commit
+point (the role filing_manifest plays in Postgres): a crash leaves the previous
+version intact. Readers pick up new versions on refresh(). Version v-1 is only
+deleted when v+1 is written, so a reader that has not refreshed yet can still
+open the files its manifest names; one that fell further behind refreshes and
+retries (shard()).
+
+Search is exact by default (one matrix-vector product per shard). With nprobe > 0,
+shards that have IVF lists (see build_indexes()) only score the rows of the
+nprobe closest lists. Scores are pgvector's cosine distance: lower is better.
+
+With quantized codes (see build_quantized()) the first pass scores the compact
+copy instead, which stays in RAM at 1/2 (half), 1/4 (int8) or 1/32 (binary) of
+the float32 size, and only the k * oversample best rows are rescored with the
+memory-mapped float32 vectors. A collection too large for the page cache then
+reads a few hundred float32 rows per query instead of every row of the shard.
+lexical_search_with_score() ranks the same shards with BM25 instead.
+
+A filter on "item" (the 10-K Item, see sections.py) is answered from each
+shard's rows per Item, the embedded counterpart of pgstore's (ticker, item)
+index: a section search scores only that section's rows, exactly.
+
+One process should write to a given collection at a time (ingest.py).
+"""
+import os
+import re
+import sys
+import json
+import uuid
+import time
+import threading
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+from lexical import BM25Index
+
+DEFAULT_ROOT = os.getenv(
+    "EMBEDDED_STORE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "fin_agent", "vectors")
+)
+DEFAULT_NPROBE = int(os.getenv("EMBEDDED_NPROBE", 0))  # 0 = exact search
+MIN_IVF_ROWS = 2048       # Smaller shards are always searched exactly
+KMEANS_ITERATIONS = 10
+NO_TICKER = "_"           # Shard of documents without a ticker
+MANIFEST_FORMAT = 1
+QUANTIZATIONS = ("none", "half", "int8", "binary")
+DEFAULT_OVERSAMPLE = 4    # Candidates per result rescored in full precision
+SCORE_BLOCK_ROWS = 8192   # Codes widened to float32 this many rows at a time
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint16)
+
+
+def shard_name(ticker, version):
+    return f"{re.sub(r'[^A-Za-z0-9._-]', '_', ticker)}-{version}"
+
+
+def normalize_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def top_k(scores, k):
+    """Indices of the k largest scores, best first."""
+    if len(scores) <= k:
+        return np.argsort(-scores)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def kmeans(vectors, lists, iterations=KMEANS_ITERATIONS, seed=0):
+    """Spherical k-means; returns (centroids, assignment of each row)."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        for j in range(lists):
+            members = vectors[assignment == j]
+            if len(members):
+                centroids[j] = members.sum(axis=0)
+        centroids = normalize_rows(centroids)
+    return centroids, np.argmax(vectors @ centroids.T, axis=1)
+
+
+def quantize(vectors, quantization):
+    """The compact codes of unit vectors, as the arrays of a shard's .quant.npz."""
+    if quantization == "half":
+        return {"codes": vectors.astype(np.float16)}
+    if quantization == "int8":
+        # Per-dimension scalar quantization over the shard's own value range
+        low, high = vectors.min(axis=0), vectors.max(axis=0)
+        scale = np.where(high > low, (high - low) / 255, 1.0).astype(np.float32)
+        codes = np.clip(np.round((vectors - low) / scale) - 128, -128, 127).astype(np.int8)
+        return {"codes": codes, "scale": scale, "offset": (low + 128 * scale).astype(np.float32)}
+    if quantization == "binary":
+        return {"codes": np.packbits(vectors > 0, axis=1)}
+    raise ValueError(f"Unknown quantization '{quantization}' (choose from {', '.join(QUANTIZATIONS[1:])})")
+
+
+class QuantizedVectors:
+    """First-pass scores from a shard's compact codes."""
+
+    def __init__(self, quantization, arrays):
+        self.quantization = quantization
+        self.codes = arrays["codes"]
+        self.scale = arrays.get("scale")
+        self.offset = arrays.get("offset")
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.codes, self.scale, self.offset) if a is not None)
+
+    def scores(self, query, rows=None):
+        """Approximate similarity of the rows to the unit query: higher is better, comparable within the shard."""
+        codes = self.codes if rows is None else self.codes[rows]
+        if self.quantization == "binary":
+            # Negative Hamming distance between the sign bits
+            bits = np.packbits(query > 0)
+            return -_POPCOUNT[np.bitwise_xor(codes, bits)].sum(axis=1, dtype=np.int32)
+        if self.quantization == "int8":
+            # codes * scale + offset approximates the vector, so its dot product splits in two
+            weights, bias = query * self.scale, float(self.offset @ query)
+        else:
+            weights, bias = query, 0.0
+        # numpy has no fast float16 / int8 matmul: widen a block at a time
+        return np.concatenate([
+            codes[start:start + SCORE_BLOCK_ROWS].astype(np.float32) @ weights + bias
+            for start in range(0, len(codes), SCORE_BLOCK_ROWS)
+        ]) if len(codes) else np.zeros(0, dtype=np.float32)
+
+
+def _atomic_write(path, write):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _matches(value, condition):
+    if not isinstance(condition, dict):
+        return value == condition
+    for op, operand in condition.items():
+        if op == "$eq":
+            ok = value == operand
+        elif op == "$ne":
+            ok = value != operand
+        elif op == "$in":
+            ok = value in operand
+        elif op == "$nin":
+            ok = value not in operand
+        else:
+            raise ValueError(f"Unsupported filter operator: {op}")
+        if not ok:
+            return False
+    return True
+
+
+def compile_filter(filter):
+    """
+    Splits a PGVector-style metadata filter into the tickers and 10-K Items it
+    allows (None = all) and a predicate over the remaining fields (None =
+    everything passes).
+    Supports {field: value}, {field: {"$eq"|"$ne"|"$in"|"$nin": ...}} and "$and".
+    """
+    if not filter:
+        return None, None, None
+    conditions = []
+    for field, condition in filter.items():
+        if field == "$and":
+            conditions.extend(item for clause in condition for item in clause.items())
+        elif field.startswith("$"):
+            raise ValueError(f"Unsupported filter operator: {field}")
+        else:
+            conditions.append((field, condition))
+
+    allowed = {"ticker": None, "item": None}
+    rest = []
+    for field, condition in conditions:
+        if field in allowed and (not isinstance(condition, dict) or set(condition) <= {"$eq", "$in"}):
+            if isinstance(condition, dict):
+                values = set(condition.get("$in", [])) if "$in" in condition else {condition["$eq"]}
+            else:
+                values = {condition}
+            allowed[field] = values if allowed[field] is None else allowed[field] & values
+        else:
+            rest.append((field, condition))
+
+    predicate = None
+    if rest:
+        def predicate(metadata):
+            return all(_matches(metadata.get(field), condition) for field, condition in rest)
+    return allowed["ticker"], allowed["item"], predicate
+
+
+class Shard:
+    """The read-only vectors, documents and optional IVF lists of one ticker."""
+
+    def __init__(self, folder, entry, dim):
+        base = self.base = os.path.join(folder, "shards", entry["shard"])
+        self.version = entry["version"]
+        rows = entry["rows"]
+        if rows:
+            self.vectors = np.memmap(base + ".f32", dtype=np.float32, mode="r", shape=(rows, dim))
+        else:
+            self.vectors = np.zeros((0, dim or 0), dtype=np.float32)
+
+        self.ids, self.texts, self.metadatas = [], [], []
+        with open(base + ".jsonl", "r", encoding="utf-8") as f:
+            for line in f:
+                row = json.loads(line)
+                self.ids.append(row["id"])
+                self.texts.append(row["text"])
+                self.metadatas.append(row["metadata"])
+
+        self.centroids = self.order = self.offsets = None
+        if entry.get("ivf"):
+            with np.load(base + ".ivf.npz") as ivf:
+                self.centroids, self.order, self.offsets = ivf["centroids"], ivf["order"], ivf["offsets"]
+        # Loaded into RAM, unlike the float32 vectors: they are what every query scans
+        self.quantized = None
+        if entry.get("quant"):
+            with np.load(base + ".quant.npz") as quant:
+                self.quantized = QuantizedVectors(entry["quant"], {key: quant[key] for key in quant.files})
+        self._bm25 = None
+        self._item_rows = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def bm25(self):
+        # Loaded on the first lexical query; shards written before BM25 existed build it here
+        if self._bm25 is None:
+            path = self.base + ".bm25.npz"
+            self._bm25 = BM25Index.load(path) if os.path.exists(path) else BM25Index.build(self.texts)
+        return self._bm25
+
+    def item_rows(self, items):
+        """Sorted rows of the given 10-K Items (the per-Item row lists are built on first use)."""
+        if self._item_rows is None:
+            groups = {}
+            for row, metadata in enumerate(self.metadatas):
+                groups.setdefault(metadata.get("item"), []).append(row)
+            self._item_rows = {item: np.array(rows, dtype=np.int64) for item, rows in groups.items()}
+        parts = [self._item_rows[item] for item in items if item in self._item_rows]
+        return np.sort(np.concatenate(parts)) if parts else np.zeros(0, dtype=np.int64)
+
+    def _filter_rows(self, predicate, rows=None):
+        candidates = range(len(self)) if rows is None else rows
+        return np.fromiter((i for i in candidates if predicate(self.metadatas[i])), dtype=np.int64)
+
+    def search(self, query, k, predicate=None, nprobe=0, oversample=0, items=None):
+        """
+        Returns [(similarity, row)] of the k best rows passing the predicate (and
+        in one of the items, if given).
+        With oversample > 0 and quantized codes, k * oversample candidates from the
+        codes are rescored with the float32 vectors.
+        """
+        rows = None
+        if items is not None:
+            # A section is small: its rows are scored exactly, without IVF lists or codes
+            rows = self.item_rows(items)
+            nprobe = oversample = 0
+        elif nprobe and self.centroids is not None:
+            lists = top_k(self.centroids @ query, nprobe)
+            rows = np.concatenate([self.order[self.offsets[j]:self.offsets[j + 1]] for j in lists])
+        if predicate is not None:
+            rows = self._filter_rows(predicate, rows)
+        if rows is not None and not len(rows):
+            return []
+
+        if oversample and self.quantized is not None:
+            candidates = top_k(self.quantized.scores(query, rows), k * oversample)
+            # Sorted, so the memory-mapped rows are read in file order
+            rows = np.sort(candidates if rows is None else rows[candidates])
+
+        if rows is not None and len(rows) * 2 > len(self):
+            # Most of the shard: one contiguous product is cheaper than gathering the rows
+            scores = (self.vectors @ query)[rows]
+        else:
+            scores = (self.vectors if rows is None else self.vectors[rows]) @ query
+        best = top_k(scores, k)
+        return [(float(scores[i]), int(i if rows is None else rows[i])) for i in best]
+
+    def lexical_search(self, query, k, predicate=None, items=None):
+        """Returns [(BM25 score, row)] of the k best rows passing the predicate (and in one of the items)."""
+        rows = self.item_rows(items) if items is not None else None
+        if predicate is not None:
+            rows = self._filter_rows(predicate, rows)
+        if rows is not None and not len(rows):
+            return []
+        return self.bm25.search(query, k, rows)
+
+    def document(self, row):
+        return Document(id=self.ids[row], page_content=self.texts[row], metadata=self.metadatas[row])
+
+
+class EmbeddedVectorStore(VectorStore):
+    """LangChain VectorStore over per-ticker memory-mapped shards."""
+
+    def __init__(self, embedding=None, collection_name="sec_filings", root=DEFAULT_ROOT, nprobe=DEFAULT_NPROBE,
+                 oversample=DEFAULT_OVERSAMPLE):
+        self.embedding = embedding
+        self.collection_name = collection_name
+        self.folder = os.path.join(root, collection_name)
+        self.nprobe = nprobe
+        self.oversample = oversample
+        self.lock = threading.RLock()
+        self.manifest = {"format": MANIFEST_FORMAT, "dim": None, "index": None, "tickers": {}}
+        self.shards = {}
+        self._manifest_mtime = None
+        self._watcher = None
+        os.makedirs(os.path.join(self.folder, "shards"), exist_ok=True)
+        self.refresh()
+
+    @property
+    def embeddings(self):
+        return self.embedding
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.folder, "manifest.json")
+
+    # --- READING ---
+
+    def refresh(self):
+        """Reloads manifest.json if another process changed it; returns the changed tickers."""
+        with self.lock:
+            try:
+                mtime = os.stat(self.manifest_path).st_mtime_ns
+            except FileNotFoundError:
+                return set()
+            if mtime == self._manifest_mtime:
+                return set()
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            old = self.manifest["tickers"]
+            new = manifest["tickers"]
+            changed = {t for t in set(old) | set(new) if old.get(t, {}).get("version") != new.get(t, {}).get("version")}
+            for ticker in changed:
+                self.shards.pop(ticker, None)
+            self.manifest = manifest
+            self._manifest_mtime = mtime
+            return changed
+
+    def shard(self, ticker):
+        with self.lock:
+            shard = self.shards.get(ticker)
+            if shard is None:
+                entry = self.manifest["tickers"].get(ticker)
+                if entry is None:
+                    return None
+                try:
+                    shard = Shard(self.folder, entry, self.manifest["dim"])
+                except FileNotFoundError:
+                    # A writer already collected this version: our manifest is stale
+                    if ticker not in self.refresh():
+                        raise
+                    return self.shard(ticker)
+                self.shards[ticker] = shard
+            return shard
+
+    def tickers(self):
+        return list(self.manifest["tickers"])
+
+    def warm_up(self):
+        """Opens every shard (and touches its pages) so the first queries do not pay for it."""
+        for ticker in self.tickers():
+            shard = self.shard(ticker)
+            if shard is not None and len(shard):
+                float(np.asarray(shard.vectors).sum())
+
+    def start_watcher(self, on_change, interval=2.0):
+        """
+        Starts a daemon thread that calls on_change(ticker) for every ticker whose
+        shard another process (ingest.py) rewrote; the counterpart of the
+        pgstore.CHANGES_CHANNEL listener.
+        """
+        if self._watcher is not None:
+            return
+
+        def watch():
+            while True:
+                time.sleep(interval)
+                try:
+                    for ticker in self.refresh():
+                        on_change(ticker)
+                except Exception as e:
+                    print(f"⚠️ Embedded store watcher: {e}", file=sys.stderr)
+
+        self._watcher = threading.Thread(target=watch, daemon=True)
+        self._watcher.start()
+
+    def similarity_search_with_score_by_vector(self, embedding, k=4, filter=None, nprobe=None, oversample=None,
+                                               **kwargs):
+        """
+        Top-k (Document, cosine distance) over the shards the filter allows.
+        oversample=0 scores the float32 vectors even where there are quantized codes.
+        """
+        if self.manifest["dim"] is None:
+            return []
+        query = normalize_rows(embedding)
+        nprobe = self.nprobe if nprobe is None else nprobe
+        oversample = self.oversample if oversample is None else oversample
+        tickers, items, predicate = compile_filter(filter)
+
+        hits = []
+        for ticker in (self.tickers() if tickers is None else tickers):
+            shard = self.shard(ticker)
+            if shard is not None:
+                hits.extend((score, row, shard)
+                            for score, row in shard.search(query, k, predicate, nprobe, oversample, items))
+        hits.sort(key=lambda hit: -hit[0])
+        return [(shard.document(row), 1.0 - score) for score, row, shard in hits[:k]]
+
+    def lexical_search_with_score(self, query, k=4, filter=None):
+        """Top-k (Document, BM25 score) over the shards the filter allows, best first."""
+        tickers, items, predicate = compile_filter(filter)
+        hits = []
+        for ticker in (self.tickers() if tickers is None else tickers):
+            shard = self.shard(ticker)
+            if shard is not None:
+                hits.extend((score, row, shard) for score, row in shard.lexical_search(query, k, predicate, items))
+        hits.sort(key=lambda hit: -hit[0])
+        return [(shard.document(row), score) for score, row, shard in hits[:k]]
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, **kwargs)]
+
+    def similarity_search_with_score(self, query, k=4, filter=None, **kwargs):
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k, filter=filter, **kwargs)
+
+    def similarity_search(self, query, k=4, filter=None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter=filter, **kwargs)]
+
+    def _select_relevance_score_fn(self):
+        return self._cosine_relevance_score_fn
+
+    def get_by_ids(self, ids, /):
+        wanted = set(ids)
+        found = {}
+        for ticker in self.tickers():
+            shard = self.shard(ticker)
+            for row, cid in enumerate(shard.ids):
+                if cid in wanted:
+                    found[cid] = shard.document(row)
+        return [found[cid] for cid in ids if cid in found]
+
+    # --- WRITING ---
+
+    def load_manifest(self):
+        """Returns {ticker: filing manifest row}, like pgstore.load_manifest()."""
+        self.refresh()
+        return {t: entry["filing"] for t, entry in self.manifest["tickers"].items() if entry.get("filing")}
+
+    def apply_filing_diff(self, filing, new_chunks, new_vectors, stale_ids):
+        """
+        Same contract as pgstore.apply_filing_diff(): writes the ticker's new shard
+        with the chunks in filing["chunk_ids"] (kept rows + new_chunks) and commits
+        it together with the filing's manifest row.
+        """
+        ticker = filing["ticker"]
+        rows = {}
+        old = self.shard(ticker)
+        if old is not None and stale_ids is not None:
+            stale = set(stale_ids)
+            for i, cid in enumerate(old.ids):
+                if cid not in stale:
+                    rows[cid] = (old.texts[i], old.metadatas[i], old.vectors[i])
+        for (cid, text, metadata), vector in zip(new_chunks, new_vectors):
+            rows[cid] = (text, metadata, vector)
+
+        order = [cid for cid in dict.fromkeys(filing["chunk_ids"]) if cid in rows]
+        self._write_shard(ticker, order, rows, filing)
+
+    def _write_shard(self, ticker, order, rows, filing=None):
+        with self.lock:
+            self.refresh()
+            vectors = normalize_rows([rows[cid][2] for cid in order]) if order else None
+            dim = self.manifest["dim"] if vectors is None else vectors.shape[1]
+            if self.manifest["dim"] not in (None, dim):
+                raise ValueError(f"{self.collection_name} stores {self.manifest['dim']}-dim vectors, got {dim}")
+
+            previous = self.manifest["tickers"].get(ticker)
+            version = previous["version"] + 1 if previous else 1
+            name = shard_name(ticker, version)
+            base = os.path.join(self.folder, "shards", name)
+
+            # 1. New shard files (not visible until the manifest points at them)
+            _atomic_write(base + ".f32", lambda f: f.write(vectors.tobytes() if vectors is not None else b""))
+            _atomic_write(base + ".jsonl", lambda f: f.writelines(
+                (json.dumps({"id": cid, "text": rows[cid][0], "metadata": rows[cid][1]}, ensure_ascii=False) + "\n")
+                .encode("utf-8") for cid in order
+            ))
+            texts = [rows[cid][0] for cid in order]
+            _atomic_write(base + ".bm25.npz", BM25Index.build(texts).save)
+            ivf = self.manifest["index"] is not None and len(order) >= MIN_IVF_ROWS
+            if ivf:
+                self._write_ivf(base, vectors, self.manifest["index"].get("lists"))
+            quant = self.manifest.get("quantization") if order else None
+            if quant:
+                _atomic_write(base + ".quant.npz", lambda f: np.savez(f, **quantize(vectors, quant)))
+
+            # 2. Commit: swap the manifest
+            entry = {"shard": name, "version": version, "rows": len(order), "ivf": ivf, "quant": quant}
+            if filing is not None:
+                entry["filing"] = filing
+            elif previous and previous.get("filing"):
+                entry["filing"] = dict(previous["filing"], chunk_ids=order)
+            self.manifest["dim"] = dim
+            self.manifest["tickers"][ticker] = entry
+            self._save_manifest()
+            self.shards.pop(ticker, None)
+
+            # 3. The version before the previous one is garbage now. The previous one
+            # stays until the next write: other processes may still have it in their manifest.
+            if previous and previous["version"] > 1:
+                self._remove_files(shard_name(ticker, previous["version"] - 1))
+
+    def _write_ivf(self, base, vectors, lists=None):
+        lists = min(lists or max(1, int(np.sqrt(len(vectors)))), len(vectors))
+        centroids, assignment = kmeans(vectors, lists)
+        order = np.argsort(assignment, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=lists))])
+        _atomic_write(base + ".ivf.npz", lambda f: np.savez(f, centroids=centroids, order=order, offsets=offsets))
+
+    def _save_manifest(self):
+        _atomic_write(self.manifest_path, lambda f: f.write(json.dumps(self.manifest).encode("utf-8")))
+        self._manifest_mtime = os.stat(self.manifest_path).st_mtime_ns
+
+    def _remove_files(self, name):
+        for suffix in (".f32", ".jsonl", ".ivf.npz", ".bm25.npz", ".quant.npz"):
+            try:
+                os.remove(os.path.join(self.folder, "shards", name + suffix))
+            except FileNotFoundError:
+                pass
+
+    def build_indexes(self, lists=None, refresh=False):
+        """
+        Enables the approximate mode: builds IVF lists for every shard with at least
+        MIN_IVF_ROWS rows (lists = sqrt(rows) unless given) and keeps them up to date
+        on later writes. Returns the number of shards (re)built.
+        """
+        with self.lock:
+            self.refresh()
+            setting = {"method": "ivf", "lists": lists}
+            if self.manifest["index"] != setting:
+                self.manifest["index"] = setting
+                refresh = True
+            built = 0
+            for ticker, entry in self.manifest["tickers"].items():
+                if entry["rows"] < MIN_IVF_ROWS or (entry.get("ivf") and not refresh):
+                    continue
+                shard = self.shard(ticker)
+                self._write_ivf(os.path.join(self.folder, "shards", entry["shard"]), np.asarray(shard.vectors), lists)
+                entry["ivf"] = True
+                self.shards.pop(ticker, None)
+                built += 1
+            self._save_manifest()
+            return built
+
+    def build_quantized(self, quantization, refresh=False):
+        """
+        Keeps a quantized copy ("half", "int8", "binary"; "none" drops it) of every
+        shard's vectors for the first search pass, now and on later writes.
+        Returns the number of shards (re)written.
+        """
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization '{quantization}' (choose from {', '.join(QUANTIZATIONS)})")
+        quantization = None if quantization == "none" else quantization
+        with self.lock:
+            self.refresh()
+            self.manifest["quantization"] = quantization
+            built = 0
+            dropped = []
+            for ticker, entry in self.manifest["tickers"].items():
+                if entry.get("quant") == quantization and not refresh:
+                    continue
+                base = os.path.join(self.folder, "shards", entry["shard"])
+                if quantization and entry["rows"]:
+                    vectors = np.asarray(self.shard(ticker).vectors)
+                    _atomic_write(base + ".quant.npz", lambda f: np.savez(f, **quantize(vectors, quantization)))
+                    entry["quant"] = quantization
+                else:
+                    entry["quant"] = None
+                    dropped.append(base + ".quant.npz")
+                self.shards.pop(ticker, None)
+                built += 1
+            self._save_manifest()
+            # Only unreferenced once the manifest is saved
+            for path in dropped:
+                if os.path.exists(path):
+                    os.remove(path)
+            return built
+
+    def drop_indexes(self):
+        with self.lock:
+            self.refresh()
+            self.manifest["index"] = None
+            for ticker, entry in self.manifest["tickers"].items():
+                if entry.get("ivf"):
+                    entry["ivf"] = False
+                    self.shards.pop(ticker, None)
+            self._save_manifest()
+
+    def add_texts(self, texts, metadatas=None, *, ids=None, **kwargs):
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        vectors = self.embedding.embed_documents(texts)
+
+        by_ticker = {}
+        for cid, text, metadata, vector in zip(ids, texts, metadatas, vectors):
+            by_ticker.setdefault(metadata.get("ticker") or NO_TICKER, []).append((cid, text, metadata, vector))
+        for ticker, new in by_ticker.items():
+            old = self.shard(ticker)
+            rows = {}
+            if old is not None:
+                rows = {cid: (old.texts[i], old.metadatas[i], old.vectors[i]) for i, cid in enumerate(old.ids)}
+            rows.update({cid: (text, metadata, vector) for cid, text, metadata, vector in new})
+            self._write_shard(ticker, list(rows), rows)
+        return ids
+
+    def delete(self, ids=None, **kwargs):
+        if ids is None:
+            return False
+        doomed = set(ids)
+        for ticker in self.tickers():
+            shard = self.shard(ticker)
+            if not doomed.intersection(shard.ids):
+                continue
+            rows = {cid: (shard.texts[i], shard.metadatas[i], shard.vectors[i])
+                    for i, cid in enumerate(shard.ids) if cid not in doomed}
+            self._write_shard(ticker, list(rows), rows)
+        return True
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, *, ids=None, **kwargs):
+        store = cls(embedding, **kwargs)
+        store.add_texts(texts, metadatas, ids=ids)
+        return store
@@ -0,0 +1,277 @@
+# embedding_cache.py
+"""
+Persistent, content-addressed embedding cache.
+
+Vectors are keyed by a hash of (model name, normalized text), so re-ingesting an
+unchanged filing, re-chunking with the same boundaries or asking the same query
+twice never runs the model again.
+
+On-disk layout (one folder per model, since models differ in dimension):
+    meta.json    model name, dimension, dtype and capacity
+    vectors.bin  memory-mapped (capacity, dim) float32/float16 array
+    keys.bin     memory-mapped (capacity, 2) uint64 array: 128-bit key per slot
+    ticks.bin    memory-mapped (capacity,) uint64 array: last use (0 = empty slot)
+
+The hash index (key -> slot) is rebuilt from keys.bin when the cache is opened.
+When every slot is taken, the least recently used EVICT_FRACTION of the slots
+is freed in one go.
+
+Several processes can share a cache folder (the agent while ingest.py runs, a
+second server). Its "lock" file is a readers-writer flock: lookups take it
+shared, writes exclusive. Each process indexes the slots when it opens the
+cache, so a writer re-reads keys.bin and ticks.bin under the exclusive lock
+before it reuses or takes a slot, and a reader checks a slot's key before it
+returns the vector. A process only finds the entries that existed when it
+opened the cache and the ones it wrote itself.
+"""
+import os
+import json
+import fcntl
+import hashlib
+import threading
+import unicodedata
+from contextlib import contextmanager
+import numpy as np
+from langchain_core.embeddings import Embeddings
+import tracing
+
+DEFAULT_CACHE_DIR = os.getenv(
+    "EMBEDDING_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "fin_agent", "embeddings")
+)
+DEFAULT_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", 1 << 30))  # 1 GB of vectors per model
+EVICT_FRACTION = 0.1
+
+
+def normalize_text(text):
+    """Unicode NFC + collapsed whitespace, so trivially different copies of a chunk share a key."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(model_name, text, kind="document"):
+    """128-bit key of (model, kind, normalized text) as two uint64s."""
+    digest = hashlib.blake2b(
+        f"{model_name}\0{kind}\0{normalize_text(text)}".encode("utf-8"), digest_size=16
+    ).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little")
+
+
+class EmbeddingCache:
+    """Memory-mapped vector store with a hash index and LRU eviction for ONE model."""
+
+    def __init__(self, folder, model_name, dim, dtype="float32", max_bytes=DEFAULT_MAX_BYTES):
+        self.folder = folder
+        self.model_name = model_name
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(folder, exist_ok=True)
+        self._lock_file = open(os.path.join(folder, "lock"), "a")
+        try:
+            # Exclusive, so two processes never both create the files
+            with self._file_lock(fcntl.LOCK_EX):
+                self._load(folder, model_name, dim, dtype, max_bytes)
+        except Exception:
+            self._lock_file.close()
+            raise
+
+    def _load(self, folder, model_name, dim, dtype, max_bytes):
+        meta_path = os.path.join(folder, "meta.json")
+        if os.path.exists(meta_path):
+            # Reuse the existing layout; dtype/capacity are fixed at creation time
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta["model"] != model_name or meta["dim"] != dim:
+                raise ValueError(f"Embedding cache at {folder} belongs to {meta['model']} (dim {meta['dim']})")
+            mode = "r+"
+        else:
+            capacity = max(1, max_bytes // (dim * np.dtype(dtype).itemsize))
+            meta = {"model": model_name, "dim": dim, "dtype": dtype, "capacity": int(capacity)}
+            mode = "w+"
+
+        self.dim = meta["dim"]
+        self.capacity = meta["capacity"]
+        self.vectors = np.memmap(os.path.join(folder, "vectors.bin"), dtype=meta["dtype"], mode=mode,
+                                 shape=(self.capacity, self.dim))
+        self.keys = np.memmap(os.path.join(folder, "keys.bin"), dtype=np.uint64, mode=mode, shape=(self.capacity, 2))
+        self.ticks = np.memmap(os.path.join(folder, "ticks.bin"), dtype=np.uint64, mode=mode, shape=(self.capacity,))
+        if mode == "w+":
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+
+        # Rebuild the hash index from the occupied slots
+        occupied = np.flatnonzero(self.ticks)
+        self.index = {(int(a), int(b)): int(slot) for slot, (a, b) in zip(occupied, self.keys[occupied])}
+        self.free = [int(slot) for slot in np.flatnonzero(self.ticks == 0)[::-1]]
+        self.tick = int(self.ticks.max()) if len(occupied) else 0
+
+    @classmethod
+    def for_model(cls, model_name, dim, cache_dir=DEFAULT_CACHE_DIR, **kwargs):
+        folder = os.path.join(cache_dir, model_name.replace("/", "__"))
+        return cls(folder, model_name, dim, **kwargs)
+
+    def __len__(self):
+        return len(self.index)
+
+    @contextmanager
+    def _file_lock(self, operation):
+        # flock is per open file, so callers hold self.lock: two threads never mix modes on it
+        fcntl.flock(self._lock_file, operation)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def get_many(self, keys):
+        """Returns one float32 vector (or None on a miss) per key."""
+        results = []
+        with self.lock, self._file_lock(fcntl.LOCK_SH):
+            for key in keys:
+                slot = self.index.get(key)
+                if slot is not None and self._slot_key(slot) != key:
+                    # The slot was reused for another text: never return its vector
+                    del self.index[key]
+                    slot = None
+                if slot is None:
+                    self.misses += 1
+                    results.append(None)
+                    continue
+                self.hits += 1
+                self.tick += 1
+                self.ticks[slot] = self.tick
+                # A copy: the slot may be rewritten as soon as the lock is released
+                results.append(np.array(self.vectors[slot], dtype=np.float32))
+        return results
+
+    def put_many(self, keys, vectors):
+        with self.lock, self._file_lock(fcntl.LOCK_EX):
+            # Other processes may have written, evicted or reused slots since we indexed them
+            self.tick = max(self.tick, int(self.ticks.max()))
+            for key, vector in zip(keys, vectors):
+                slot = self.index.get(key)
+                if slot is not None and not (self.ticks[slot] and self._slot_key(slot) == key):
+                    del self.index[key]
+                    slot = None
+                if slot is None:
+                    slot = self._allocate()
+                    self.index[key] = slot
+                # Vector first, then key and tick: a crash mid-write leaves an empty slot, not a wrong one
+                self.vectors[slot] = vector
+                self.keys[slot] = key
+                self.tick += 1
+                self.ticks[slot] = self.tick
+
+    def _slot_key(self, slot):
+        return int(self.keys[slot][0]), int(self.keys[slot][1])
+
+    def _allocate(self):
+        """Takes a free slot (under the exclusive lock)."""
+        while True:
+            if not self.free:
+                # Slots freed by other processes are only found by a rescan
+                self.free = [int(slot) for slot in np.flatnonzero(self.ticks == 0)[::-1]]
+                if not self.free:
+                    self._evict()
+            slot = self.free.pop()
+            # Another process may have taken it since it was listed
+            if self.ticks[slot] == 0:
+                return slot
+
+    def _evict(self):
+        n = max(1, int(self.capacity * EVICT_FRACTION))
+        victims = np.argpartition(self.ticks, n - 1)[:n]
+        for slot in victims:
+            slot = int(slot)
+            key = self._slot_key(slot)
+            if self.index.get(key) == slot:
+                del self.index[key]
+            self.ticks[slot] = 0
+            self.free.append(slot)
+        self.evictions += n
+
+    def flush(self):
+        with self.lock:
+            self.vectors.flush()
+            self.keys.flush()
+            self.ticks.flush()
+
+    def close(self):
+        """Flushes and closes the lock file."""
+        self.flush()
+        self._lock_file.close()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "model": self.model_name,
+            "entries": len(self.index),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Drop-in wrapper around any LangChain Embeddings (e.g. HuggingFaceEmbeddings).
+    Only texts that are not in the cache are sent to the wrapped model.
+    """
+
+    def __init__(self, embeddings, model_name, cache_dir=DEFAULT_CACHE_DIR, dtype="float32",
+                 max_bytes=DEFAULT_MAX_BYTES):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache_dir = cache_dir
+        self.dtype = dtype
+        self.max_bytes = max_bytes
+        self.cache = None
+        self._open_lock = threading.Lock()
+
+        # Open an existing cache right away; a new one is created on the first
+        # miss, once we know the model's dimension
+        meta_path = os.path.join(cache_dir, model_name.replace("/", "__"), "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                self._open(json.load(f)["dim"])
+
+    def _open(self, dim):
+        with self._open_lock:
+            if self.cache is None:
+                self.cache = EmbeddingCache.for_model(self.model_name, dim, cache_dir=self.cache_dir,
+                                                      dtype=self.dtype, max_bytes=self.max_bytes)
+        return self.cache
+
+    def _embed(self, texts, kind, compute):
+        with tracing.span("embed", kind=kind, texts=len(texts)) as span:
+            keys = [cache_key(self.model_name, text, kind) for text in texts]
+            cached = self.cache.get_many(keys) if self.cache is not None else [None] * len(texts)
+
+            missing = [i for i, vector in enumerate(cached) if vector is None]
+            span.set(computed=len(missing))
+            if missing:
+                computed = compute([texts[i] for i in missing])
+                first_use = self.cache is None
+                cache = self._open(len(computed[0]))
+                if cache is not None:
+                    if first_use:
+                        cache.misses += len(missing)
+                    cache.put_many([keys[i] for i in missing], computed)
+                    cache.flush()
+                for i, vector in zip(missing, computed):
+                    cached[i] = vector
+
+            return [list(map(float, vector)) for vector in cached]
+
+    def embed_documents(self, texts):
+        return self._embed(list(texts), "document", self.embeddings.embed_documents)
+
+    def embed_query(self, text):
+        return self._embed([text], "query", lambda texts: [self.embeddings.embed_query(texts[0])])[0]
+
+    def stats(self):
+        if self.cache is None:
+            return {"model": self.model_name, "entries": 0, "hits": 0, "misses": 0, "hit_rate": 0.0}
+        return self.cache.stats()
@@ -0,0 +1,157 @@
+# embedding_service.py
+"""
+Micro-batching for query embeddings.
+
+Every search_10k call embeds one query. Under concurrent load that means many
+batch-of-one forward passes competing for the same cores, which costs several
+times more than running the same queries as one batch. EmbeddingService puts
+the texts on a queue instead. One worker thread takes up to EMBED_MAX_BATCH of
+them, waiting at most EMBED_MAX_WAIT_MS after the oldest one arrived, and
+embeds them in one call. Callers get a concurrent.futures.Future (submit()),
+block on it (embed_query()) or await it (aembed_query()). Identical texts in a
+batch are embedded once.
+
+It is an Embeddings itself, so tools.py puts it between the cache and the model:
+    CachedEmbeddings(EmbeddingService(HuggingFaceEmbeddings(...)), model_name=...)
+embed_documents() (ingestion, already batched) goes straight to the model.
+Queries are embedded with embed_documents() of the model, which is the same
+encoding as embed_query() for the sentence-transformers models used here.
+
+The wait is what a lone query pays for batching: 2 ms is ~10% of a MiniLM
+query on one core, and enough for concurrent queries to land in one batch.
+stats() reports the batch-size histogram, the queue wait (submit to batch
+start) and the model time per batch. EMBED_BATCHING=0 turns the service off.
+"""
+import os
+import time
+import queue
+import asyncio
+import threading
+from collections import Counter, deque
+from concurrent.futures import Future
+import numpy as np
+from langchain_core.embeddings import Embeddings
+import tracing
+
+EMBED_BATCHING = os.getenv("EMBED_BATCHING", "1") == "1"
+EMBED_MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", 32))
+EMBED_MAX_WAIT_MS = float(os.getenv("EMBED_MAX_WAIT_MS", 2))
+LATENCY_SAMPLES = 10_000  # Most recent waits / batch times kept for the percentiles
+
+_STOP = object()
+
+
+class EmbeddingService(Embeddings):
+    def __init__(self, embeddings, max_batch_size=EMBED_MAX_BATCH, max_wait_ms=EMBED_MAX_WAIT_MS):
+        self.embeddings = embeddings
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self.reset_stats()
+        self._worker = threading.Thread(target=self._run, name="embed-batcher", daemon=True)
+        self._worker.start()
+
+    # --- Embeddings interface ---
+
+    def submit(self, text):
+        """Queues one text; the Future resolves to its vector (or the model's exception)."""
+        future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        return future
+
+    def embed_query(self, text):
+        return self.submit(text).result()
+
+    async def aembed_query(self, text):
+        return await asyncio.wrap_future(self.submit(text))
+
+    def embed_documents(self, texts):
+        return self.embeddings.embed_documents(texts)
+
+    # --- Worker ---
+
+    def _collect(self):
+        """Blocks for the first text, then gathers more until the batch is full or its wait is up."""
+        first = self._queue.get()
+        if first is _STOP:
+            return None
+        batch = [first]
+        # The wait counts from the oldest text's arrival: a backlog goes out at once
+        deadline = first[2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)  # Finish this batch, stop on the next one
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            started = time.perf_counter()
+            # Callers that gave up (cancelled futures) are dropped before the model runs
+            batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            texts = list(dict.fromkeys(text for text, _, _ in batch))
+            with tracing.span("embed.batch", size=len(batch), texts=len(texts)):
+                try:
+                    vectors = dict(zip(texts, self.embeddings.embed_documents(texts)))
+                except Exception as e:
+                    for _, future, _ in batch:
+                        future.set_exception(e)
+                    vectors = None
+            finished = time.perf_counter()
+            if vectors is not None:
+                for text, future, _ in batch:
+                    future.set_result(vectors[text])
+
+            with self._lock:
+                self.requests += len(batch)
+                self.batches += 1
+                self.errors += vectors is None
+                self.batch_sizes[len(batch)] += 1
+                self.waits.extend(started - queued for _, _, queued in batch)
+                self.batch_times.append(finished - started)
+
+    def close(self):
+        """Stops the worker after the texts already queued."""
+        self._queue.put(_STOP)
+        self._worker.join()
+
+    # --- Stats ---
+
+    def reset_stats(self):
+        with self._lock:
+            self.requests = 0
+            self.batches = 0
+            self.errors = 0
+            self.batch_sizes = Counter()
+            self.waits = deque(maxlen=LATENCY_SAMPLES)
+            self.batch_times = deque(maxlen=LATENCY_SAMPLES)
+
+    def stats(self):
+        with self._lock:
+            waits = np.array(self.waits) * 1000
+            batch_times = np.array(self.batch_times) * 1000
+            return {
+                "requests": self.requests,
+                "batches": self.batches,
+                "errors": self.errors,
+                "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+                "batch_sizes": dict(sorted(self.batch_sizes.items())),
+                "queue_wait_p50_ms": float(np.percentile(waits, 50)) if len(waits) else None,
+                "queue_wait_p99_ms": float(np.percentile(waits, 99)) if len(waits) else None,
+                "batch_p50_ms": float(np.percentile(batch_times, 50)) if len(batch_times) else None,
+                "batch_p99_ms": float(np.percentile(batch_times, 99)) if len(batch_times) else None,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+            }
@@ -0,0 +1,113 @@
+# lexical.py
+"""
+Lexical half of hybrid retrieval, for the embedded store (Postgres uses tsvector,
+see pgstore.lexical_search):
+- tokenize(): a tokenizer for 10-K text that keeps figures and years whole
+  ("$391,035" -> "391035", "46.2", "2024")
+- BM25Index: a compact inverted index over one shard, built when the shard is
+  written and stored next to it as an .npz
+- rrf_fuse(): reciprocal rank fusion of several ranked result lists
+"""
+import re
+import numpy as np
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.,][0-9]+)*")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the their this to was were what "
+    "which with will how does did do about our we".split()
+)
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60  # The usual reciprocal rank fusion constant
+
+
+def tokenize(text):
+    tokens = []
+    for token in TOKEN_RE.findall(text.lower()):
+        token = token.replace(",", "")
+        if token in STOPWORDS:
+            continue
+        # Crude plural folding, applied to documents and queries alike
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss") and not token[0].isdigit():
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of documents (the rows of one shard)."""
+
+    def __init__(self, terms, offsets, postings, freqs, lengths):
+        self.terms = {term: i for i, term in enumerate(terms)}
+        self.offsets = offsets
+        self.postings = postings
+        self.freqs = freqs
+        self.lengths = lengths
+        self.avg_length = float(lengths.mean()) if len(lengths) else 0.0
+
+    @classmethod
+    def build(cls, texts):
+        postings = {}
+        lengths = np.zeros(len(texts), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            lengths[row] = len(tokens)
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                postings.setdefault(token, []).append((row, count))
+
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(postings[term]) for term in terms])
+        rows = np.fromiter((row for term in terms for row, _ in postings[term]), dtype=np.int32, count=offsets[-1])
+        freqs = np.fromiter((count for term in terms for _, count in postings[term]), dtype=np.float32, count=offsets[-1])
+        return cls(terms, offsets, rows, freqs, lengths)
+
+    def save(self, f):
+        terms = sorted(self.terms, key=self.terms.get)
+        np.savez(f, terms=np.array(terms, dtype=str), offsets=self.offsets, postings=self.postings,
+                 freqs=self.freqs, lengths=self.lengths)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["terms"].tolist(), data["offsets"], data["postings"], data["freqs"], data["lengths"])
+
+    def search(self, query, k, rows=None):
+        """Returns [(score, row)] of the k best-scoring rows (restricted to rows if given)."""
+        n = len(self.lengths)
+        if n == 0:
+            return []
+        scores = np.zeros(n, dtype=np.float32)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths / max(self.avg_length, 1e-9))
+        for token in set(tokenize(query)):
+            i = self.terms.get(token)
+            if i is None:
+                continue
+            docs = self.postings[self.offsets[i]:self.offsets[i + 1]]
+            tf = self.freqs[self.offsets[i]:self.offsets[i + 1]]
+            idf = np.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            scores[docs] += idf * tf * (BM25_K1 + 1) / (tf + norm[docs])
+        if rows is not None:
+            mask = np.zeros(n, dtype=bool)
+            mask[rows] = True
+            scores[~mask] = 0
+        candidates = np.flatnonzero(scores)
+        best = candidates[np.argsort(-scores[candidates])[:k]]
+        return [(float(scores[row]), int(row)) for row in best]
+
+
+def rrf_fuse(rankings, k, rrf_k=RRF_K):
+    """
+    Reciprocal rank fusion: each document scores sum(1 / (rrf_k + rank)) over the
+    ranked lists it appears in. rankings are lists of (Document, score) pairs, best
+    first; returns the top k as (Document, fused score).
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, (doc, _) in enumerate(ranking, start=1):
+            entry = fused.setdefault(doc.id, [doc, 0.0])
+            entry[1] += 1.0 / (rrf_k + rank)
+    return sorted((tuple(entry) for entry in fused.values()), key=lambda hit: -hit[1])[:k]
@@ -0,0 +1,198 @@
+# memory.py
+"""
+Bounded conversation memory for the reasoner.
+
+AgentState.messages is append-only, and the graph keeps it that way (the full
+history stays available). What the LLM is sent is decided here, on every
+reasoner call, by fit_history():
+
+1. the last KEEP_RECENT_TURNS turns (a turn starts at a HumanMessage) go verbatim
+2. older tool outputs become a one-line reference: which tool, which arguments,
+   which 10-K sections it covered, and how to get it back. search_10k results are
+   in search_cache, so calling the tool again with the same arguments is cheap.
+3. if the prompt is still above HISTORY_TOKEN_CEILING, every turn but the current
+   one is compacted, then the oldest turns are dropped whole (so no ToolMessage loses the AIMessage that called it), then
+   the tool outputs of the current turn are compacted except the latest round,
+   and finally the latest round is cut to fit: the outputs share what is left,
+   and when a share would fall under MIN_TOOL_TOKENS the biggest outputs are
+   dropped (a one-line placeholder) so the others keep a useful share
+4. as a last resort the current question and the model's own text are cut,
+   then the earlier tool rounds of the current turn are dropped whole
+
+The ceiling is hard: the returned tokens never exceed it, unless the reserved
+tokens alone do.
+It returns the messages to send and a stats dict for the per-turn metrics line.
+"""
+import os
+import re
+import json
+from langchain_core.messages import HumanMessage, ToolMessage
+from context_builder import count_tokens, truncate
+
+HISTORY_TOKEN_CEILING = int(os.getenv("HISTORY_TOKEN_CEILING", 8000))
+KEEP_RECENT_TURNS = int(os.getenv("KEEP_RECENT_TURNS", 2))
+COMPACT_MIN_TOKENS = 120      # Shorter tool outputs (a stock price) are kept as they are
+MESSAGE_OVERHEAD_TOKENS = 4   # Role and framing tokens per message
+MIN_TOOL_TOKENS = 50          # Floor for a cut tool output of the latest round
+
+_SECTION_RE = re.compile(r"^--- \[(.+)\] ---$", re.M)
+
+
+def message_tokens(message):
+    tokens = count_tokens(str(message.content)) + MESSAGE_OVERHEAD_TOKENS
+    for call in getattr(message, "tool_calls", None) or []:
+        tokens += count_tokens(call["name"] + json.dumps(call["args"]))
+    return tokens
+
+
+def split_turns(messages):
+    turns = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def compact_tool_message(message, call):
+    """A ToolMessage (same tool_call_id) that points at the output instead of repeating it."""
+    name = call["name"] if call else message.name or "tool"
+    args = ", ".join(f"{key}={value!r}" for key, value in (call["args"] if call else {}).items())
+    sections = list(dict.fromkeys(_SECTION_RE.findall(str(message.content))))
+    covered = f" covering {'; '.join(sections)}" if sections else ""
+    content = (f"[Earlier {name}({args}) output{covered}, ~{count_tokens(str(message.content))} tokens, "
+               f"removed to save context. Call {name} again with the same arguments if you need it.]")
+    return ToolMessage(content=content, name=message.name, tool_call_id=message.tool_call_id)
+
+
+def _compact(messages, calls, stats, keep_from=None):
+    compacted = []
+    for i, message in enumerate(messages):
+        if isinstance(message, ToolMessage) and (keep_from is None or i < keep_from) \
+                and message_tokens(message) > COMPACT_MIN_TOKENS:
+            message = compact_tool_message(message, calls.get(message.tool_call_id))
+            stats["compacted"] += 1
+        compacted.append(message)
+    return compacted
+
+
+def _with_content(message, content):
+    return message.model_copy(update={"content": content})
+
+
+def _cut(message, tokens):
+    """The message with its content cut so the whole message costs at most tokens (when its calls allow)."""
+    text = str(message.content)
+    # truncate() appends " …", one token
+    room = tokens - (message_tokens(message) - count_tokens(text)) - 1
+    return _with_content(message, truncate(text, room) if room > 0 else "")
+
+
+def _dropped(message, call):
+    name = call["name"] if call else message.name or "tool"
+    return _with_content(message, f"[{name} output of ~{count_tokens(str(message.content))} tokens dropped "
+                                  f"to stay under the context limit]")
+
+
+def _fit_round(current, rows, budget, calls, stats):
+    """Fits the latest tool round into budget: the smallest outputs first, the biggest dropped if need be."""
+    rows = sorted(rows, key=lambda i: message_tokens(current[i]))
+    kept = list(rows)
+    while kept:
+        # Water-filling: an output smaller than its share leaves the rest to the bigger ones
+        left = budget - sum(message_tokens(_dropped(current[i], calls.get(current[i].tool_call_id)))
+                            for i in rows if i not in kept)
+        shares = {}
+        for j, i in enumerate(kept):
+            shares[i] = min(message_tokens(current[i]), left // (len(kept) - j))
+            left -= shares[i]
+        biggest = kept[-1]
+        if shares[biggest] >= min(message_tokens(current[biggest]), MIN_TOOL_TOKENS + MESSAGE_OVERHEAD_TOKENS):
+            break
+        kept.pop()
+    for i in rows:
+        message = current[i]
+        if i not in kept:
+            current[i] = _dropped(message, calls.get(message.tool_call_id))
+            stats["dropped_outputs"] += 1
+        elif message_tokens(message) > shares[i]:
+            current[i] = _cut(message, shares[i])
+            stats["truncated"] += 1
+
+
+def _enforce_ceiling(current, latest, ceiling, stats):
+    """Last resort for a current turn still over the ceiling."""
+    size = lambda ms: sum(message_tokens(m) for m in ms)  # noqa: E731
+    # a. Cut the question and the model's text, longest first
+    texts = sorted((i for i, m in enumerate(current) if not isinstance(m, ToolMessage) and str(m.content)),
+                   key=lambda i: -message_tokens(current[i]))
+    for i in texts:
+        excess = size(current) - ceiling
+        if excess <= 0:
+            break
+        current[i] = _cut(current[i], max(message_tokens(current[i]) - excess, 0))
+        stats["truncated"] += 1
+    # b. Drop the earlier tool rounds of the turn whole (an AIMessage with its ToolMessages)
+    start = 1 if current and isinstance(current[0], HumanMessage) else 0
+    # The AIMessage that called the latest round stays with it
+    keep = latest - 1 if latest < len(current) else len(current)
+    while size(current) > ceiling and keep > start:
+        end = start + 1
+        while end < keep and isinstance(current[end], ToolMessage):
+            end += 1
+        del current[start:end]
+        keep -= end - start
+        stats["rounds_dropped"] += 1
+    # c. Only the (cut) question is left to send
+    if size(current) > ceiling and start:
+        stats["rounds_dropped"] += 1
+        current[:] = [_cut(current[0], ceiling)]
+    return current
+
+
+def fit_history(messages, ceiling=None, keep_recent_turns=None, reserved_tokens=0):
+    """
+    Returns (messages to send, stats). reserved_tokens is what the caller adds on
+    top (the system instruction) and counts against the ceiling.
+    """
+    ceiling = (HISTORY_TOKEN_CEILING if ceiling is None else ceiling) - reserved_tokens
+    keep_recent_turns = KEEP_RECENT_TURNS if keep_recent_turns is None else keep_recent_turns
+    stats = {"messages": len(messages), "full_tokens": sum(message_tokens(m) for m in messages) + reserved_tokens,
+             "compacted": 0, "turns_dropped": 0, "truncated": 0, "dropped_outputs": 0, "rounds_dropped": 0}
+    calls = {call["id"]: call for m in messages for call in (getattr(m, "tool_calls", None) or [])}
+
+    # 1. Recent turns verbatim, older tool outputs as references
+    turns = split_turns(messages)
+    old = max(len(turns) - max(keep_recent_turns, 1), 0)
+    turns = [_compact(turn, calls, stats) for turn in turns[:old]] + turns[old:]
+
+    # 2. Over the ceiling: compact the earlier recent turns too, then drop the oldest turns whole
+    size = lambda ms: sum(message_tokens(m) for m in ms)  # noqa: E731
+    if sum(size(turn) for turn in turns) > ceiling:
+        turns = [_compact(turn, calls, stats) for turn in turns[:-1]] + turns[-1:]
+    while len(turns) > 1 and sum(size(turn) for turn in turns) > ceiling:
+        turns.pop(0)
+        stats["turns_dropped"] += 1
+
+    # 3. Still over: compact the current turn, except its latest tool round
+    if turns and size(turns[-1]) > ceiling:
+        current = turns[-1]
+        latest = len(current)
+        while latest > 0 and isinstance(current[latest - 1], ToolMessage):
+            latest -= 1
+        current = _compact(current, calls, stats, keep_from=latest)
+
+        # 4. ... and cut the latest round to share what is left
+        latest_round = range(latest, len(current))
+        if latest_round and size(current) > ceiling:
+            _fit_round(current, latest_round, ceiling - size(current[:latest]), calls, stats)
+
+        # 5. Still over (a huge question, many earlier rounds): cut and drop until it fits
+        if size(current) > ceiling:
+            current = _enforce_ceiling(current, latest, ceiling, stats)
+        turns[-1] = current
+
+    fitted = [message for turn in turns for message in turn]
+    stats["tokens"] = size(fitted) + reserved_tokens
+    stats["tokens_saved"] = stats["full_tokens"] - stats["tokens"]
+    return fitted, stats
@@ -0,0 +1,134 @@
+# reranker.py
+"""
+Second retrieval stage for search_10k: a cross-encoder reranks an over-retrieved
+candidate set and an adaptive cutoff decides how many chunks the LLM gets.
+
+The bi-encoder (or hybrid) first pass is cheap but coarse, so search_10k used to
+send its 15 best chunks whether or not they were relevant, and every one of
+them is paid for again on each later reasoner call. Now:
+
+1. the first pass retrieves RERANK_CANDIDATES chunks
+2. the cross-encoder (RERANK_MODEL, on CPU) scores every (query, chunk) pair in
+   one batched predict() call. Scores are cached per (query, chunk id) in a
+   TTLCache; chunk ids are content hashes, so a score stays valid across re-ingests
+3. the chunks are sorted by score and cut adaptively (select()): never more than
+   RERANK_MAX_K, never fewer than RERANK_MIN_K, nothing below RERANK_MIN_SCORE,
+   and nothing after the kept chunks reach RERANK_CUMULATIVE of the candidates'
+   total relevance
+
+Scores are the model's relevance probabilities (the ms-marco cross-encoders end
+in a sigmoid). Each call emits a "rerank" span (candidates, cached pairs, kept)
+and stats() reports latency percentiles and the mean number of chunks kept.
+
+The stage is off by default (first-pass top-k as before); RERANK=1 turns it on.
+The cutoff defaults (RERANK_MIN_SCORE, RERANK_CUMULATIVE) are not validated
+yet: run benchmarks/bench_rerank.py with the real cross-encoder on
+corpus/retrieval and check the coverage before making it the default.
+"""
+import os
+import time
+import hashlib
+import threading
+from collections import deque
+import numpy as np
+import startup
+import tracing
+from search_cache import TTLCache, query_hash
+
+RERANK = os.getenv("RERANK", "0") == "1"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", 40))
+RERANK_MIN_K = int(os.getenv("RERANK_MIN_K", 3))
+RERANK_MAX_K = int(os.getenv("RERANK_MAX_K", 15))
+RERANK_MIN_SCORE = float(os.getenv("RERANK_MIN_SCORE", 0.05))
+RERANK_CUMULATIVE = float(os.getenv("RERANK_CUMULATIVE", 0.9))
+RERANK_MAX_LENGTH = 512        # Tokens per (query, chunk) pair; a 1000-character chunk is ~250
+SCORE_CACHE_ENTRIES = int(os.getenv("RERANK_CACHE_ENTRIES", 100_000))
+SCORE_CACHE_TTL = float(os.getenv("RERANK_CACHE_TTL", 24 * 3600))
+LATENCY_SAMPLES = 10_000
+
+
+def chunk_key(doc):
+    # Content-addressed ids from ingest.py; documents without one are keyed by their text
+    return doc.id or hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()
+
+
+def select(scores, min_k=RERANK_MIN_K, max_k=RERANK_MAX_K, min_score=RERANK_MIN_SCORE,
+           cumulative=RERANK_CUMULATIVE):
+    """Indices of the candidates to keep, best first (the adaptive cutoff)."""
+    scores = np.asarray(scores, dtype=np.float64)
+    order = np.argsort(-scores, kind="stable")
+    total = scores.clip(min=0).sum()
+    kept, mass = [], 0.0
+    for i in order[:max_k]:
+        if len(kept) >= min_k and (scores[i] < min_score or (total and mass >= cumulative * total)):
+            break
+        kept.append(int(i))
+        mass += max(scores[i], 0.0)
+    return kept
+
+
+class Reranker:
+    """Thread-safe; one model shared by every search."""
+
+    def __init__(self, model, batch_size=RERANK_CANDIDATES):
+        self.model = model
+        self.batch_size = batch_size
+        self.scores = TTLCache(SCORE_CACHE_ENTRIES, SCORE_CACHE_ENTRIES * 128, SCORE_CACHE_TTL)
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def score(self, query, docs):
+        """Relevance of each doc to the query; only pairs missing from the cache reach the model."""
+        qkey = query_hash(query)
+        scores = [self.scores.get((qkey, chunk_key(doc))) for doc in docs]
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing:
+            # One batched forward pass for every uncached candidate
+            predicted = self.model.predict([(query, docs[i].page_content) for i in missing],
+                                           batch_size=max(self.batch_size, len(missing)), show_progress_bar=False)
+            for i, score in zip(missing, np.asarray(predicted, dtype=np.float64).reshape(-1)):
+                scores[i] = float(score)
+                self.scores.put((qkey, chunk_key(docs[i])), scores[i], size=128)
+        return scores, len(docs) - len(missing)
+
+    def rerank(self, query, docs, **cutoff):
+        """The docs worth sending to the LLM, best first."""
+        if not docs:
+            return []
+        start = time.perf_counter()
+        with tracing.span("rerank", candidates=len(docs)) as span:
+            scores, cached = self.score(query, docs)
+            kept = select(scores, **cutoff)
+            span.set(cached=cached, kept=len(kept), top_score=round(max(scores), 4))
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.calls += 1
+            self.candidates += len(docs)
+            self.cached_pairs += cached
+            self.kept += len(kept)
+            self.latencies.append(elapsed)
+        return [docs[i] for i in kept]
+
+    def reset_stats(self):
+        with self._lock:
+            self.calls = self.candidates = self.cached_pairs = self.kept = 0
+            self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def stats(self):
+        with self._lock:
+            latencies = np.array(self.latencies) * 1000
+            return {
+                "calls": self.calls,
+                "mean_candidates": self.candidates / self.calls if self.calls else 0.0,
+                "mean_kept": self.kept / self.calls if self.calls else 0.0,
+                "cached_pair_rate": self.cached_pairs / self.candidates if self.candidates else 0.0,
+                "p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else None,
+                "p99_ms": float(np.percentile(latencies, 99)) if len(latencies) else None,
+            }
+
+
+def load_reranker(model_name=RERANK_MODEL):
+    with startup.step("import sentence_transformers"):
+        from sentence_transformers import CrossEncoder
+    return Reranker(CrossEncoder(model_name, max_length=RERANK_MAX_LENGTH, device="cpu"))
@@ -0,0 +1,230 @@
+# search_cache.py
+"""
+In-memory, two-level cache in front of search_10k:
+
+    level 1  normalized query text        -> query vector
+    level 2  (query hash, ticker, k)      -> retrieved Documents
+
+Both levels are LRU with a per-entry TTL and an entry + byte budget, and are safe
+to share between concurrent sessions. Level-2 entries are tagged with their
+ticker: when ingestion changes a ticker's chunks, pgstore.apply_filing_diff()
+sends NOTIFY on pgstore.CHANGES_CHANNEL and the listener thread started by
+start_listener() drops exactly that ticker's results. A search that was already
+running when the invalidation arrived does not store its (possibly old) results:
+each ticker has a generation, bumped by every invalidation, that is read before
+the search and checked before the put.
+"""
+import os
+import sys
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+import psycopg
+from embedding_cache import normalize_text
+
+DEFAULT_TTL_SECONDS = float(os.getenv("SEARCH_CACHE_TTL", 15 * 60))
+DEFAULT_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", 4096))
+DEFAULT_MAX_BYTES = int(os.getenv("SEARCH_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+
+class TTLCache:
+    """Thread-safe LRU cache with a per-entry TTL, an entry cap, a byte cap and tags."""
+
+    def __init__(self, max_entries, max_bytes, ttl_seconds):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> (value, expires_at, size, tag)
+        self.tags = {}  # tag -> set of keys
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[1] < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, size, tag=None):
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (value, time.monotonic() + self.ttl_seconds, size, tag)
+            self.bytes += size
+            if tag is not None:
+                self.tags.setdefault(tag, set()).add(key)
+            while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def invalidate_tag(self, tag):
+        with self.lock:
+            keys = self.tags.pop(tag, set())
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self):
+        with self.lock:
+            self.invalidations += len(self.entries)
+            self.entries.clear()
+            self.tags.clear()
+            self.bytes = 0
+
+    def _remove(self, key):
+        _, _, size, tag = self.entries.pop(key)
+        self.bytes -= size
+        if tag is not None:
+            keys = self.tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tags[tag]
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+def query_hash(query):
+    return hashlib.blake2b(normalize_text(query).lower().encode("utf-8"), digest_size=16).hexdigest()
+
+
+class SearchCache:
+    """The two cache levels of search_10k plus the ingestion listener."""
+
+    def __init__(self, ttl_seconds=DEFAULT_TTL_SECONDS, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        # Vectors are small and ticker-independent; results get the bigger share of the budget
+        self.vectors = TTLCache(max_entries, max_bytes // 4, ttl_seconds)
+        self.results = TTLCache(max_entries, max_bytes - max_bytes // 4, ttl_seconds)
+        self._listener = None
+        self._subscribers = []
+        # ticker -> invalidations so far (None: invalidate_all); guarded with the result puts
+        self._generations = {}
+        self._generation_lock = threading.Lock()
+        self.stale_skipped = 0
+
+    def query_vector(self, query, embed_query):
+        """Level 1: returns the cached vector of the query, computing it with embed_query on a miss."""
+        key = query_hash(query)
+        vector = self.vectors.get(key)
+        if vector is None:
+            vector = embed_query(query)
+            self.vectors.put(key, vector, size=len(vector) * 8 + 64)
+        return vector
+
+    def _generation(self, ticker):
+        return self._generations.get(None, 0), self._generations.get(ticker, 0)
+
+    def generation(self, ticker):
+        with self._generation_lock:
+            return self._generation(ticker)
+
+    def _put_results(self, key, ticker, results, generation):
+        size = sum(len(doc.page_content) + 256 for doc in results) + 64
+        with self._generation_lock:
+            if self._generation(ticker) != generation:
+                # Ingestion changed the ticker while the search ran
+                self.stale_skipped += 1
+                return
+            self.results.put(key, results, size=size, tag=ticker)
+
+    def search(self, query, ticker, k, run_search, section=None):
+        """Level 2: returns the cached Documents for (query, ticker, k, section), calling run_search() on a miss."""
+        key = (query_hash(query), ticker, k, section)
+        results = self.results.get(key)
+        if results is None:
+            generation = self.generation(ticker)
+            results = run_search()
+            self._put_results(key, ticker, results, generation)
+        return results
+
+    async def asearch(self, query, ticker, k, run_search, section=None):
+        """search() for async callers: run_search is a coroutine function."""
+        key = (query_hash(query), ticker, k, section)
+        results = self.results.get(key)
+        if results is None:
+            generation = self.generation(ticker)
+            results = await run_search()
+            self._put_results(key, ticker, results, generation)
+        return results
+
+    def subscribe(self, on_invalidate):
+        """Calls on_invalidate(ticker) whenever a ticker's results are dropped (None: all tickers)."""
+        self._subscribers.append(on_invalidate)
+
+    def invalidate_ticker(self, ticker):
+        with self._generation_lock:
+            self._generations[ticker] = self._generations.get(ticker, 0) + 1
+            dropped = self.results.invalidate_tag(ticker)
+        for on_invalidate in self._subscribers:
+            on_invalidate(ticker)
+        return dropped
+
+    def invalidate_all(self):
+        with self._generation_lock:
+            self._generations[None] = self._generations.get(None, 0) + 1
+            self.results.clear()
+        for on_invalidate in self._subscribers:
+            on_invalidate(None)
+
+    def clear(self):
+        self.vectors.clear()
+        self.results.clear()
+
+    def stats(self):
+        return {"query_vectors": self.vectors.stats(), "results": {**self.results.stats(),
+                                                                   "stale_skipped": self.stale_skipped}}
+
+    def start_listener(self, dsn, channel):
+        """
+        Starts a daemon thread that LISTENs on the ingestion channel and invalidates
+        the ticker named in each notification. Every time LISTEN is (re)established
+        it clears the result level, since notifications sent before that (while the
+        listener was still starting, or disconnected) were never received.
+        """
+        if self._listener is not None:
+            return
+        self._listener = threading.Thread(target=self._listen, args=(dsn, channel), daemon=True)
+        self._listener.start()
+
+    def _listen(self, dsn, channel):
+        backoff = 1
+        while True:
+            try:
+                with psycopg.connect(dsn, autocommit=True) as conn:
+                    conn.execute(f"LISTEN {channel}")
+                    # Also bumps the generations, so searches already running are not stored
+                    self.invalidate_all()
+                    backoff = 1
+                    for notify in conn.notifies():
+                        self.invalidate_ticker(notify.payload)
+            except Exception as e:
+                print(f"⚠️ Search cache listener disconnected ({e}); retrying in {backoff}s", file=sys.stderr)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 60)
@@ -0,0 +1,165 @@
+# sections.py
+"""
+The standard 10-K structure (Items 1, 1A, ... 16), for section-filtered search.
+
+- heading_item(): the Item a Markdown line opens ("## Item 1A. Risk Factors",
+  "**ITEM 7. MANAGEMENT'S DISCUSSION ...**", "Item 7A. Quantitative ..."), or None
+- tag_items(): sets a normalized metadata["item"] ("1A", "7", ...) on the chunks
+  of one filing (ingest.py)
+- normalize_section(): maps what the LLM passes as search_10k's section
+  ("1A", "Item 7", "risk factors", "MD&A") to the same codes
+
+Filings converted by datamaking/markdown.py mark Items as '##' headers or as
+plain / bold lines, depending on the HTML, and the table of contents lists every
+Item once before the body does. Both are handled: header metadata and heading
+lines are read in document order, and when Item 1 comes round again everything
+tagged before it (the table of contents) is untagged. Chunks outside any Item
+(cover page, signatures) get no "item" key.
+"""
+import re
+
+# Form 10-K, Parts I-IV, in filing order
+ITEMS = {
+    "1": "Business",
+    "1A": "Risk Factors",
+    "1B": "Unresolved Staff Comments",
+    "1C": "Cybersecurity",
+    "2": "Properties",
+    "3": "Legal Proceedings",
+    "4": "Mine Safety Disclosures",
+    "5": "Market for Registrant's Common Equity",
+    "6": "[Reserved]",
+    "7": "Management's Discussion and Analysis",
+    "7A": "Quantitative and Qualitative Disclosures About Market Risk",
+    "8": "Financial Statements and Supplementary Data",
+    "9": "Changes in and Disagreements with Accountants",
+    "9A": "Controls and Procedures",
+    "9B": "Other Information",
+    "9C": "Disclosure Regarding Foreign Jurisdictions that Prevent Inspections",
+    "10": "Directors, Executive Officers and Corporate Governance",
+    "11": "Executive Compensation",
+    "12": "Security Ownership of Certain Beneficial Owners and Management",
+    "13": "Certain Relationships and Related Transactions",
+    "14": "Principal Accountant Fees and Services",
+    "15": "Exhibits and Financial Statement Schedules",
+    "16": "Form 10-K Summary",
+}
+ITEM_ORDER = {code: i for i, code in enumerate(ITEMS)}
+# Names the LLM uses for sections, besides the official titles
+SECTION_ALIASES = {
+    "risk": "1A", "risks": "1A",
+    "cyber": "1C", "cyber security": "1C",
+    "legal": "3", "litigation": "3",
+    "mda": "7", "md a": "7", "management discussion": "7",
+    "market risk": "7A", "market": "7A",
+    "financial statements": "8", "financial statement": "8", "financials": "8",
+    "controls": "9A",
+    "compensation": "11",
+    "exhibits": "15",
+}
+
+MAX_HEADING_CHARS = 200        # Longer lines are prose that happens to start with "Item"
+# "Items 1 and 2. Business and Properties" counts as the first one
+HEADING_RE = re.compile(r"^items?\s+(\d{1,2}[a-d]?)\b(?:\s*(?:,|and|&)\s*\d{1,2}[a-d]?\b)*\s*[.:\-–—]?\s*(.*)$",
+                        re.IGNORECASE)
+MARKUP_RE = re.compile(r"^[#>*_\s]+|[*_\s]+$")
+# "Part II, Item 7": the Part adds nothing to the Item
+PART_RE = re.compile(r"^part\s+[ivx]+\b\s*[,.:\-–—]?\s*", re.IGNORECASE)
+# Words a section name may add that no title needs to contain
+FILLER_WORDS = {"a", "an", "and", "the", "of", "for", "about", "in", "on", "to", "section", "item", "items"}
+
+
+def heading_item(line):
+    """The Item code a line opens, or None (table rows and cross-references never count)."""
+    line = line.strip()
+    if not line or line.startswith("|") or len(line) > MAX_HEADING_CHARS:
+        return None
+    match = HEADING_RE.match(MARKUP_RE.sub("", line))
+    if match is None:
+        return None
+    code, title = match.group(1).upper(), match.group(2).lstrip("*_ ")
+    # "Item 7 of this report ..." is a reference, not a heading
+    if code not in ITEMS or (title and title[0].islower()):
+        return None
+    return code
+
+
+def _header_item(metadata):
+    # The deepest MarkdownHeaderTextSplitter header that is an Item heading
+    for level in ("Header 3", "Header 2", "Header 1"):
+        item = heading_item(metadata.get(level, ""))
+        if item:
+            return item
+    return None
+
+
+def tag_items(chunks):
+    """Sets chunk.metadata["item"] on the chunks of one filing (in document order). Returns the tagged count."""
+    current = None        # Item in force at the end of the previous chunk
+    last_header = None    # Item of the previous chunk's headers
+    tagged = []           # Chunks tagged since the body last started at Item 1
+    for chunk in chunks:
+        # (item, whether it opens the chunk): a change of header first, then heading lines
+        events = []
+        header = _header_item(chunk.metadata)
+        if header != last_header:
+            events.append((header, True))
+            last_header = header
+        lines = [line for line in chunk.page_content.splitlines() if line.strip()]
+        events += [(heading_item(line), i == 0) for i, line in enumerate(lines) if heading_item(line)]
+
+        item = current
+        for event, opens in events:
+            if event is not None and ITEM_ORDER[event] == 0 and current is not None and ITEM_ORDER[current] > 0:
+                # The body starts over at Item 1: what came before was the table of contents
+                for earlier in tagged:
+                    earlier.metadata.pop("item", None)
+                tagged = []
+                item = None
+            if opens:
+                item = event
+            current = event
+        chunk.metadata.pop("item", None)
+        if item is not None:
+            chunk.metadata["item"] = item
+            tagged.append(chunk)
+    return len(tagged)
+
+
+def _words(text):
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower().replace("'s", "")))
+
+
+def _stems(text):
+    # Whole words, singular, so "financial statement" matches "Financial Statements"
+    return {word[:-1] if word.endswith("s") and len(word) > 3 else word for word in _words(text).split()}
+
+
+def normalize_section(section):
+    """
+    The Item code for a section name, None for no section. Raises ValueError
+    for a name that is not a 10-K Item, or that fits several titles.
+    """
+    if section is None or not str(section).strip():
+        return None
+    text = PART_RE.sub("", str(section).strip())
+    match = re.match(r"^(?:items?\s*)?(\d{1,2}[a-d]?)\b", text, re.IGNORECASE)
+    if match and match.group(1).upper() in ITEMS:
+        return match.group(1).upper()
+    words = _words(text)
+    if words in SECTION_ALIASES:
+        return SECTION_ALIASES[words]
+    # Every word of the name must be a word of the title
+    wanted = _stems(text) - FILLER_WORDS
+    matches = [code for code, title in ITEMS.items() if wanted and wanted <= _stems(title)]
+    if len(matches) == 1:
+        return matches[0]
+    if matches:
+        raise ValueError(f"10-K section '{section}' is ambiguous: "
+                         f"{', '.join(label(code) for code in matches)}. Use the Item number.")
+    raise ValueError(f"Unknown 10-K section '{section}'. Use an Item number (e.g. 1A, 7, 7A, 8) "
+                     f"or a name such as 'risk factors', 'MD&A' or 'financial statements'.")
+
+
+def label(item):
+    return f"Item {item} ({ITEMS[item]})"
@@ -0,0 +1,332 @@
+# server.py
+"""
+Multi-session HTTP server for the agent: one process serves many analysts.
+
+The graph from agent.py is compiled once, with a checkpointer that keeps each
+session's AgentState between requests:
+- CHECKPOINTER=postgres: in Postgres (same database as the vectors, own small pool)
+- CHECKPOINTER=memory: in-process, lost on restart
+
+The default is postgres with the pgvector backend and memory otherwise.
+All sessions share one embedding model, one vector backend (with its
+async connection pool, PG_POOL_SIZE) and one LLM client, the Lazy resources
+of tools.py / agent.py, built once at startup.
+
+Admission control: at most SERVER_MAX_ACTIVE_TURNS turns run at once, up to
+SERVER_MAX_QUEUED_TURNS more wait (at most SERVER_QUEUE_TIMEOUT seconds) for a
+slot, and anything beyond that gets 429 with Retry-After. A session runs one
+turn at a time (409 while busy), and a turn is cut off after SERVER_TURN_TIMEOUT.
+
+API:
+    POST   /sessions                          -> {"session_id"}
+    POST   /sessions/{id}/messages            {"message": "...", "stream": false}
+           -> {"answer", "tool_calls", "metrics", "cached", "seconds"} (cache hits add "excerpts"),
+              or with "stream": true
+              NDJSON events: token, tool_calls, tool_result, metrics, done / error
+    GET    /sessions/{id}                     -> the conversation so far
+    DELETE /sessions/{id}
+    GET    /health                            -> admission counters, resources
+
+Usage:
+    python server.py --port 8000
+    VECTOR_BACKEND=embedded LLM_BACKEND=stub python server.py
+"""
+import os
+import json
+import time
+import uuid
+import asyncio
+import argparse
+from contextlib import asynccontextmanager
+import startup
+import tracing
+with startup.step("import server dependencies"):
+    from fastapi import FastAPI, HTTPException, Request
+    from fastapi.responses import JSONResponse, StreamingResponse
+    from pydantic import BaseModel
+    from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+    import agent
+    import tools
+    import pgstore
+    import embedding_service
+    import vector_backends
+
+MAX_ACTIVE_TURNS = int(os.getenv("SERVER_MAX_ACTIVE_TURNS", 16))
+MAX_QUEUED_TURNS = int(os.getenv("SERVER_MAX_QUEUED_TURNS", 64))
+QUEUE_TIMEOUT_S = float(os.getenv("SERVER_QUEUE_TIMEOUT", 30))
+TURN_TIMEOUT_S = float(os.getenv("SERVER_TURN_TIMEOUT", 300))
+CHECKPOINTERS = ("postgres", "memory")
+CHECKPOINTER = os.getenv("CHECKPOINTER", "postgres" if vector_backends.DEFAULT_BACKEND == "pgvector" else "memory")
+CHECKPOINT_POOL_SIZE = int(os.getenv("CHECKPOINT_POOL_SIZE", 5))
+
+
+class Overloaded(Exception):
+    def __init__(self, reason, retry_after=1):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+
+class Admission:
+    """
+    At most max_active turns run at once; up to max_queued more wait (for at
+    most queue_timeout seconds) for a slot. Everything else is rejected right
+    away, so a burst cannot pile up unbounded work behind the LLM.
+    """
+
+    def __init__(self, max_active, max_queued, queue_timeout):
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(max_active)
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    async def acquire(self):
+        if self._slots.locked() and self.waiting >= self.max_queued:
+            self.rejected += 1
+            raise Overloaded(f"{self.active} turns running and {self.waiting} queued")
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise Overloaded(f"no free slot within {self.queue_timeout:.0f}s", retry_after=int(self.queue_timeout))
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        self.admitted += 1
+
+    def release(self):
+        self.active -= 1
+        self._slots.release()
+
+    def stats(self):
+        return {"max_active": self.max_active, "max_queued": self.max_queued, "active": self.active,
+                "waiting": self.waiting, "admitted": self.admitted, "rejected": self.rejected,
+                "timed_out": self.timed_out}
+
+
+async def open_checkpointer(kind):
+    """Returns (checkpointer, pool to close at shutdown or None)."""
+    if kind == "memory":
+        from langgraph.checkpoint.memory import InMemorySaver
+        return InMemorySaver(), None
+    if kind != "postgres":
+        raise ValueError(f"Unknown checkpointer '{kind}' (choose from {', '.join(CHECKPOINTERS)})")
+    from psycopg.rows import dict_row
+    from psycopg_pool import AsyncConnectionPool
+    from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+    # The saver needs dict rows and no server-side prepared statements
+    pool = AsyncConnectionPool(pgstore.PG_DSN, max_size=CHECKPOINT_POOL_SIZE, open=False,
+                               kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row})
+    await pool.open(wait=True)
+    saver = AsyncPostgresSaver(pool)
+    await saver.setup()
+    return saver, pool
+
+
+@asynccontextmanager
+async def lifespan(app):
+    state = app.state
+    state.checkpointer, checkpoint_pool = await open_checkpointer(CHECKPOINTER)
+    state.graph = agent.builder.compile(checkpointer=state.checkpointer)
+    state.admission = Admission(MAX_ACTIVE_TURNS, MAX_QUEUED_TURNS, QUEUE_TIMEOUT_S)
+    state.busy_sessions = set()
+
+    # Build the shared model, backend and LLM client before taking traffic.
+    # A failed warm-up is reported and retried by the first request that needs it.
+    threads = [t for t in tools.warm_up() + [agent.llm_with_tools.warm_up()] if t is not None]
+    await asyncio.to_thread(lambda: [t.join() for t in threads])
+    print(f"🚀 Serving (checkpointer: {CHECKPOINTER}, {MAX_ACTIVE_TURNS} active / {MAX_QUEUED_TURNS} queued turns)")
+    try:
+        yield
+    finally:
+        if tools.backend.ready:
+            await tools.backend.get().aclose()
+        if checkpoint_pool is not None:
+            await checkpoint_pool.close()
+        tracing.flush()
+
+
+app = FastAPI(title="Financial Agent", lifespan=lifespan)
+
+
+class Question(BaseModel):
+    message: str
+    stream: bool = False
+
+
+def thread_config(session_id):
+    return {"configurable": {"thread_id": session_id}}
+
+
+def message_dict(message):
+    if isinstance(message, HumanMessage):
+        return {"role": "user", "content": message.content}
+    if isinstance(message, ToolMessage):
+        return {"role": "tool", "name": message.name, "content": message.content}
+    if isinstance(message, AIMessage):
+        calls = [{"name": c["name"], "args": c["args"]} for c in message.tool_calls]
+        return {"role": "assistant", "content": message.content, **({"tool_calls": calls} if calls else {})}
+    return {"role": message.type, "content": message.content}
+
+
+async def turn_events(state, session_id, text):
+    """
+    Runs one turn of a session and yields its events as dicts. It marks the
+    session busy and takes an admission slot before the first event (the first
+    __anext__() raises HTTPException(409) / Overloaded instead), and releases
+    both when the turn ends, fails or the generator is closed.
+    """
+    if session_id in state.busy_sessions:
+        raise HTTPException(409, "This session is still answering the previous message")
+    state.busy_sessions.add(session_id)
+    try:
+        await state.admission.acquire()
+    except Overloaded:
+        state.busy_sessions.discard(session_id)
+        raise
+
+    start = time.perf_counter()
+    answer, tool_calls, metrics, turn_messages = "", [], [], []
+    try:
+        with tracing.span("turn", session=session_id):
+            # A rephrasing of an earlier question about the same tickers is answered from the cache
+            # (agent.py / answer_cache.py); the session's history records it like any other answer
+            hit, cache_key = await agent.lookup_answer(text)
+            if hit is not None:
+                await state.graph.aupdate_state(
+                    thread_config(session_id),
+                    {"messages": [HumanMessage(content=text), AIMessage(content=hit.answer)]},
+                    as_node="reasoner",
+                )
+                yield {"type": "token", "content": hit.answer}
+                yield {"type": "done", "answer": hit.answer, "tool_calls": [], "metrics": [], "cached": True,
+                       "cached_question": hit.question, "excerpts": hit.excerpts,
+                       "seconds": time.perf_counter() - start}
+                return
+
+            async with asyncio.timeout(TURN_TIMEOUT_S):
+                # The checkpointer holds the history: only the new message is sent
+                events = state.graph.astream({"messages": [HumanMessage(content=text)]}, thread_config(session_id),
+                                             stream_mode=["messages", "updates"])
+                async for mode, payload in events:
+                    if mode == "messages":
+                        chunk, metadata = payload
+                        if metadata.get("langgraph_node") == "reasoner" and chunk.content:
+                            yield {"type": "token", "content": chunk.content}
+                    elif payload.get("reasoner"):
+                        update = payload["reasoner"]
+                        message = update["messages"][-1]
+                        turn_messages.append(message)
+                        metrics.extend(update["metrics"])
+                        yield {"type": "metrics", **update["metrics"][-1]}
+                        if message.tool_calls:
+                            calls = [{"name": c["name"], "args": c["args"]} for c in message.tool_calls]
+                            tool_calls.extend(calls)
+                            yield {"type": "tool_calls", "calls": calls}
+                        else:
+                            answer = message.content
+                    elif payload.get("tools"):
+                        turn_messages.extend(payload["tools"]["messages"])
+                        for message in payload["tools"]["messages"]:
+                            yield {"type": "tool_result", "name": message.name, "chars": len(message.content)}
+        seconds = time.perf_counter() - start
+        agent.remember_answer(text, cache_key, turn_messages, seconds)
+        yield {"type": "done", "answer": answer, "tool_calls": tool_calls, "metrics": metrics, "cached": False,
+               "seconds": seconds}
+    except TimeoutError:
+        yield {"type": "error", "error": f"turn timed out after {TURN_TIMEOUT_S:.0f}s"}
+    except Exception as e:
+        yield {"type": "error", "error": repr(e)}
+    finally:
+        state.busy_sessions.discard(session_id)
+        state.admission.release()
+
+
+@app.post("/sessions")
+async def create_session():
+    return {"session_id": uuid.uuid4().hex}
+
+
+@app.post("/sessions/{session_id}/messages")
+async def post_message(session_id: str, question: Question, request: Request):
+    state = request.app.state
+    events = turn_events(state, session_id, question.message)
+    try:
+        # Runs the turn up to its first event. The session and the slot are taken inside
+        # the generator, so from here on its finally releases them: when the stream ends,
+        # when the client goes away, or when a response that was never sent is collected.
+        first = await anext(events)
+    except Overloaded as e:
+        return JSONResponse({"detail": f"Server busy: {e}"}, status_code=429,
+                            headers={"Retry-After": str(e.retry_after)})
+
+    if question.stream:
+        async def ndjson():
+            try:
+                yield json.dumps(first, default=str) + "\n"
+                async for event in events:
+                    yield json.dumps(event, default=str) + "\n"
+            finally:
+                await events.aclose()
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    result = first
+    async for event in events:
+        if event["type"] in ("done", "error"):
+            result = event
+    if result["type"] == "error":
+        raise HTTPException(504 if "timed out" in result["error"] else 500, result["error"])
+    result.pop("type")
+    return result
+
+
+@app.get("/sessions/{session_id}")
+async def get_session(session_id: str, request: Request):
+    snapshot = await request.app.state.graph.aget_state(thread_config(session_id))
+    messages = snapshot.values.get("messages") if snapshot.values else None
+    if not messages:
+        raise HTTPException(404, f"Unknown session {session_id}")
+    return {"session_id": session_id, "messages": [message_dict(m) for m in messages]}
+
+
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str, request: Request):
+    await request.app.state.checkpointer.adelete_thread(session_id)
+    return {"deleted": session_id}
+
+
+@app.get("/health")
+async def health(request: Request):
+    state = request.app.state
+    return {
+        "status": "ok",
+        "checkpointer": CHECKPOINTER,
+        "admission": state.admission.stats(),
+        "busy_sessions": len(state.busy_sessions),
+        "ready": {resource.name: resource.ready
+                  for resource in (tools.embeddings, tools.backend, tools.search_cache, agent.llm_with_tools)},
+        "embedding_batches": embedding_batches(),
+        "answer_cache": agent.answers.get().stats() if agent.answers.ready else None,
+        "reranker": tools.rerank_model.get().stats() if tools.rerank_model.ready else None,
+    }
+
+
+def embedding_batches():
+    # Batch-size histogram and queue wait of the shared query embedder (embedding_service.py)
+    model = getattr(tools.embeddings.get(), "embeddings", None) if tools.embeddings.ready else None
+    return model.stats() if isinstance(model, embedding_service.EmbeddingService) else None
+
+
+if __name__ == "__main__":
+    import uvicorn
+    parser = argparse.ArgumentParser(description="Serve the agent to many concurrent sessions over HTTP.")
+    parser.add_argument("--host", default=os.getenv("SERVER_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("SERVER_PORT", 8000)))
+    args = parser.parse_args()
+    # One worker process: the model, pools and checkpointer are shared by all sessions in it
+    uvicorn.run(app, host=args.host, port=args.port)
@@ -0,0 +1,106 @@
+# startup.py
+"""
+Lazy initialization and a startup profiler for agent.py / tools.py.
+
+Nothing expensive (embedding model, Postgres, LLM client) is built at import
+time any more: each one is wrapped in a Lazy and built on first use, or ahead of
+time by warm_up() on a background thread while the user is still typing.
+
+Every import and initialization step that goes through step() is recorded with
+its offset from process start and its duration; report() prints them. Set
+PROFILE_STARTUP=1 to have the agent print the report after its first answer.
+"""
+import os
+import sys
+import time
+import asyncio
+import threading
+from contextlib import contextmanager
+
+PROFILE_STARTUP = os.getenv("PROFILE_STARTUP", "0") == "1"
+
+# Offsets are relative to this module's import, which agent.py / tools.py do first
+_t0 = time.perf_counter()
+_lock = threading.Lock()
+_steps = []  # (name, start offset, seconds, thread name)
+
+
+@contextmanager
+def step(name):
+    """Records how long the enclosed import / initialization took."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        with _lock:
+            _steps.append((name, start - _t0, end - start, threading.current_thread().name))
+
+
+def mark(name):
+    """Records a milestone (e.g. 'first answer') as a zero-length step."""
+    with _lock:
+        _steps.append((name, time.perf_counter() - _t0, 0.0, threading.current_thread().name))
+
+
+def steps():
+    with _lock:
+        return [
+            {"step": name, "at_s": round(at, 4), "seconds": round(seconds, 4), "thread": thread}
+            for name, at, seconds, thread in sorted(_steps, key=lambda s: s[1])
+        ]
+
+
+def report(file=sys.stderr):
+    print("\n--- ⏱️ Startup profile ---", file=file)
+    print(f"{'at':>8}  {'took':>8}  {'thread':<16}  step", file=file)
+    for s in steps():
+        took = f"{s['seconds']:.3f}s" if s["seconds"] else ""
+        print(f"{s['at_s']:>7.3f}s  {took:>8}  {s['thread']:<16}  {s['step']}", file=file)
+
+
+class Lazy:
+    """
+    A value built by factory() on first get(), at most once, even with
+    concurrent callers. warm_up() starts building it on a daemon thread; a failed
+    warm-up is reported and retried by the next get(), which raises normally.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, name, factory):
+        self.name = name
+        self.factory = factory
+        self._value = self._MISSING
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self._value is not self._MISSING
+
+    def get(self):
+        if self._value is self._MISSING:
+            with self._lock:
+                if self._value is self._MISSING:
+                    with step(f"init {self.name}"):
+                        self._value = self.factory()
+        return self._value
+
+    async def aget(self):
+        """get() for coroutines: builds on a worker thread so the event loop keeps running."""
+        if self._value is not self._MISSING:
+            return self._value
+        return await asyncio.to_thread(self.get)
+
+    def warm_up(self):
+        if self.ready:
+            return None
+        thread = threading.Thread(target=self._warm_up, name=f"warmup-{self.name}"[:16], daemon=True)
+        thread.start()
+        return thread
+
+    def _warm_up(self):
+        try:
+            self.get()
+        except Exception as e:
+            print(f"⚠️ Warm-up of {self.name} failed: {e}", file=sys.stderr)
@@ -4,3 +4,5 @@ from langchain_core.messages import BaseMessage
 
 class AgentState(TypedDict):
     messages: Annotated[List[BaseMessage], operator.add]
+    # One entry per reasoner call: time to first token, tokens/s, latency (see agent.py)
+    metrics: Annotated[List[dict], operator.add]
@@ -0,0 +1,138 @@
+# stub_llm.py
+"""
+A local stand-in for the Ollama chat model (LLM_BACKEND=stub in agent.py), for
+testing and benchmarking the agent loop without a model server.
+
+It streams like a real model: STUB_LLM_TTFT seconds to the first chunk, then
+STUB_LLM_TOKENS_PER_S chunks per second, one token each. With
+STUB_LLM_PREFILL_TOKENS_PER_S the first chunk also waits for the prompt to be
+read, so longer prompts cost more, as they do on a real model. Tool calls come as
+tool_call_chunks with the JSON arguments split across several chunks, the way
+Ollama and OpenAI stream them.
+
+Its behaviour is deterministic. With a script (a list of responses, or a JSON
+file named by STUB_LLM_SCRIPT) the responses are returned in order:
+
+    [{"tool_calls": [{"name": "search_10k", "args": {"query": "supply chain risks", "ticker": "AAPL"}}]},
+     {"content": "Apple's main supply chain risks are ..."}]
+
+After the script (or without one) it follows the conversation:
+- a question with tickers in it (AAPL, NVDA, ...) gets get_stock_price per
+  ticker if it asks for a price, otherwise search_10k (search_10k_multi for
+  several tickers)
+- once tool results are in (or without tickers), a STUB_LLM_ANSWER_TOKENS answer
+"""
+import os
+import re
+import json
+import time
+import asyncio
+from typing import Any, Optional
+from pydantic import PrivateAttr
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+TICKER_RE = re.compile(r"\b[A-Z]{2,5}\b")
+NOT_TICKERS = {"AI", "CEO", "CFO", "EPS", "SEC", "USA", "US", "IPO", "ESG", "FY", "Q1", "Q2", "Q3", "Q4", "WHAT", "HOW"}
+ARG_PIECE_CHARS = 12  # Tool-call arguments are streamed in pieces this long
+FILLER = ("The filing attributes the change mainly to pricing, product mix and volume, and management expects "
+          "these trends to continue while noting the risks described in Item 1A . ").split()
+
+
+class StubChatModel(BaseChatModel):
+    ttft: float = float(os.getenv("STUB_LLM_TTFT", 0.3))
+    tokens_per_s: float = float(os.getenv("STUB_LLM_TOKENS_PER_S", 40))
+    answer_tokens: int = int(os.getenv("STUB_LLM_ANSWER_TOKENS", 120))
+    prefill_tokens_per_s: float = float(os.getenv("STUB_LLM_PREFILL_TOKENS_PER_S", 0))  # 0: TTFT is fixed
+    script: Optional[list] = None
+    _calls: int = PrivateAttr(default=0)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        if self.script is None and os.getenv("STUB_LLM_SCRIPT"):
+            with open(os.getenv("STUB_LLM_SCRIPT"), encoding="utf-8") as f:
+                self.script = json.load(f)
+
+    @property
+    def _llm_type(self):
+        return "stub"
+
+    def bind_tools(self, tools, **kwargs):
+        # The script only knows the agent's own tools, so there is nothing to bind
+        return self
+
+    def plan(self, messages):
+        """Returns (answer text, tool calls) for the conversation so far."""
+        if self.script and self._calls < len(self.script):
+            step = self.script[self._calls]
+            self._calls += 1
+            calls = [{"name": call["name"], "args": call.get("args", {}), "id": call.get("id", f"call_{self._calls}_{i}")}
+                     for i, call in enumerate(step.get("tool_calls", []))]
+            return step.get("content", ""), calls
+
+        last = messages[-1]
+        question = next((m.content for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+        if isinstance(last, HumanMessage):
+            tickers = list(dict.fromkeys(t for t in TICKER_RE.findall(question) if t not in NOT_TICKERS))
+            if tickers:
+                if "price" in question.lower():
+                    calls = [("get_stock_price", {"ticker": t}) for t in tickers]
+                elif len(tickers) > 1:
+                    calls = [("search_10k_multi", {"query": question, "tickers": tickers})]
+                else:
+                    calls = [("search_10k", {"query": question, "ticker": t}) for t in tickers]
+                return "", [{"name": name, "args": args, "id": f"call_{len(messages)}_{i}"}
+                            for i, (name, args) in enumerate(calls)]
+
+        results = [m for m in messages if isinstance(m, ToolMessage)]
+        words = [f"Based on {len(results)} tool results:"] if results else ["From the conversation so far:"]
+        while len(words) < self.answer_tokens:
+            words.extend(FILLER)
+        return " ".join(words[:self.answer_tokens]), []
+
+    def chunks(self, text, calls, messages):
+        """The streamed response as a list of AIMessageChunk (one token or argument piece each)."""
+        chunks = []
+        for i, call in enumerate(calls):
+            args = json.dumps(call["args"])
+            pieces = [args[j:j + ARG_PIECE_CHARS] for j in range(0, len(args), ARG_PIECE_CHARS)]
+            for j, piece in enumerate(pieces):
+                chunks.append(AIMessageChunk(content="", tool_call_chunks=[{
+                    "name": call["name"] if j == 0 else None,
+                    "args": piece,
+                    "id": call["id"] if j == 0 else None,
+                    "index": i,
+                }]))
+        words = text.split(" ") if text else []
+        chunks.extend(AIMessageChunk(content=word if k == 0 else " " + word) for k, word in enumerate(words))
+        if chunks:
+            input_tokens = self.input_tokens(messages)
+            chunks[-1].usage_metadata = {"input_tokens": input_tokens, "output_tokens": len(chunks),
+                                         "total_tokens": input_tokens + len(chunks)}
+        return chunks
+
+    @staticmethod
+    def input_tokens(messages):
+        return sum(len(str(m.content)) // 4 for m in messages)
+
+    def _delays(self, n, messages):
+        prefill = self.input_tokens(messages) / self.prefill_tokens_per_s if self.prefill_tokens_per_s else 0.0
+        return [self.ttft + prefill] + [1.0 / self.tokens_per_s] * (n - 1)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        text, calls = self.plan(messages)
+        time.sleep(sum(self._delays(max(len(self.chunks(text, calls, messages)), 1), messages)))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text, tool_calls=calls))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        chunks = self.chunks(*self.plan(messages), messages)
+        for delay, chunk in zip(self._delays(len(chunks), messages), chunks):
+            time.sleep(delay)
+            yield ChatGenerationChunk(message=chunk)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        chunks = self.chunks(*self.plan(messages), messages)
+        for delay, chunk in zip(self._delays(len(chunks), messages), chunks):
+            await asyncio.sleep(delay)
+            yield ChatGenerationChunk(message=chunk)
@@ -0,0 +1,272 @@
+# table_store.py
+"""
+Structured store of the financial tables in the Markdown filings.
+
+datamaking/markdown.py repairs the tables, but ingest.py then cuts them into
+text chunks, so "what was AAPL's net sales in 2024?" ends up as a fuzzy vector
+match over table fragments. This module parses every Markdown table into one
+row per number (SQLite, one file):
+
+    facts(ticker, section, table_no, row_no, label, label_key, period, year,
+          value, unit, scale, raw)
+
+- section   the 10-K Item the table sits in ("Item 7. Management's Discussion ...")
+- label     the row label as written; label_key is its normalized form
+- period    the column header ("Fiscal 2024", "December 31, 2024"); year is parsed from it
+- value     the cell as a number: "$391,035" -> 391035, "(269 )" -> -269, "46.2 %" -> 46.2
+- unit      "%" or "$" when the cell or its row says so
+- scale     "millions" / "thousands" / "billions" from the "(in millions)" note above the table
+
+lookup() answers a (ticker, metric, year) question with one indexed query, for
+the lookup_financial_value tool. Filings are re-extracted only when their
+content hash changes (the filings table), like the ingest.py manifest.
+"""
+import os
+import re
+import time
+import sqlite3
+import hashlib
+
+DEFAULT_PATH = os.getenv(
+    "TABLE_STORE_PATH", os.path.join(os.path.expanduser("~"), ".cache", "fin_agent", "tables.db")
+)
+EXTRACTOR_VERSION = 1   # Bump to re-extract every filing after a parser change
+SCALE_LOOKBACK = 8      # Lines above a table searched for its "(in millions)" note
+MAX_HEADING_CHARS = 150
+
+SEPARATOR_RE = re.compile(r'^\s*\|[\s\-\|:]+\|\s*$')
+ITEM_RE = re.compile(r'^(?:#+\s*)?(Item\s+\d+[A-Z]?\.?.*)$', re.I)
+YEAR_RE = re.compile(r'\b(19[5-9]\d|20\d\d)\b')
+SCALE_RE = re.compile(r'\bin\s+(thousands|millions|billions)\b', re.I)
+NUMBER_RE = re.compile(r'^(\()?\s*([-−–]?)\s*(\$)?\s*(\()?\s*([0-9][0-9,]*(?:\.[0-9]+)?|\.[0-9]+)\s*(%)?\s*(\))?\s*(%)?$')
+KEY_RE = re.compile(r'[^a-z0-9%]+')
+
+# A few metric names that filings spell differently; lookup() tries all of them
+ALIASES = {
+    "revenue": ("revenue", "net revenue", "total revenue", "total net revenue", "net sales", "total net sales", "sales"),
+    "sales": ("net sales", "total net sales", "sales", "revenue", "total revenue"),
+    "eps": ("diluted earnings per share", "earnings per share", "diluted"),
+    "earnings per share": ("diluted earnings per share", "earnings per share"),
+    "net income": ("net income", "net earnings", "net income (loss)"),
+    "profit": ("net income", "net earnings", "operating profit", "operating income"),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS filings (
+    ticker TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    extractor_version INTEGER NOT NULL,
+    facts INTEGER NOT NULL,
+    source TEXT,
+    extracted_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS facts (
+    ticker TEXT NOT NULL,
+    section TEXT,
+    table_no INTEGER NOT NULL,
+    row_no INTEGER NOT NULL,
+    label TEXT NOT NULL,
+    label_key TEXT NOT NULL,
+    period TEXT,
+    year INTEGER,
+    value REAL NOT NULL,
+    unit TEXT,
+    scale TEXT,
+    raw TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS facts_lookup ON facts (ticker, label_key, year);
+"""
+
+
+def connect(path=DEFAULT_PATH):
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    # Read by concurrent tool calls on worker threads; every call is a single statement
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def label_key(text):
+    return KEY_RE.sub(" ", text.lower()).strip()
+
+
+def split_cells(line):
+    line = line.strip()
+    if line.startswith("|"):
+        line = line[1:]
+    if line.endswith("|"):
+        line = line[:-1]
+    return [cell.strip() for cell in line.split("|")]
+
+
+def parse_number(cell):
+    """Returns (value, unit) for a numeric table cell, or None."""
+    match = NUMBER_RE.match(cell.replace("\xa0", " ").strip())
+    if not match:
+        return None
+    open_paren, sign, dollar, open_paren2, digits, percent, close_paren, percent2 = match.groups()
+    value = float(digits.replace(",", ""))
+    if sign or ((open_paren or open_paren2) and close_paren):
+        value = -value
+    unit = "%" if (percent or percent2) else "$" if dollar else None
+    return value, unit
+
+
+def iter_tables(lines):
+    """
+    Yields (section, scale, rows, has_header) for every Markdown table; rows are
+    lists of cells, separator lines dropped.
+    """
+    section = None
+    recent = []   # Non-table lines just above the current position, for the scale note
+    table = []
+    for line in list(lines) + [""]:
+        stripped = line.strip()
+        if stripped.startswith("|"):
+            table.append(stripped)
+            continue
+        if table:
+            notes = recent[-SCALE_LOOKBACK:] + [table[0]]
+            scale = next((m.group(1).lower() for m in map(SCALE_RE.search, reversed(notes)) if m), None)
+            rows = [split_cells(row) for row in table if not SEPARATOR_RE.match(row)]
+            has_header = len(table) > 1 and SEPARATOR_RE.match(table[1]) is not None
+            yield section, scale, rows, has_header
+            table = []
+            recent = []
+        if not stripped:
+            continue
+        heading = ITEM_RE.match(stripped)
+        if heading and len(stripped) <= MAX_HEADING_CHARS:
+            section = heading.group(1).strip()
+        recent.append(stripped)
+
+
+def extract_facts(text):
+    """Parses the Markdown tables of one filing into fact dicts (without ticker)."""
+    facts = []
+    for table_no, (section, scale, rows, has_header) in enumerate(iter_tables(text.split("\n"))):
+        header = rows[0] if has_header else []
+        body = rows[1:] if has_header else rows
+        for row_no, cells in enumerate(body):
+            label = next((c for c in cells if c and parse_number(c) is None and c != "$"), None)
+            if label is None:
+                continue
+            # Headers often lack the label column (| 2024 | 2023 | over | Net sales | $1 | $2 |): align from the right
+            offset = len(cells) - len(header)
+            row_unit = "%" if "%" in label else None
+            for i, cell in enumerate(cells):
+                parsed = parse_number(cell)
+                if parsed is None:
+                    continue
+                value, unit = parsed
+                period = header[i - offset] if header and 0 <= i - offset < len(header) else None
+                if period is not None and period == label:
+                    period = None
+                year = YEAR_RE.search(period) if period else None
+                facts.append({
+                    "section": section,
+                    "table_no": table_no,
+                    "row_no": row_no,
+                    "label": label,
+                    "label_key": label_key(label),
+                    "period": period,
+                    "year": int(year.group(1)) if year else None,
+                    "value": value,
+                    "unit": unit or row_unit,
+                    "scale": scale if (unit or row_unit) != "%" else None,
+                    "raw": cell,
+                })
+    return facts
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def write_filing(conn, ticker, facts, digest, source=None):
+    """Replaces one ticker's facts and its filings row in one transaction."""
+    with conn:
+        conn.execute("DELETE FROM facts WHERE ticker = ?", (ticker,))
+        conn.executemany(
+            "INSERT INTO facts (ticker, section, table_no, row_no, label, label_key, period, year, value, unit, "
+            "scale, raw) VALUES (:ticker, :section, :table_no, :row_no, :label, :label_key, :period, :year, "
+            ":value, :unit, :scale, :raw)",
+            [dict(fact, ticker=ticker) for fact in facts],
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO filings (ticker, content_hash, extractor_version, facts, source, extracted_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (ticker, digest, EXTRACTOR_VERSION, len(facts), source, time.time()),
+        )
+
+
+def extract_files(conn, md_files, force=False):
+    """Extracts the tables of every changed filing. Returns (filings extracted, facts written, unchanged)."""
+    known = {row["ticker"]: (row["content_hash"], row["extractor_version"])
+             for row in conn.execute("SELECT ticker, content_hash, extractor_version FROM filings")}
+    extracted = written = unchanged = 0
+    for path in md_files:
+        ticker = os.path.basename(path).replace(".md", "").upper()
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        digest = content_hash(text)
+        if not force and known.get(ticker) == (digest, EXTRACTOR_VERSION):
+            unchanged += 1
+            continue
+        facts = extract_facts(text)
+        write_filing(conn, ticker, facts, digest, source=path)
+        extracted += 1
+        written += len(facts)
+    return extracted, written, unchanged
+
+
+def lookup(conn, ticker, metric, year=None, limit=10):
+    """
+    Facts of one ticker whose row label matches metric, best first: exact label
+    matches (or an alias), then labels containing every word of the metric.
+    Exact-label rows use the (ticker, label_key, year) index.
+    """
+    key = label_key(metric)
+    exact = tuple(dict.fromkeys(label_key(alias) for alias in ALIASES.get(key, ()) + (key,)))
+    words = key.split()
+    contains = " AND ".join(["label_key LIKE ?"] * len(words)) or "1"
+    year_filter = " AND year = ?" if year else ""
+    year_params = [int(year)] if year else []
+    params = ([ticker.upper(), *exact, *year_params] + [ticker.upper(), *(f"%{w}%" for w in words), *year_params]
+              + [limit * 2])
+    rows = conn.execute(
+        f"""
+        SELECT * FROM (
+            SELECT *, 0 AS match_rank FROM facts
+            WHERE ticker = ? AND label_key IN ({", ".join("?" * len(exact))}){year_filter}
+            UNION ALL
+            SELECT *, 1 AS match_rank FROM facts
+            WHERE ticker = ? AND {contains}{year_filter}
+        )
+        ORDER BY match_rank, length(label_key), year DESC, table_no, row_no
+        LIMIT ?
+        """,
+        params,
+    ).fetchall()
+    seen, facts = set(), []
+    for row in rows:
+        ident = (row["table_no"], row["row_no"], row["period"], row["raw"])
+        if ident not in seen:
+            seen.add(ident)
+            facts.append(dict(row))
+    return facts[:limit]
+
+
+def format_fact(fact):
+    value = f"{fact['value']:,.2f}".rstrip("0").rstrip(".")
+    if fact["unit"] == "%":
+        amount = f"{value}%"
+    else:
+        amount = ("$" if fact["unit"] == "$" else "") + value + (f" ({fact['scale']})" if fact["scale"] else "")
+    period = fact["period"] or "unlabeled column"
+    section = f" [{fact['section']}]" if fact["section"] else ""
+    return f"{fact['label']} | {period} | {amount}{section}"
@@ -0,0 +1,313 @@
+# vector_backends.py
+"""
+Pluggable vector-store backends for tools.py, retrieval.py and ingest.py.
+
+    pgvector  (default) Postgres + pgvector, through pgstore.py
+    embedded  in-process memory-mapped shards, through embedded_store.py
+
+Pick one with the VECTOR_BACKEND environment variable (or ingest.py --backend).
+Every backend offers the same calls:
+
+    vector_store(embeddings)   a LangChain VectorStore (similarity_search,
+                               similarity_search_with_score, metadata filters, ...)
+    search(vector, k, ticker)  top-k [(Document, cosine distance)]: the search_10k path
+    asearch(vector, k, ticker) the same for coroutines
+    lexical_search(query, k, ticker) / alexical_search(...)
+                               top-k [(Document, rank)] by keyword match (tsvector / BM25)
+                               All four take item= to search one 10-K Item ("1A", "7",
+                               see sections.py) through the (ticker, item) index
+    warm_up()                  connect / open shards ahead of the first query
+    watch_changes(cache)       keep a SearchCache in sync with ingestion
+    load_manifest()            {ticker: filing manifest row}
+    apply_filing_diff(...)     write one filing's chunk diff atomically
+    prepare_bulk_load(index)   called by ingest.py before loading mostly-new data
+    build_indexes(...)         (re)build the approximate search structures
+    close()
+
+Quantized storage: build_indexes(..., quantization="half" | "int8" | "binary")
+keeps a compact copy of the vectors for the first search pass (in the ANN index
+for pgvector, which has no int8; in RAM for the embedded store). Searches then
+rescore VECTOR_OVERSAMPLE x k candidates (default per type, QUANTIZED_OVERSAMPLE)
+with the float32 vectors. The search side follows whatever the collection was
+built with; a process picks up a change on restart.
+
+hybrid_search() / ahybrid_search() fuse the vector and lexical rankings of any
+backend with reciprocal rank fusion. Embeddings miss exact tokens that matter in
+10-Ks (line items, segment names, amounts, years); the lexical side catches them.
+"""
+import os
+import time
+import asyncio
+import pgstore
+import tracing
+import embedded_store
+from lexical import rrf_fuse
+
+BACKENDS = ("pgvector", "embedded")
+DEFAULT_BACKEND = os.getenv("VECTOR_BACKEND", "pgvector")
+PG_POOL_SIZE = int(os.getenv("PG_POOL_SIZE", 10))
+SEARCH_MODES = ("vector", "hybrid")
+DEFAULT_SEARCH_MODE = os.getenv("SEARCH_MODE", "hybrid")
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", 30))  # Per ranking, before fusion
+QUANTIZATIONS = embedded_store.QUANTIZATIONS
+DEFAULT_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "none")  # For ingest.py's index build
+# Candidates per result rescored in full precision; the coarser the codes, the more it takes
+QUANTIZED_OVERSAMPLE = {"half": 2, "int8": 3, "binary": 8}
+VECTOR_OVERSAMPLE = int(os.getenv("VECTOR_OVERSAMPLE", 0))  # 0: QUANTIZED_OVERSAMPLE
+
+
+def oversample_for(quantization):
+    return VECTOR_OVERSAMPLE or QUANTIZED_OVERSAMPLE.get(quantization, embedded_store.DEFAULT_OVERSAMPLE)
+
+
+class PGVectorBackend:
+    name = "pgvector"
+
+    def __init__(self, collection_name, pool_size=PG_POOL_SIZE):
+        self.collection_name = collection_name
+        self.pool_size = pool_size
+        self._conn = None
+        self._collection_id = None
+        self._quantization = None
+        self._pool = None
+        self._pool_lock = asyncio.Lock()
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self._conn = pgstore.connect()
+        return self._conn
+
+    @property
+    def collection_id(self):
+        # Looked up again while missing: PGVector creates the collection on first use
+        if self._collection_id is None:
+            self._collection_id = pgstore.get_collection_id(self.conn, self.collection_name)
+        return self._collection_id
+
+    @property
+    def quantization(self):
+        # Whatever the collection's ANN index was built with, read once
+        if self._quantization is None:
+            self._quantization = pgstore.collection_quantization(self.conn, self.collection_id)
+        return self._quantization
+
+    def vector_store(self, embeddings):
+        from langchain_postgres import PGVector
+        return PGVector(
+            embeddings=embeddings,
+            collection_name=self.collection_name,
+            connection=pgstore.CONNECTION_STRING,
+            use_jsonb=True,
+        )
+
+    def warm_up(self):
+        return self.collection_id, self.quantization
+
+    def search(self, vector, k=15, ticker=None, ef_search=None, probes=None, item=None):
+        # The index-aware query from pgstore.py (ANN + ticker partitions, or the section's rows)
+        with tracing.span("db.vector_search", backend=self.name, k=k, ticker=ticker, item=item) as span:
+            quantization = self.quantization
+            hits = pgstore.similarity_search(self.conn, self.collection_id, vector, k=k, ticker=ticker,
+                                             ef_search=ef_search, probes=probes, quantization=quantization,
+                                             oversample=oversample_for(quantization), item=item)
+            span.set(rows=len(hits))
+        return hits
+
+    async def _async_pool(self):
+        # A connection pool, so concurrent tool calls do not queue on one connection.
+        # Opened lazily inside the caller's event loop.
+        async with self._pool_lock:
+            if self._pool is None:
+                pool = pgstore.create_async_pool(max_size=self.pool_size)
+                await pool.open(wait=True)
+                self._pool = pool
+        collection_id = self._collection_id or await asyncio.to_thread(lambda: self.collection_id)
+        return self._pool, collection_id
+
+    async def asearch(self, vector, k=15, ticker=None, ef_search=None, probes=None, item=None):
+        # Includes the wait for a pooled connection
+        with tracing.span("db.vector_search", backend=self.name, k=k, ticker=ticker, item=item) as span:
+            pool, collection_id = await self._async_pool()
+            quantization = self._quantization or await asyncio.to_thread(lambda: self.quantization)
+            async with pool.connection() as conn:
+                hits = await pgstore.asimilarity_search(conn, collection_id, vector, k=k, ticker=ticker,
+                                                        ef_search=ef_search, probes=probes, quantization=quantization,
+                                                        oversample=oversample_for(quantization), item=item)
+            span.set(rows=len(hits))
+        return hits
+
+    def lexical_search(self, query, k=15, ticker=None, item=None):
+        with tracing.span("db.lexical_search", backend=self.name, k=k, ticker=ticker, item=item) as span:
+            hits = pgstore.lexical_search(self.conn, self.collection_id, query, k=k, ticker=ticker, item=item)
+            span.set(rows=len(hits))
+        return hits
+
+    async def alexical_search(self, query, k=15, ticker=None, item=None):
+        with tracing.span("db.lexical_search", backend=self.name, k=k, ticker=ticker, item=item) as span:
+            pool, collection_id = await self._async_pool()
+            async with pool.connection() as conn:
+                hits = await pgstore.alexical_search(conn, collection_id, query, k=k, ticker=ticker, item=item)
+            span.set(rows=len(hits))
+        return hits
+
+    def watch_changes(self, cache):
+        cache.start_listener(pgstore.PG_DSN, pgstore.CHANGES_CHANNEL)
+
+    def load_manifest(self):
+        pgstore.ensure_manifest(self.conn)
+        return pgstore.load_manifest(self.conn, self.collection_name)
+
+    def apply_filing_diff(self, filing, new_chunks, new_vectors, stale_ids):
+        pgstore.apply_filing_diff(self.conn, self.collection_name, self.collection_id,
+                                  filing, new_chunks, new_vectors, stale_ids)
+
+    def prepare_bulk_load(self, index):
+        # Maintaining an ANN index row by row is much slower than building it once
+        if index != "none":
+            print("🗂️ Bulk load: dropping the ANN index until the load is done...")
+            pgstore.drop_ann_indexes(self.conn, self.collection_id)
+
+    def build_indexes(self, method, m=16, ef_construction=64, lists=None, refresh=False, ticker_partitions=True,
+                      text_index=True, quantization="none"):
+        if text_index and self.collection_id is not None:
+            # Cheap to maintain row by row, so it is never dropped for bulk loads
+            start = time.perf_counter()
+            name = pgstore.ensure_text_index(self.conn, self.collection_id)
+            print(f"🗂️ Index {name} ready ({time.perf_counter() - start:.1f}s)")
+        if method == "none":
+            return
+        dim = pgstore.collection_dims(self.conn, self.collection_id)
+        if dim is None:
+            return
+        start = time.perf_counter()
+        name = pgstore.ensure_indexes(self.conn, self.collection_id, dim, method=method, m=m,
+                                      ef_construction=ef_construction, lists=lists, refresh=refresh,
+                                      quantization=quantization)
+        self._quantization = quantization
+        print(f"🗂️ Index {name} ready ({quantization} vectors, {time.perf_counter() - start:.1f}s)")
+
+        if ticker_partitions:
+            # One partial HNSW index per ticker, so ticker-filtered searches never scan other companies
+            start = time.perf_counter()
+            tickers = pgstore.load_manifest(self.conn, self.collection_name).keys()
+            created = pgstore.ensure_ticker_partitions(self.conn, self.collection_id, dim, tickers,
+                                                       m=m, ef_construction=ef_construction,
+                                                       quantization=quantization, refresh=refresh)
+            print(f"🗂️ {created} ticker partitions built or rebuilt ({time.perf_counter() - start:.1f}s)")
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def aclose(self):
+        # The async pool belongs to the event loop that opened it, so it is closed from there
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+        self.close()
+
+
+def _metadata_filter(ticker, item):
+    conditions = {"ticker": ticker, "item": item}
+    return {field: value for field, value in conditions.items() if value} or None
+
+
+class EmbeddedBackend:
+    name = "embedded"
+
+    def __init__(self, collection_name, root=embedded_store.DEFAULT_ROOT, nprobe=embedded_store.DEFAULT_NPROBE):
+        self.collection_name = collection_name
+        self.store = embedded_store.EmbeddedVectorStore(collection_name=collection_name, root=root, nprobe=nprobe)
+        self.store.oversample = oversample_for(self.store.manifest.get("quantization"))
+
+    def vector_store(self, embeddings):
+        self.store.embedding = embeddings
+        return self.store
+
+    def warm_up(self):
+        self.store.warm_up()
+
+    def search(self, vector, k=15, ticker=None, nprobe=None, item=None):
+        # The async variants run these on a thread via asyncio.to_thread, which keeps the trace context
+        with tracing.span("db.vector_search", backend=self.name, k=k, ticker=ticker, item=item) as span:
+            hits = self.store.similarity_search_with_score_by_vector(
+                vector, k=k, filter=_metadata_filter(ticker, item), nprobe=nprobe
+            )
+            span.set(rows=len(hits))
+        return hits
+
+    async def asearch(self, vector, k=15, ticker=None, nprobe=None, item=None):
+        # numpy releases the GIL for the matrix product, so a thread keeps the loop free
+        return await asyncio.to_thread(self.search, vector, k, ticker, nprobe, item)
+
+    def lexical_search(self, query, k=15, ticker=None, item=None):
+        with tracing.span("db.lexical_search", backend=self.name, k=k, ticker=ticker, item=item) as span:
+            hits = self.store.lexical_search_with_score(query, k=k, filter=_metadata_filter(ticker, item))
+            span.set(rows=len(hits))
+        return hits
+
+    async def alexical_search(self, query, k=15, ticker=None, item=None):
+        return await asyncio.to_thread(self.lexical_search, query, k, ticker, item)
+
+    def watch_changes(self, cache):
+        self.store.start_watcher(cache.invalidate_ticker)
+
+    def load_manifest(self):
+        return self.store.load_manifest()
+
+    def apply_filing_diff(self, filing, new_chunks, new_vectors, stale_ids):
+        self.store.apply_filing_diff(filing, new_chunks, new_vectors, stale_ids)
+
+    def prepare_bulk_load(self, index):
+        # Shards are rewritten whole, IVF lists included; nothing to drop
+        pass
+
+    def build_indexes(self, method, lists=None, refresh=False, quantization="none", **kwargs):
+        # Quantized codes speed up exact and IVF search alike, so they do not depend on the method
+        start = time.perf_counter()
+        built = self.store.build_quantized(quantization, refresh=refresh)
+        self.store.oversample = oversample_for(quantization)
+        if built:
+            print(f"🗂️ {quantization} vectors written for {built} shards ({time.perf_counter() - start:.1f}s)")
+        # Any ANN method maps to the per-shard IVF lists of the embedded store
+        if method == "none":
+            return
+        start = time.perf_counter()
+        built = self.store.build_indexes(lists=lists, refresh=refresh)
+        print(f"🗂️ IVF lists built for {built} shards ({time.perf_counter() - start:.1f}s)")
+
+    def close(self):
+        pass
+
+    async def aclose(self):
+        self.close()
+
+
+def hybrid_search(backend, query, vector, k=15, ticker=None, candidates=HYBRID_CANDIDATES, item=None):
+    """Vector + lexical top-`candidates` of one backend, fused by RRF into [(Document, RRF score)]."""
+    candidates = max(candidates, k)
+    return rrf_fuse([
+        backend.search(vector, k=candidates, ticker=ticker, item=item),
+        backend.lexical_search(query, k=candidates, ticker=ticker, item=item),
+    ], k)
+
+
+async def ahybrid_search(backend, query, vector, k=15, ticker=None, candidates=HYBRID_CANDIDATES, item=None):
+    """hybrid_search() for coroutines; both rankings are fetched concurrently."""
+    candidates = max(candidates, k)
+    rankings = await asyncio.gather(
+        backend.asearch(vector, k=candidates, ticker=ticker, item=item),
+        backend.alexical_search(query, k=candidates, ticker=ticker, item=item),
+    )
+    return rrf_fuse(rankings, k)
+
+
+def open_backend(collection_name, name=None, **kwargs):
+    name = name or DEFAULT_BACKEND
+    if name == "pgvector":
+        return PGVectorBackend(collection_name, **kwargs)
+    if name == "embedded":
+        return EmbeddedBackend(collection_name, **kwargs)
+    raise ValueError(f"Unknown vector backend '{name}' (choose from {', '.join(BACKENDS)})")